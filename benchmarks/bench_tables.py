@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表格性能基准 - 比较一次性生成XML与逐单元格处理随单元格数的耗时变化
+
+用法:
+    python benchmarks/bench_tables.py [--cells 100 500 10000 50000] [--cols 10]
+
+逐单元格路径的耗时随单元格数超线性增长，只对不超过 --slow-limit 的规模测量。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.engine import ConversionOptions, DocumentRenderer, get_markdown, parse_markdown
+
+
+def make_table(rows, cols):
+    """生成 rows 行 cols 列的Markdown表格"""
+    lines = ["| " + " | ".join(f"参数{j}" for j in range(cols)) + " |",
+             "|" + "---|" * cols]
+    for i in range(rows):
+        lines.append("| " + " | ".join(
+            f"**v{i}**" if j == 0 else f"`{i}.{j}`" if j == 1 else f"值 {i}-{j}"
+            for j in range(cols)) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def time_table(table, rows, fast):
+    """渲染一次表格，返回耗时（秒）"""
+    renderer = DocumentRenderer(ConversionOptions())
+    doc = renderer.new_document()
+    start = time.perf_counter()
+    if fast:
+        renderer.process_table(table, doc)
+    else:
+        row_cells = [row.find_all(['td', 'th']) for row in rows]
+        renderer.process_table_cells(rows, max(len(c) for c in row_cells), doc)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="表格渲染性能基准")
+    parser.add_argument("--cells", type=int, nargs="+", default=[100, 200, 500, 10000, 50000])
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--slow-limit", type=int, default=500,
+                        help="逐单元格路径测量的最大单元格数")
+    args = parser.parse_args(argv)
+
+    print(f"{'单元格':>8} {'快速路径':>10} {'逐单元格':>10} {'加速比':>8}")
+    for cells in args.cells:
+        root = parse_markdown(get_markdown(), make_table(cells // args.cols - 1, args.cols))
+        table = root.find_all('table')[0]
+        rows = table.find_all('tr')
+        fast = time_table(table, rows, True)
+        if cells > args.slow_limit:
+            print(f"{cells:>8} {fast:>9.3f}s {'-':>10} {'-':>8}")
+            continue
+        slow = time_table(table, rows, False)
+        print(f"{cells:>8} {fast:>9.3f}s {slow:>9.3f}s {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试语料生成
+按种类和目标大小生成确定性的Markdown文档（相同参数每次生成的内容完全相同），
+图片类语料同时生成其引用的PNG文件
+"""
+
+import random
+from pathlib import Path
+from PIL import Image, ImageDraw
+
+
+# 语料种类
+KINDS = ('prose', 'tables', 'code', 'images', 'lists', 'mixed')
+
+# 常用规模
+SIZES = {
+    '10KB': 10 * 1024,
+    '1MB': 1024 * 1024,
+    '100MB': 100 * 1024 * 1024,
+}
+
+# 图片类语料使用的不同图片数量
+IMAGE_COUNT = 12
+
+_WORDS = (
+    "转换 文档 段落 标题 表格 图片 列表 代码 格式 样式 字体 性能 缓存 渲染 解析 "
+    "markdown word docx python converter stream cache render parse format layout "
+    "数据 结构 模块 接口 参数 结果 测试 基准 吞吐量 内存"
+).split()
+
+
+def parse_size(text):
+    """解析 10KB / 1MB / 100MB 或字节数"""
+    if text in SIZES:
+        return SIZES[text]
+    units = {'KB': 1024, 'MB': 1024 * 1024, 'GB': 1024 * 1024 * 1024}
+    for unit, factor in units.items():
+        if text.upper().endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def _sentence(rng):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 16))]
+    # 随机加上行内格式
+    i = rng.randrange(len(words))
+    words[i] = rng.choice(("**{}**", "*{}*", "`{}`", "[{}](https://example.com/{})")).format(
+        words[i], words[i])
+    return " ".join(words) + "。"
+
+
+def _paragraph(rng):
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 5)))
+
+
+def prose_section(rng, n):
+    parts = [f"## 第{n}节 {rng.choice(_WORDS)}\n"]
+    for _ in range(rng.randint(2, 4)):
+        parts.append(_paragraph(rng) + "\n")
+    if rng.random() < 0.3:
+        parts.append("> " + _sentence(rng) + "\n")
+    return "\n".join(parts)
+
+
+def table_section(rng, n):
+    cols = rng.randint(3, 8)
+    rows = rng.randint(5, 25)
+    lines = [f"### 表{n}\n",
+             "| " + " | ".join(f"列{j}" for j in range(cols)) + " |",
+             "|" + "---|" * cols]
+    for i in range(rows):
+        cells = []
+        for j in range(cols):
+            word = rng.choice(_WORDS)
+            cells.append(f"**{word}**" if j == 0 else f"`{i}.{j}`" if j == 1 else word)
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def code_section(rng, n):
+    lines = [f"### 代码{n}\n", _sentence(rng) + "\n", "```python"]
+    for i in range(rng.randint(10, 40)):
+        indent = "    " * rng.randint(0, 2)
+        lines.append(f"{indent}{rng.choice(_WORDS)}_{i} = process(\"{rng.choice(_WORDS)}\", {i})"
+                     f"  # {rng.choice(_WORDS)}")
+    lines.append("```\n")
+    return "\n".join(lines)
+
+
+def image_section(rng, n):
+    index = rng.randrange(IMAGE_COUNT)
+    return (f"### 图{n}\n\n{_sentence(rng)}\n\n"
+            f"![{rng.choice(_WORDS)} {n}](images/figure{index}.png)\n")
+
+
+def list_section(rng, n):
+    lines = [f"### 列表{n}\n"]
+    ordered = rng.random() < 0.5
+    for i in range(rng.randint(5, 20)):
+        marker = f"{i + 1}." if ordered else "-"
+        lines.append(f"{marker} {_sentence(rng)}")
+    return "\n".join(lines) + "\n"
+
+
+SECTIONS = {
+    'prose': prose_section,
+    'tables': table_section,
+    'code': code_section,
+    'images': image_section,
+    'lists': list_section,
+}
+
+
+def iter_sections(kind, seed=0):
+    """无限产生指定种类的Markdown章节"""
+    rng = random.Random(f"{kind}-{seed}")
+    n = 0
+    while True:
+        n += 1
+        if kind == 'mixed':
+            section = SECTIONS[rng.choice(sorted(SECTIONS))]
+        else:
+            section = SECTIONS[kind]
+        yield section(rng, n)
+
+
+def write_images(directory, count=IMAGE_COUNT):
+    """生成图片类语料引用的PNG图片（1600x1000，超出默认目标分辨率）"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        path = directory / f"figure{i}.png"
+        if path.exists():
+            continue
+        rng = random.Random(f"image-{i}")
+        image = Image.new('RGB', (1600, 1000), (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            x, y = rng.randrange(1500), rng.randrange(900)
+            color = tuple(rng.randrange(256) for _ in range(3))
+            draw.rectangle((x, y, x + rng.randrange(20, 300), y + rng.randrange(20, 200)), fill=color)
+        image.save(path, 'PNG')
+
+
+def generate(kind, size, directory, seed=0):
+    """生成语料文件；相同参数的文件已存在时直接复用
+
+    Args:
+        kind (str): 语料种类，见 KINDS
+        size (int | str): 目标大小（字节数或 '10KB' 等）
+        directory (str): 输出目录
+        seed (int): 随机种子
+
+    Returns:
+        Path: 生成的Markdown文件路径
+    """
+    if kind not in KINDS:
+        raise ValueError(f"未知的语料种类: {kind}")
+    size = parse_size(size) if isinstance(size, str) else size
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{kind}-{size}-{seed}.md"
+
+    if kind in ('images', 'mixed'):
+        write_images(directory / 'images')
+    if path.exists() and path.stat().st_size >= size:
+        return path
+
+    tmp_path = path.with_suffix('.tmp')
+    written = 0
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(f"# 基准语料: {kind}\n\n")
+        for section in iter_sections(kind, seed):
+            data = section + "\n"
+            f.write(data)
+            written += len(data.encode('utf-8'))
+            if written >= size:
+                break
+    tmp_path.replace(path)
+    return path
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换流水线基准测试
+对每种语料和规模分别计时 convert_file 的各阶段（读取、解析、渲染、保存），
+每个用例在独立的子进程中运行以记录峰值内存；结果可与检入的基准JSON比较，
+吞吐量或内存退化超过阈值时返回非零退出码。
+
+用法:
+    python -m benchmarks.run                          # 默认 10KB 和 1MB
+    python -m benchmarks.run --sizes 10KB 1MB 100MB --kinds mixed
+    python -m benchmarks.run --check                  # 与 benchmarks/baseline.json 比较
+    python -m benchmarks.run --update-baseline        # 写入新的基准
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.corpus import KINDS, generate, parse_size
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# 检入的基准结果
+BASELINE_FILE = Path(__file__).resolve().parent / 'baseline.json'
+
+# 默认规模（100MB需显式指定）
+DEFAULT_SIZES = ('10KB', '1MB')
+
+# 默认允许的退化比例
+DEFAULT_THRESHOLD = 0.25
+
+# 不超过该大小的用例重复运行，取最快的一次
+REPEAT_LIMIT = 2 * 1024 * 1024
+
+# 小用例至少重复运行的总时长（秒），减少计时噪声
+MIN_TOTAL_SECONDS = 1.0
+
+# 小用例的最大重复次数
+MAX_REPEAT = 50
+
+# 基准耗时低于该值（秒）的用例计时噪声过大，只比较峰值内存
+MIN_GATED_SECONDS = 0.5
+
+STAGES = ('read', 'parse', 'render', 'save')
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(path, repeat):
+    """在当前进程中运行一个用例，返回各阶段耗时（秒）和输出大小
+
+    至少运行 repeat 次；总时长不足 MIN_TOTAL_SECONDS 时继续重复（最多
+    MAX_REPEAT 次），取总耗时最短的一次。
+    """
+    from src.engine import (ConversionOptions, DocumentRenderer, convert, get_markdown,
+                            parse_markdown, read_markdown, save_document)
+
+    # 预热：加载扩展、Pygments和样式模板
+    convert("# 预热\n\n正文", ConversionOptions())
+
+    options = ConversionOptions()
+    best = None
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / 'out.docx'
+        runs = 0
+        started = time.perf_counter()
+        while runs < repeat or (runs < MAX_REPEAT and repeat > 1
+                                and time.perf_counter() - started < MIN_TOTAL_SECONDS):
+            runs += 1
+            stages = {}
+            start = time.perf_counter()
+            md_content = read_markdown(path)
+            stages['read'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            root = parse_markdown(get_markdown(), md_content, options.parser)
+            stages['parse'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            renderer = DocumentRenderer(options)
+            doc = renderer.new_document()
+            renderer.html_to_docx(root, doc, Path(path).parent)
+            stages['render'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            save_document(doc, output)
+            stages['save'] = time.perf_counter() - start
+
+            # 文档对象之间有循环引用，及时回收以免峰值内存包含上一次的文档
+            del root, doc, md_content, renderer
+            gc.collect()
+            if best is None or sum(stages.values()) < sum(best.values()):
+                best = stages
+        output_bytes = output.stat().st_size
+    return best, output_bytes
+
+
+def worker(args):
+    """子进程入口：运行单个用例并以JSON输出结果"""
+    path = Path(args.worker)
+    stages, output_bytes = run_case(path, args.repeat)
+    total = sum(stages.values())
+    input_bytes = path.stat().st_size
+    print(json.dumps({
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'stages': {name: round(value, 4) for name, value in stages.items()},
+        'seconds': round(total, 4),
+        'mb_per_second': round(input_bytes / (1024 * 1024) / total, 3) if total else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1) if resource is not None else None,
+    }))
+
+
+def measure(kind, size, corpus_dir, repeat):
+    """生成语料并在子进程中运行用例"""
+    path = generate(kind, size, corpus_dir)
+    repeat = repeat if parse_size(size) <= REPEAT_LIMIT else 1
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.run', '--worker', str(path), '--repeat', str(repeat)],
+        cwd=str(ROOT), check=True, stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """与基准比较，返回退化说明列表
+
+    吞吐量低于基准的 (1 - threshold) 倍，或峰值内存高于基准的 (1 + threshold) 倍
+    视为退化；只比较两边都有的用例。基准耗时低于 MIN_GATED_SECONDS 的用例
+    不比较吞吐量。
+    """
+    regressions = []
+    for case, result in results.items():
+        base = baseline.get('cases', {}).get(case)
+        if not base:
+            continue
+        timed = base.get('seconds', 0) >= MIN_GATED_SECONDS
+        if timed and base.get('mb_per_second') and result.get('mb_per_second') is not None:
+            floor = base['mb_per_second'] * (1 - threshold)
+            if result['mb_per_second'] < floor:
+                regressions.append(f"{case}: 吞吐量 {result['mb_per_second']:.3f} MB/s "
+                                   f"低于基准 {base['mb_per_second']:.3f} MB/s")
+        if base.get('peak_rss_mb') and result.get('peak_rss_mb') is not None:
+            ceiling = base['peak_rss_mb'] * (1 + threshold)
+            if result['peak_rss_mb'] > ceiling:
+                regressions.append(f"{case}: 峰值内存 {result['peak_rss_mb']:.1f} MB "
+                                   f"高于基准 {base['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def print_table(results):
+    header = f"{'用例':<16}" + "".join(f"{stage:>9}" for stage in STAGES)
+    print(header + f"{'合计':>9}{'MB/s':>9}{'峰值MB':>9}")
+    for case, result in results.items():
+        stages = "".join(f"{result['stages'][stage]:>8.3f}s" for stage in STAGES)
+        rss = result['peak_rss_mb']
+        print(f"{case:<16}{stages}{result['seconds']:>8.3f}s{result['mb_per_second']:>9.2f}"
+              f"{rss if rss is not None else '-':>9}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Markdown转Word流水线基准测试")
+    parser.add_argument("--kinds", nargs="+", default=list(KINDS), choices=KINDS)
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES),
+                        help="语料规模，如 10KB 1MB 100MB")
+    parser.add_argument("--repeat", type=int, default=3, help="小规模用例的重复次数（取最快）")
+    parser.add_argument("--corpus-dir", default=None,
+                        help="语料目录（生成的语料会被复用），默认使用临时目录")
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="基准JSON文件")
+    parser.add_argument("--check", action="store_true", help="与基准比较，退化时返回1")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="允许的退化比例")
+    parser.add_argument("--update-baseline", action="store_true", help="把结果写入基准文件")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.worker:
+        worker(args)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = args.corpus_dir or tmp
+        results = {}
+        for size in args.sizes:
+            for kind in args.kinds:
+                case = f"{kind}/{size}"
+                print(f"运行 {case} ...", file=sys.stderr)
+                results[case] = measure(kind, size, corpus_dir, args.repeat)
+
+    print_table(results)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n",
+                                     encoding='utf-8')
+    if args.update_baseline:
+        baseline = {'cases': {}}
+        if os.path.exists(args.baseline):
+            baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        baseline.update({k: v for k, v in report.items() if k != 'cases'})
+        baseline.setdefault('cases', {}).update(results)
+        Path(args.baseline).write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + "\n",
+                                       encoding='utf-8')
+        print(f"已更新基准: {args.baseline}")
+
+    if args.check:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare(results, baseline, args.threshold)
+        for message in regressions:
+            print(f"退化: {message}")
+        if regressions:
+            return 1
+        print(f"与基准相比没有超过 {args.threshold:.0%} 的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动用时基准
+在新的解释器中分别测量：空解释器、导入启动器并检查依赖、导入界面模块，
+以及（有显示环境时）从启动到窗口显示的用时，并与 STARTUP_BUDGET_MS 比较。
+
+用法:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.md_to_word_converter import STARTUP_BUDGET_MS
+
+CASES = {
+    '空解释器': "pass",
+    '启动器+依赖检查': "import src.launcher as l; l.check_dependencies()",
+    '导入界面模块': "import src.md_to_word_converter",
+}
+
+# 创建窗口并在首次显示后输出启动用时（毫秒）
+WINDOW_SCRIPT = (
+    "import time; t = time.perf_counter()\n"
+    "from src.md_to_word_converter import MarkdownToWordConverter\n"
+    "app = MarkdownToWordConverter(started_at=t)\n"
+    "app.root.after_idle(lambda: app.root.after(0, lambda: (print(app.startup_ms), app.root.destroy())))\n"
+    "app.run()\n"
+)
+
+
+def time_command(code, repeat):
+    """多次在新解释器中运行代码，返回耗时的中位数（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=str(ROOT), check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def time_to_window(repeat):
+    """窗口显示用时的中位数（毫秒），没有显示环境时返回 None"""
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        return None
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', WINDOW_SCRIPT], cwd=str(ROOT),
+                                stdout=subprocess.PIPE, universal_newlines=True)
+        if result.returncode != 0:
+            return None
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="启动用时基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每项测量的次数（取中位数）")
+    args = parser.parse_args(argv)
+
+    for name, code in CASES.items():
+        print(f"{name:<16}{time_command(code, args.repeat):>8.0f} ms")
+
+    window_ms = time_to_window(args.repeat)
+    if window_ms is None:
+        print("窗口显示用时: 没有可用的显示环境，跳过")
+        return 0
+    print(f"{'窗口显示用时':<16}{window_ms:>8.0f} ms (目标 {STARTUP_BUDGET_MS} ms)")
+    return 1 if window_ms > STARTUP_BUDGET_MS else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
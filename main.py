@@ -11,8 +11,12 @@ Markdown转Word转换器 - 主入口文件
 
 import sys
 import os
+import time
 from pathlib import Path
 
+# 启动时间，用于计算窗口显示用时
+STARTED_AT = time.perf_counter()
+
 # 添加src目录到Python路径
 src_path = Path(__file__).parent / "src"
 sys.path.insert(0, str(src_path))
@@ -24,7 +28,7 @@ def main():
         from md_to_word_converter import MarkdownToWordConverter
         
         print("🚀 启动Markdown转Word转换器...")
-        app = MarkdownToWordConverter()
+        app = MarkdownToWordConverter(started_at=STARTED_AT)
         app.run()
         
     except ImportError as e:
@@ -4,10 +4,27 @@
 Markdown转Word转换器 - 源代码包
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "GitHub Copilot"
 __description__ = "跨平台Markdown到Word文档转换器"
 
-from .md_to_word_converter import MarkdownToWordConverter
+# 按需导入：无界面环境只导入转换引擎，不会加载Tkinter
+_LAZY_EXPORTS = {
+    'MarkdownToWordConverter': 'md_to_word_converter',
+    'ConversionOptions': 'engine',
+    'DocumentRenderer': 'engine',
+    'convert': 'engine',
+    'convert_file': 'engine',
+    'convert_to_stream': 'engine',
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
 
-__all__ = ['MarkdownToWordConverter']
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(f".{_LAZY_EXPORTS[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
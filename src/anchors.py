@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标题锚点与目录
+渲染标题时在同一遍中建立锚点索引：标题的 id 对应一个Word书签，
+“#锚点”形式的内部链接渲染为指向书签的 w:hyperlink。书签名由锚点直接计算，
+链接不需要等到目标标题渲染后再解析，每个链接O(1)；目录是Word的TOC域，整篇文档
+在内存中时还会预先填入指向各书签的目录项。
+
+标题 id 由 HeadingSlugProcessor 在 toc 扩展之前分配，不做去重；重名标题统一由
+AnchorIndex 按文档顺序加后缀，分块、分片和章节各自解析时结果也与整篇转换相同。
+"""
+
+import hashlib
+import html
+import re
+from xml.sax.saxutils import escape
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from markdown.extensions.toc import remove_fnrefs, render_inner_html, strip_tags
+from markdown.treeprocessors import Treeprocessor
+
+
+# 目录包含的标题级别
+TOC_LEVELS = 3
+
+# TOC域指令：1-3级标题、目录项为超链接、Web视图中隐藏页码、使用大纲级别
+TOC_INSTRUCTION = f' TOC \\o "1-{TOC_LEVELS}" \\h \\z \\u '
+
+TOC_TITLE = "目录"
+
+# 域结果未更新时显示的提示
+TOC_PLACEHOLDER = "打开文档时更新目录（或右键单击此处选择“更新域”）"
+
+# 每级目录项的缩进（缇）
+TOC_INDENT = 440
+
+# Word书签名：字母开头，字母、数字和下划线，最长40个字符
+_BOOKMARK_NAME_RE = re.compile(r'[A-Za-z][A-Za-z0-9_]{0,39}')
+
+# 带序号后缀的锚点（与 toc 扩展的 IDCOUNT_RE 相同）
+_ANCHOR_COUNT_RE = re.compile(r'^(.*)_([0-9]+)$')
+
+# w:settings 中排在 w:updateFields 之后的元素（按架构顺序插入）
+_SETTINGS_AFTER_UPDATE_FIELDS = tuple(qn(f'w:{name}') for name in (
+    'hdrShapeDefaults', 'footnotePr', 'endnotePr', 'compat', 'docVars', 'rsids',
+    'attachedSchema', 'themeFontLang', 'clrSchemeMapping', 'doNotIncludeSubdocsInStats',
+    'doNotAutoCompressPictures', 'forceUpgrade', 'captions', 'readModeInkLockDown',
+    'smartTagType', 'schemaLibrary', 'shapeDefaults', 'doNotEmbedSmartTags',
+    'decimalSymbol', 'listSeparator')) + (
+    '{http://schemas.openxmlformats.org/officeDocument/2006/math}mathPr',)
+
+
+def bookmark_name(anchor):
+    """锚点对应的书签名
+
+    本身就是合法书签名的锚点直接使用；其他锚点（含连字符、中文或过长）使用
+    隐藏书签名（下划线开头）加锚点的哈希，不同锚点不会冲突。
+    """
+    if _BOOKMARK_NAME_RE.fullmatch(anchor):
+        return anchor
+    return '_Md' + hashlib.sha1(anchor.encode('utf-8')).hexdigest()[:16]
+
+
+class AnchorIndex:
+    """一篇文档的标题锚点索引
+
+    Attributes:
+        entries (dict): 去重后的锚点 -> (标题级别, 标题文字, 书签名)，按文档顺序排列
+        headings (list): 按文档顺序登记的 (原锚点, 标题级别, 标题文字, 书签名)，
+            原锚点未加后缀，用于在另一个索引中重新登记（见 fragments.py 的 Fragment.anchors）
+        next_id (int): 下一个书签ID
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.headings = []
+        self.next_id = 0
+
+    def add(self, anchor, level, text):
+        """登记标题锚点
+
+        与之前的锚点重名时按 toc 扩展的规则加上 _1、_2 后缀（已带数字后缀的
+        锚点递增后缀）。
+
+        Returns:
+            tuple: (书签名, 书签ID)
+        """
+        original = anchor
+        while anchor in self.entries:
+            match = _ANCHOR_COUNT_RE.match(anchor)
+            anchor = f'{match.group(1)}_{int(match.group(2)) + 1}' if match else f'{anchor}_1'
+        name = bookmark_name(anchor)
+        self.entries[anchor] = (level, text, name)
+        self.headings.append((original, level, text, name))
+        bookmark_id = self.next_id
+        self.next_id += 1
+        return name, bookmark_id
+
+    def resolve(self, anchor):
+        """内部链接指向的书签名（目标标题可以在链接之后）"""
+        return bookmark_name(anchor)
+
+
+class HeadingSlugProcessor(Treeprocessor):
+    """在 toc 扩展之前为标题分配 id
+
+    与 toc 扩展的计算方式相同，但不去重（toc 扩展不会改写已有的 id），重名标题
+    由 AnchorIndex 加后缀。已有 id 的标题（attr_list 指定）和 id 为空的标题保持不变。
+    """
+
+    def run(self, root):
+        toc = self.md.treeprocessors['toc']
+        for el in root.iter():
+            if isinstance(el.tag, str) and toc.header_rgx.match(el.tag) and 'id' not in el.attrib:
+                name = strip_tags(render_inner_html(remove_fnrefs(el), self.md))
+                slug = toc.slugify(html.unescape(name), toc.sep)
+                if slug:
+                    el.attrib['id'] = slug
+
+
+def add_bookmark(p, name, bookmark_id):
+    """用书签包围段落的内容"""
+    start = parse_xml(f'<w:bookmarkStart {nsdecls("w")} w:id="{bookmark_id}" '
+                      f'w:name="{escape(name)}"/>')
+    end = parse_xml(f'<w:bookmarkEnd {nsdecls("w")} w:id="{bookmark_id}"/>')
+    ppr = p.find(qn('w:pPr'))
+    if ppr is not None:
+        ppr.addnext(start)
+    else:
+        p.insert(0, start)
+    p.append(end)
+
+
+def toc_field():
+    """TOC域的起始段落和结束段落
+
+    起始段落包含域指令和占位提示，结束段落只包含域结束标记；预先填入的目录项
+    插在两者之间。
+    """
+    begin = parse_xml(
+        f'<w:p {nsdecls("w")}>'
+        '<w:r><w:fldChar w:fldCharType="begin" w:dirty="true"/></w:r>'
+        f'<w:r><w:instrText xml:space="preserve">{escape(TOC_INSTRUCTION)}</w:instrText></w:r>'
+        '<w:r><w:fldChar w:fldCharType="separate"/></w:r>'
+        f'<w:r><w:t>{escape(TOC_PLACEHOLDER)}</w:t></w:r>'
+        '</w:p>')
+    end = parse_xml(f'<w:p {nsdecls("w")}><w:r><w:fldChar w:fldCharType="end"/></w:r></w:p>')
+    return begin, end
+
+
+def toc_entry(level, text, name):
+    """预先填入的目录项：按级别缩进，指向标题书签的超链接"""
+    return parse_xml(
+        f'<w:p {nsdecls("w")}><w:pPr><w:ind w:left="{(level - 1) * TOC_INDENT}"/></w:pPr>'
+        f'<w:hyperlink w:anchor="{escape(name)}" w:history="1">'
+        f'<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:hyperlink></w:p>')
+
+
+def fill_toc(begin, end, index):
+    """把索引中的标题作为目录项填入TOC域（去掉占位提示）"""
+    entries = [entry for entry in index.entries.values() if entry[0] <= TOC_LEVELS]
+    if not entries:
+        return
+    begin.remove(begin[-1])
+    for level, text, name in entries:
+        end.addprevious(toc_entry(level, text, name))
+
+
+def enable_update_fields(doc):
+    """设置Word打开文档时更新域（目录页码由Word排版后计算）"""
+    settings = doc.settings.element
+    if settings.find(qn('w:updateFields')) is not None:
+        return
+    element = parse_xml(f'<w:updateFields {nsdecls("w")} w:val="true"/>')
+    for child in settings:
+        if child.tag in _SETTINGS_AFTER_UPDATE_FIELDS:
+            child.addprevious(element)
+            return
+    settings.append(element)
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量转换命令行工具
+将目录或通配符匹配的Markdown文件通过进程池并行转换为Word文档，并保持输入目录结构
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+if __package__:
+    from .cache import ConversionCache, DEFAULT_MAX_BYTES
+    from .engine import ConversionOptions, convert_file
+    from .equations import default_equation_cache_dir
+    from .highlight import DEFAULT_CODE_STYLE
+    from .images import DEFAULT_IMAGE_DPI, default_image_cache_dir
+    from .incremental import FragmentCache, convert_incremental, default_fragment_dir
+    from .metrics import PROFILE_MODES, PROFILE_SUFFIXES, ConversionMetrics, profile_conversion
+    from .parallel import convert_parallel
+    from .remote import default_remote_cache_dir
+    from .streaming import convert_stream
+    from .watch import DEFAULT_DEBOUNCE, ConversionCancelled, WatchSession, create_monitor
+else:
+    from cache import ConversionCache, DEFAULT_MAX_BYTES
+    from engine import ConversionOptions, convert_file
+    from equations import default_equation_cache_dir
+    from highlight import DEFAULT_CODE_STYLE
+    from images import DEFAULT_IMAGE_DPI, default_image_cache_dir
+    from incremental import FragmentCache, convert_incremental, default_fragment_dir
+    from metrics import PROFILE_MODES, PROFILE_SUFFIXES, ConversionMetrics, profile_conversion
+    from parallel import convert_parallel
+    from remote import default_remote_cache_dir
+    from streaming import convert_stream
+    from watch import DEFAULT_DEBOUNCE, ConversionCancelled, WatchSession, create_monitor
+
+
+# 批量模式识别的Markdown文件扩展名
+MARKDOWN_SUFFIXES = ('.md', '.markdown')
+
+
+class FileResult:
+    """单个文件的转换结果"""
+
+    def __init__(self, input_file, output_file, success, error=None,
+                 size=0, seconds=0.0, cached=False, metrics=None):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.success = success
+        self.error = error
+        self.size = size
+        self.seconds = seconds
+        self.cached = cached
+        self.metrics = metrics
+
+
+class BatchResult:
+    """批量转换的汇总结果"""
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def succeeded(self):
+        return [r for r in self.results if r.success]
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.success]
+
+    @property
+    def cache_hits(self):
+        return sum(1 for r in self.results if r.cached)
+
+    @property
+    def total_bytes(self):
+        return sum(r.size for r in self.results)
+
+    @property
+    def files_per_second(self):
+        return len(self.results) / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.total_bytes / (1024 * 1024) / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _has_magic(pattern):
+    """判断路径是否包含通配符"""
+    return any(ch in pattern for ch in '*?[')
+
+
+def _glob_root(pattern):
+    """返回通配符模式中不含通配符的目录前缀"""
+    parts = []
+    for part in Path(pattern).parts:
+        if _has_magic(part):
+            break
+        parts.append(part)
+    return Path(*parts) if parts else Path('.')
+
+
+def collect_inputs(inputs):
+    """展开输入的文件、目录和通配符
+
+    Args:
+        inputs (list): 文件路径、目录或通配符模式
+
+    Returns:
+        list: (Markdown文件路径, 相对于输入根目录的路径) 元组列表，已去重
+    """
+    collected = []
+    seen = set()
+
+    def add(path, root):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            collected.append((Path(path), Path(os.path.relpath(path, root))))
+
+    for item in inputs:
+        if _has_magic(item):
+            root = _glob_root(item)
+            for match in sorted(glob.glob(item, recursive=True)):
+                if os.path.isfile(match):
+                    add(match, root)
+        elif os.path.isdir(item):
+            for dirpath, dirnames, filenames in os.walk(item):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if name.lower().endswith(MARKDOWN_SUFFIXES):
+                        add(os.path.join(dirpath, name), item)
+        elif os.path.isfile(item):
+            add(item, os.path.dirname(item) or '.')
+        else:
+            raise FileNotFoundError(f"输入不存在: {item}")
+    return collected
+
+
+def plan_outputs(collected, output_dir=None):
+    """计算每个输入文件的输出路径
+
+    指定输出目录时按相对路径保持目录结构，否则输出到源文件旁边。
+    """
+    tasks = []
+    for input_file, relative in collected:
+        if output_dir:
+            output_file = Path(output_dir) / relative.with_suffix('.docx')
+        else:
+            output_file = input_file.with_suffix('.docx')
+        tasks.append((str(input_file), str(output_file)))
+    return tasks
+
+
+def profile_path(output_file, mode):
+    """性能分析结果的保存路径：输出文件旁边的 .prof 或 .tracemalloc 文件"""
+    return str(Path(output_file).with_suffix(PROFILE_SUFFIXES[mode]))
+
+
+def _convert_one(input_file, output_file, options, stream=False, cache=None,
+                 fragment_cache=None, profile=None, progress_callback=None, parallel_jobs=None):
+    """在工作进程中转换单个文件
+
+    profile 为 PROFILE_MODES 之一时，把该文件的性能分析结果保存在输出文件旁边。
+    parallel_jobs 不为空时文件内的顶层块由这么多个工作进程并行渲染。
+    监视模式下 progress_callback 抛出的 ConversionCancelled 不作为失败处理，直接抛出。
+    """
+    start = time.perf_counter()
+    size = 0
+    hits = cache.stats.hits if cache is not None else 0
+    metrics = ConversionMetrics()
+    try:
+        size = os.path.getsize(input_file)
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        if profile:
+            with profile_conversion(profile, profile_path(output_file, profile), metrics):
+                _run_conversion(input_file, output_file, options, stream, cache,
+                                fragment_cache, metrics, progress_callback, parallel_jobs)
+        else:
+            _run_conversion(input_file, output_file, options, stream, cache,
+                            fragment_cache, metrics, progress_callback, parallel_jobs)
+        cached = cache is not None and cache.stats.hits > hits
+        return FileResult(input_file, output_file, True, size=size,
+                          seconds=time.perf_counter() - start, cached=cached,
+                          metrics=metrics)
+    except ConversionCancelled:
+        raise
+    except Exception as e:
+        return FileResult(input_file, output_file, False, error=str(e),
+                          size=size, seconds=time.perf_counter() - start)
+
+
+def _run_conversion(input_file, output_file, options, stream, cache, fragment_cache, metrics,
+                    progress_callback=None, parallel_jobs=None):
+    if fragment_cache is not None:
+        convert_incremental(input_file, output_file, options, fragment_cache,
+                            progress_callback=progress_callback, metrics=metrics)
+    elif parallel_jobs:
+        convert_parallel(input_file, output_file, options, parallel_jobs,
+                         progress_callback=progress_callback, cache=cache, metrics=metrics)
+    elif stream:
+        convert_stream(input_file, output_file, options, progress_callback=progress_callback,
+                       cache=cache, metrics=metrics)
+    else:
+        convert_file(input_file, output_file, options, progress_callback=progress_callback,
+                     cache=cache, metrics=metrics)
+
+
+def run_batch(inputs, output_dir=None, options=None, jobs=None, report=None,
+              stream=False, cache=None, fragment_cache=None, profile=None, parallel=False):
+    """批量转换
+
+    Args:
+        inputs (list): 文件路径、目录或通配符模式
+        output_dir (str): 输出目录，为空时输出到源文件旁边
+        options (ConversionOptions): 转换选项
+        jobs (int): 工作进程数，默认为CPU核数；为1时在当前进程中转换
+        report (callable): 每个文件完成时调用，参数为 FileResult
+        stream (bool): 是否使用流式转换（适合超大文件）
+        cache (ConversionCache): 转换结果缓存，为空时不使用缓存
+        fragment_cache (FragmentCache): 片段缓存，指定时使用增量转换
+        profile (str): 'cprofile'、'tracemalloc' 或 'memory'，为每个文件保存性能分析结果
+        parallel (bool): 文件内并行：依次转换各文件，每个文件的顶层块由 jobs 个
+            工作进程并行渲染（适合少量超大文件，见 parallel.py）
+
+    Returns:
+        BatchResult: 汇总结果
+    """
+    options = options or ConversionOptions()
+    tasks = plan_outputs(collect_inputs(inputs), output_dir)
+    jobs = jobs or os.cpu_count() or 1
+
+    results = []
+    start = time.perf_counter()
+    if parallel or jobs == 1 or len(tasks) <= 1:
+        for input_file, output_file in tasks:
+            result = _convert_one(input_file, output_file, options, stream, cache,
+                                  fragment_cache, profile,
+                                  parallel_jobs=jobs if parallel else None)
+            results.append(result)
+            if report:
+                report(result)
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            futures = [executor.submit(_convert_one, i, o, options, stream, cache,
+                                       fragment_cache, profile)
+                       for i, o in tasks]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if report:
+                    report(result)
+    return BatchResult(results, time.perf_counter() - start)
+
+
+def watch_batch(inputs, output_dir=None, options=None, report=None, stream=False, cache=None,
+                fragment_cache=None, profile=None, debounce=DEFAULT_DEBOUNCE, backend='auto',
+                log_callback=None, stop=None):
+    """监视模式：先转换所有输入，之后每当输入文件或其引用的图片变化时重新转换
+
+    在当前进程中依次转换；一直运行到 stop 被设置或按下 Ctrl+C。
+    参数与 run_batch 相同，另有：
+
+    Args:
+        debounce (float): 最后一次修改后等待的静默时间（秒）
+        backend (str): 监视方式，'auto'、'inotify' 或 'poll'
+        log_callback (callable): 接收监视日志（检测到修改、取消转换）的回调
+        stop (threading.Event): 停止信号
+
+    Returns:
+        WatchSession: 监视会话（包含转换和取消次数）
+    """
+    options = options or ConversionOptions()
+    tasks = plan_outputs(collect_inputs(inputs), output_dir)
+    for _, output_file in tasks:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+
+    def convert(input_file, output_file, progress_callback):
+        return _convert_one(input_file, output_file, options, stream, cache,
+                            fragment_cache, profile, progress_callback)
+
+    session = WatchSession(tasks, convert, options, create_monitor(backend), debounce,
+                           report=report, log_callback=log_callback)
+    session.run(stop)
+    return session
+
+
+def print_result(result):
+    """打印单个文件的转换结果"""
+    if result.success:
+        note = ", 缓存" if result.cached else ""
+        print(f"✅ {result.input_file} -> {result.output_file} ({result.seconds:.2f}s{note})")
+    else:
+        print(f"❌ {result.input_file}: {result.error}")
+
+
+def print_metrics(result):
+    """以单行JSON打印单个文件的转换指标"""
+    if result.metrics is not None:
+        print(result.metrics.to_json(input=result.input_file, output=result.output_file))
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="md2word-batch",
+        description="批量将Markdown文件转换为Word文档"
+    )
+    parser.add_argument("inputs", nargs="+", help="Markdown文件、目录或通配符（如 'docs/**/*.md'）")
+    parser.add_argument("-o", "--output-dir", help="输出目录（保持输入目录结构），默认输出到源文件旁边")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="工作进程数，默认为CPU核数")
+    parser.add_argument("--toc", action="store_true", help="生成目录")
+    parser.add_argument("--no-images", action="store_true", help="不处理图片")
+    parser.add_argument("--reference-docx", help="参考Word文档，沿用其中的样式")
+    parser.add_argument("--image-dpi", type=int, default=DEFAULT_IMAGE_DPI,
+                        help="图片按6英寸宽度嵌入时的目标分辨率，超出时缩小")
+    parser.add_argument("--code-style", default=DEFAULT_CODE_STYLE,
+                        help="代码块高亮使用的Pygments样式（如 default、friendly、monokai）")
+    parser.add_argument("--remote-images", action="store_true",
+                        help="下载并嵌入远程（http/https）图片")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="不使用磁盘缓存（与 --incremental 同时使用时片段只缓存在内存中）")
+    parser.add_argument("--cache-dir",
+                        help="缓存目录，默认为 ~/.cache/md2word/conversions；"
+                             "增量转换的片段保存在其中的 fragments 子目录")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="缓存大小上限（MB），超出时淘汰最久未使用的条目")
+    # 转换方式只能选一种
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument("--incremental", action="store_true",
+                       help="增量转换，按块缓存渲染结果，只重新渲染变化的部分")
+    modes.add_argument("--stream", action="store_true", help="流式转换，按块解析以限制超大文件的内存占用")
+    modes.add_argument("--parallel", action="store_true",
+                       help="文件内并行：依次转换各文件，每个文件的顶层块由 -j 个工作进程并行渲染（适合超大文件）")
+    parser.add_argument("--metrics", action="store_true",
+                        help="每个文件输出一行JSON，包含各阶段耗时、元素统计和输出大小")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="保存性能分析结果（cProfile 统计、tracemalloc 快照或按阶段统计的内存报告）到输出文件旁边")
+    parser.add_argument("--watch", action="store_true",
+                        help="监视输入文件及其引用的图片，保存后自动重新转换（Ctrl+C 退出）")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help="监视模式下最后一次修改后等待的静默时间（秒）")
+    parser.add_argument("--poll", action="store_true",
+                        help="监视模式下按修改时间轮询，不使用inotify（适用于网络文件系统）")
+    return parser
+
+
+def main(argv=None):
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    options = ConversionOptions(
+        include_toc=args.toc,
+        process_images=not args.no_images,
+        reference_docx=args.reference_docx,
+        image_dpi=args.image_dpi,
+        remote_images=args.remote_images,
+        code_style=args.code_style
+    )
+
+    cache = None
+    fragment_cache = None
+    if args.incremental:
+        # --no-cache 时片段不落盘，只在同一进程内重复转换（如监视模式）时复用
+        if args.no_cache:
+            fragment_dir = None
+        elif args.cache_dir:
+            fragment_dir = os.path.join(args.cache_dir, 'fragments')
+        else:
+            fragment_dir = default_fragment_dir()
+        fragment_cache = FragmentCache(fragment_dir, max_bytes=args.cache_size * 1024 * 1024)
+    elif not args.no_cache:
+        cache = ConversionCache(args.cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+    if not args.no_cache:
+        # 处理后的图片和转换后的公式在多次运行之间复用
+        options.cache_max_bytes = args.cache_size * 1024 * 1024
+        options.image_cache_dir = (os.path.join(args.cache_dir, 'images') if args.cache_dir
+                                   else default_image_cache_dir())
+        options.remote_cache_dir = (os.path.join(args.cache_dir, 'remote') if args.cache_dir
+                                    else default_remote_cache_dir())
+        options.equation_cache_dir = (os.path.join(args.cache_dir, 'equations') if args.cache_dir
+                                      else default_equation_cache_dir())
+
+    report = print_result
+    if args.metrics:
+        def report(result):
+            print_result(result)
+            print_metrics(result)
+
+    if args.watch:
+        print("监视模式：保存文件后自动重新转换，按 Ctrl+C 退出")
+        try:
+            watch_batch(args.inputs, args.output_dir, options, report=report,
+                        stream=args.stream, cache=cache, fragment_cache=fragment_cache,
+                        profile=args.profile, debounce=args.debounce,
+                        backend='poll' if args.poll else 'auto', log_callback=print)
+        except FileNotFoundError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 2
+        except KeyboardInterrupt:
+            print("\n已停止监视")
+        return 0
+
+    try:
+        batch = run_batch(args.inputs, args.output_dir, options, args.jobs,
+                          report=report, stream=args.stream, cache=cache,
+                          fragment_cache=fragment_cache, profile=args.profile,
+                          parallel=args.parallel)
+    except FileNotFoundError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    print("-" * 50)
+    print(f"完成: {len(batch.succeeded)} 成功, {len(batch.failed)} 失败, "
+          f"用时 {batch.elapsed:.2f}s")
+    if cache is not None:
+        print(f"缓存: {batch.cache_hits} 命中, {len(batch.results) - batch.cache_hits} 未命中")
+    print(f"吞吐量: {batch.files_per_second:.1f} 文件/秒, {batch.mb_per_second:.2f} MB/秒")
+    return 1 if batch.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
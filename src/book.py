@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书籍模式
+按章节清单的顺序把多个Markdown文件合并为一个Word文档：各章节在工作进程中并行
+渲染为片段（见 fragments.py），主进程按清单顺序拼接，并逐章写入输出压缩包
+（见 package_writer.py）。拼接时补齐目标文档缺少的样式和编号定义，重新分配
+关系ID、图形对象ID和书签ID，相同图片只嵌入一次；章节之间可插入分页符或分节符。
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from lxml import etree
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+if __package__:
+    from .anchors import AnchorIndex
+    from .engine import (ConversionOptions, DocumentRenderer, PROGRESS_SAVE, ProgressRange,
+                         get_markdown, parse_markdown, read_markdown, _notify)
+    from .fragments import FragmentSplicer, append_block, body_elements, capture_fragment
+    from .highlight import DEFAULT_CODE_STYLE
+    from .images import DEFAULT_IMAGE_DPI
+    from .metrics import ConversionMetrics
+    from .package_writer import StreamingPackageWriter
+else:
+    from anchors import AnchorIndex
+    from engine import (ConversionOptions, DocumentRenderer, PROGRESS_SAVE, ProgressRange,
+                        get_markdown, parse_markdown, read_markdown, _notify)
+    from fragments import FragmentSplicer, append_block, body_elements, capture_fragment
+    from highlight import DEFAULT_CODE_STYLE
+    from images import DEFAULT_IMAGE_DPI
+    from metrics import ConversionMetrics
+    from package_writer import StreamingPackageWriter
+
+
+# 章节之间的分隔方式：不分隔、分页符、分节符（下一页开始新节）
+CHAPTER_BREAKS = ('none', 'page', 'section')
+DEFAULT_CHAPTER_BREAK = 'page'
+
+# 直接作为章节文件（而不是清单）处理的扩展名
+MARKDOWN_SUFFIXES = ('.md', '.markdown')
+
+# 引用样式ID的元素
+_STYLE_TAGS = (qn('w:pStyle'), qn('w:rStyle'), qn('w:tblStyle'))
+
+# 样式中引用其他样式的元素
+_STYLE_LINK_TAGS = (qn('w:basedOn'), qn('w:link'), qn('w:next'))
+
+
+def read_manifest(path):
+    """读取章节清单
+
+    每行一个Markdown文件路径，相对路径相对于清单所在目录；空行和 # 开头的行忽略。
+
+    Args:
+        path (str | Path): 清单文件路径
+
+    Returns:
+        list: 按顺序排列的章节文件路径（Path）
+
+    Raises:
+        FileNotFoundError: 清单或其中的章节文件不存在
+    """
+    root = Path(path).parent
+    chapters = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                chapters.append(root / line)
+    return check_chapters(chapters)
+
+
+def check_chapters(chapters):
+    """确认章节文件都存在，返回 Path 列表"""
+    chapters = [Path(chapter) for chapter in chapters]
+    for chapter in chapters:
+        if not chapter.is_file():
+            raise FileNotFoundError(f"章节文件不存在: {chapter}")
+    return chapters
+
+
+class Chapter:
+    """渲染好的章节
+
+    Attributes:
+        source (str): 章节文件路径
+        fragment (Fragment): 正文元素及其引用的图片和外部关系
+        styles (dict): 样式ID -> 样式XML（正文引用的样式及其基础样式、链接样式）
+        numbering (dict): 编号ID -> (w:num XML, w:abstractNum XML)
+        metrics (ConversionMetrics): 章节的转换指标
+    """
+
+    __slots__ = ('source', 'fragment', 'styles', 'numbering', 'metrics')
+
+    def __init__(self, source, fragment, styles=None, numbering=None, metrics=None):
+        self.source = source
+        self.fragment = fragment
+        self.styles = styles or {}
+        self.numbering = numbering or {}
+        self.metrics = metrics
+
+    def __getstate__(self):
+        return self.source, self.fragment, self.styles, self.numbering, self.metrics
+
+    def __setstate__(self, state):
+        self.source, self.fragment, self.styles, self.numbering, self.metrics = state
+
+
+def referenced_styles(doc, elements):
+    """收集正文元素引用的样式，连同其基础样式、链接样式和后继样式
+
+    Returns:
+        dict: 样式ID -> 样式XML
+    """
+    styles = doc.styles.element
+    pending = {node.get(qn('w:val')) for element in elements for node in element.iter(*_STYLE_TAGS)}
+    result = {}
+    while pending:
+        style_id = pending.pop()
+        if style_id is None or style_id in result:
+            continue
+        style = styles.get_by_id(style_id)
+        if style is None:
+            continue
+        result[style_id] = etree.tostring(style)
+        for node in style.iter(*_STYLE_LINK_TAGS):
+            pending.add(node.get(qn('w:val')))
+    return result
+
+
+def referenced_numbering(doc, roots):
+    """收集元素（正文元素和样式）引用的编号定义
+
+    Returns:
+        dict: 编号ID -> (w:num XML, w:abstractNum XML)
+    """
+    num_ids = {node.get(qn('w:val')) for root in roots for node in root.iter(qn('w:numId'))}
+    num_ids.discard('0')
+    num_ids.discard(None)
+    if not num_ids:
+        return {}
+    numbering = doc.part.numbering_part.element
+    abstracts = {node.get(qn('w:abstractNumId')): node
+                 for node in numbering.findall(qn('w:abstractNum'))}
+    result = {}
+    for num in numbering.num_lst:
+        num_id = num.get(qn('w:numId'))
+        abstract = abstracts.get(str(num.abstractNumId.val))
+        if num_id in num_ids and abstract is not None:
+            result[num_id] = (etree.tostring(num), etree.tostring(abstract))
+    return result
+
+
+def render_chapter(path, options):
+    """在工作进程中渲染一个章节
+
+    Args:
+        path (str | Path): 章节Markdown文件路径
+        options (ConversionOptions): 转换选项
+
+    Returns:
+        Chapter: 可序列化的章节，带有章节中的标题锚点
+    """
+    path = Path(path)
+    metrics = ConversionMetrics()
+    with metrics.stage('read'):
+        md_content = read_markdown(path)
+    root = parse_markdown(get_markdown(), md_content, options.parser, metrics)
+    renderer = DocumentRenderer(options, metrics=metrics)
+    doc = renderer.new_document()
+    renderer.html_to_docx(root, doc, path.parent)
+    metrics.input_bytes = len(md_content.encode('utf-8'))
+    metrics.collect_document(doc)
+    return capture_chapter(str(path), doc, metrics, renderer.anchors.headings)
+
+
+def capture_chapter(source, doc, metrics=None, anchors=None):
+    """把渲染好的文档保存为章节：正文片段及其引用的样式和编号定义
+
+    Args:
+        source (str): 来源（章节文件路径或分片名称）
+        doc (docx.document.Document): 渲染好的文档
+        metrics (ConversionMetrics): 渲染的转换指标
+        anchors (list): 标题锚点，见 Fragment.anchors
+
+    Returns:
+        Chapter: 可序列化的章节
+    """
+    elements = body_elements(doc)
+    styles = referenced_styles(doc, elements)
+    style_elements = [doc.styles.element.get_by_id(style_id) for style_id in styles]
+    numbering = referenced_numbering(doc, elements + style_elements)
+    return Chapter(source, capture_fragment(doc, elements, anchors), styles, numbering, metrics)
+
+
+def iter_chapters(chapters, options, jobs=None):
+    """按清单顺序产生渲染好的章节
+
+    jobs 大于1时所有章节同时提交给进程池，按顺序取回结果；为1时在当前进程中依次渲染。
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(chapters) <= 1:
+        for chapter in chapters:
+            yield render_chapter(chapter, options)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=min(jobs, len(chapters)))
+    try:
+        futures = [executor.submit(render_chapter, chapter, options) for chapter in chapters]
+        for future in futures:
+            yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+class ChapterMerger:
+    """把章节拼接到目标文档
+
+    目标文档中已有的样式保持不变，缺少的样式从章节中复制；编号定义与目标文档
+    中同ID的定义相同时直接使用，否则作为新的编号定义添加并改写引用。章节带有
+    标题锚点时按拼接顺序登记到 anchors，与之前章节重名的锚点像整篇转换时一样
+    加上 _1、_2 后缀并改写书签名。
+
+    Args:
+        doc (docx.document.Document): 目标文档
+        media: 流式包写入器，为空时图片保存在文档对象中
+    """
+
+    def __init__(self, doc, media=None):
+        self.doc = doc
+        self.splicer = FragmentSplicer(doc, media)
+        self._styles = doc.styles.element
+        self._numbering = None
+        self._added_numbering = {}
+        self.anchors = AnchorIndex()
+
+    @property
+    def numbering(self):
+        """目标文档的编号部件根元素（需要时才创建）"""
+        if self._numbering is None:
+            self._numbering = self.doc.part.numbering_part.element
+        return self._numbering
+
+    def add(self, chapter):
+        """拼接一个章节，返回追加的正文元素列表"""
+        num_map = self._merge_numbering(chapter.numbering)
+        self._merge_styles(chapter.styles, num_map)
+        elements = self.splicer.splice(chapter.fragment, self.anchors)
+        if num_map:
+            for element in elements:
+                _remap_numbering(element, num_map)
+        return elements
+
+    def _merge_styles(self, styles, num_map):
+        """复制目标文档缺少的样式"""
+        for style_id, xml in styles.items():
+            if self._styles.get_by_id(style_id) is None:
+                style = parse_xml(xml)
+                _remap_numbering(style, num_map)
+                self._styles.append(style)
+
+    def _merge_numbering(self, definitions):
+        """合并编号定义，返回需要改写的编号ID映射"""
+        num_map = {}
+        if not definitions:
+            return num_map
+        numbering = self.numbering
+        existing = {num.get(qn('w:numId')): num for num in numbering.num_lst}
+        abstracts = {node.get(qn('w:abstractNumId')): node
+                     for node in numbering.findall(qn('w:abstractNum'))}
+        for num_id, (num_xml, abstract_xml) in definitions.items():
+            num = existing.get(num_id)
+            if num is not None:
+                abstract = abstracts.get(str(num.abstractNumId.val))
+                if etree.tostring(num) == num_xml and abstract is not None \
+                        and etree.tostring(abstract) == abstract_xml:
+                    continue
+            key = (num_xml, abstract_xml)
+            new_id = self._added_numbering.get(key)
+            if new_id is None:
+                new_id = self._add_numbering(num_xml, abstract_xml, existing, abstracts)
+                self._added_numbering[key] = new_id
+            num_map[num_id] = new_id
+        return num_map
+
+    def _add_numbering(self, num_xml, abstract_xml, existing, abstracts):
+        """添加一组新的编号定义，返回新的编号ID"""
+        numbering = self.numbering
+        abstract_id = str(max((int(a) for a in abstracts if a.isdigit()), default=-1) + 1)
+        abstract = parse_xml(abstract_xml)
+        abstract.set(qn('w:abstractNumId'), abstract_id)
+        # nsid 标识列表，重复时Word会把两个列表视为同一个
+        for nsid in abstract.findall(qn('w:nsid')):
+            abstract.remove(nsid)
+        nums = numbering.num_lst
+        if nums:
+            nums[0].addprevious(abstract)
+        else:
+            numbering.append(abstract)
+        abstracts[abstract_id] = abstract
+
+        num_id = str(max((int(n) for n in existing if n.isdigit()), default=0) + 1)
+        num = parse_xml(num_xml)
+        num.set(qn('w:numId'), num_id)
+        num.find(qn('w:abstractNumId')).set(qn('w:val'), abstract_id)
+        numbering.append(num)
+        existing[num_id] = num
+        return num_id
+
+
+def _remap_numbering(element, num_map):
+    """改写元素中引用的编号ID"""
+    if not num_map:
+        return
+    for node in element.iter(qn('w:numId')):
+        value = node.get(qn('w:val'))
+        if value in num_map:
+            node.set(qn('w:val'), num_map[value])
+
+
+def chapter_break(doc, kind):
+    """章节之间的分隔段落：分页符，或结束上一节的分节符（沿用文档的页面设置）"""
+    if kind == 'page':
+        return parse_xml(f'<w:p {nsdecls("w")}><w:r><w:br w:type="page"/></w:r></w:p>')
+    paragraph = parse_xml(f'<w:p {nsdecls("w")}><w:pPr/></w:p>')
+    sect_pr = doc.element.body.find(qn('w:sectPr'))
+    sect_pr = copy.deepcopy(sect_pr) if sect_pr is not None else parse_xml(f'<w:sectPr {nsdecls("w")}/>')
+    section_type = sect_pr.find(qn('w:type'))
+    if section_type is None:
+        section_type = parse_xml(f'<w:type {nsdecls("w")}/>')
+        sect_pr.insert(0, section_type)
+    section_type.set(qn('w:val'), 'nextPage')
+    paragraph[0].append(sect_pr)
+    return paragraph
+
+
+def convert_book(chapters, output_file, options=None, jobs=None,
+                 chapter_break_kind=DEFAULT_CHAPTER_BREAK, log_callback=None,
+                 progress_callback=None, metrics=None):
+    """把多个章节转换并合并为一个Word文档
+
+    Args:
+        chapters (str | Path | list): 章节清单文件路径（见 read_manifest），
+            或按顺序排列的章节文件路径列表
+        output_file (str | Path): 输出的Word文件路径
+        options (ConversionOptions): 转换选项（所有章节相同）
+        jobs (int): 工作进程数，默认为CPU核数；为1时在当前进程中转换
+        chapter_break_kind (str): 章节之间的分隔方式，CHAPTER_BREAKS 之一
+        log_callback (callable): 接收日志消息的回调
+        progress_callback (callable): 接收进度百分比(0-100)的回调，按已拼接的章节数计算
+        metrics (ConversionMetrics): 累加各章节的阶段耗时（splice 为拼接耗时），
+            记录合并后文档的元素统计和输出大小
+
+    Returns:
+        str: 输出的Word文件路径
+    """
+    if chapter_break_kind not in CHAPTER_BREAKS:
+        raise ValueError(f"未知的章节分隔方式: {chapter_break_kind}")
+    if isinstance(chapters, (str, os.PathLike)):
+        chapters = read_manifest(chapters)
+    else:
+        chapters = check_chapters(chapters)
+    options = options or ConversionOptions()
+    metrics = metrics if metrics is not None else ConversionMetrics()
+
+    _notify(progress_callback, 0)
+    _notify(log_callback, f"正在转换 {len(chapters)} 个章节...")
+    renderer = DocumentRenderer(options, log_callback, metrics)
+    doc = renderer.new_document()
+    if options.include_toc:
+        # 目录只在合并后的文档开头生成一次，章节本身不带目录
+        renderer.add_toc(doc)
+        options = ConversionOptions(**dict(options.to_dict(), include_toc=False))
+    progress = ProgressRange(progress_callback, 0, PROGRESS_SAVE[0])
+    with StreamingPackageWriter(doc, output_file, metrics) as writer:
+        merger = ChapterMerger(doc, writer)
+        for i, chapter in enumerate(iter_chapters(chapters, options, jobs)):
+            metrics.merge(chapter.metrics)
+            with metrics.stage('splice'):
+                if i and chapter_break_kind != 'none':
+                    append_block(doc, chapter_break(doc, chapter_break_kind))
+                merger.add(chapter)
+            writer.flush()
+            _notify(log_callback, f"已合并: {chapter.source}")
+            progress.update(i + 1, len(chapters))
+        _notify(log_callback, f"正在保存到: {output_file}")
+        writer.close(ProgressRange(progress_callback, *PROGRESS_SAVE))
+    _notify(progress_callback, 100)
+    return str(output_file)
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="md2word-book",
+        description="把多个章节Markdown文件并行转换并合并为一个Word文档"
+    )
+    parser.add_argument("chapters", nargs="+",
+                        help="章节清单文件（每行一个Markdown文件），或按顺序列出的章节文件")
+    parser.add_argument("-o", "--output", required=True, help="输出的Word文件路径")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="工作进程数，默认为CPU核数")
+    parser.add_argument("--chapter-break", choices=CHAPTER_BREAKS, default=DEFAULT_CHAPTER_BREAK,
+                        help="章节之间的分隔方式（默认分页符）")
+    parser.add_argument("--toc", action="store_true", help="生成目录")
+    parser.add_argument("--no-images", action="store_true", help="不处理图片")
+    parser.add_argument("--reference-docx", help="参考Word文档，沿用其中的样式")
+    parser.add_argument("--image-dpi", type=int, default=DEFAULT_IMAGE_DPI,
+                        help="图片按6英寸宽度嵌入时的目标分辨率，超出时缩小")
+    parser.add_argument("--code-style", default=DEFAULT_CODE_STYLE,
+                        help="代码块高亮使用的Pygments样式（如 default、friendly、monokai）")
+    parser.add_argument("--metrics", action="store_true",
+                        help="输出一行JSON，包含各阶段耗时、元素统计和输出大小")
+    return parser
+
+
+def main(argv=None):
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    options = ConversionOptions(
+        include_toc=args.toc,
+        process_images=not args.no_images,
+        reference_docx=args.reference_docx,
+        image_dpi=args.image_dpi,
+        code_style=args.code_style
+    )
+    chapters = args.chapters
+    if len(chapters) == 1 and not chapters[0].lower().endswith(MARKDOWN_SUFFIXES):
+        chapters = chapters[0]
+
+    metrics = ConversionMetrics()
+    start = time.perf_counter()
+    try:
+        convert_book(chapters, args.output, options, args.jobs, args.chapter_break,
+                     metrics=metrics)
+    except FileNotFoundError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    print(f"✅ {args.output} ({time.perf_counter() - start:.2f}s)")
+    if args.metrics:
+        print(metrics.to_json(output=args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
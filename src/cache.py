@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换结果缓存
+以Markdown内容、转换选项、转换器版本和引用图片内容的哈希为键，在磁盘上缓存
+生成的Word文档；命中时直接复制（或硬链接）缓存文件，无需任何解析
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+
+if __package__:
+    from . import __version__
+else:
+    __version__ = 'dev'
+
+
+# 默认缓存上限：512MB
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 缓存键格式版本，键的组成变化时递增
+CACHE_FORMAT = 1
+
+# Markdown中的图片引用：![alt](src "title")、<img src="...">、引用式定义 [id]: src；
+# 尖括号中的地址（<a b.png>）可以包含空格，单独匹配
+IMAGE_REF_RE = re.compile(
+    r'!\[[^\]]*\]\(\s*(?:<([^>]+)>|([^)\s>]+))(?:\s+["\'(][^)]*)?\)'
+    r'|<img\b[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']'
+    r'|^ {0,3}\[[^\]]+\]:\s*(?:<([^>]+)>|(\S+))(?:\s|$)',
+    re.IGNORECASE | re.MULTILINE
+)
+
+_source_digest = None
+
+
+def default_cache_dir():
+    """返回默认缓存目录（遵循 XDG_CACHE_HOME）"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(Path.home(), '.cache')
+    return os.path.join(base, 'md2word', 'conversions')
+
+
+def converter_version():
+    """返回转换器版本标识
+
+    由包版本号和转换器源代码的摘要组成，修改代码后旧缓存自动失效。
+    """
+    global _source_digest
+    if _source_digest is None:
+        digest = hashlib.sha256()
+        for path in sorted(Path(__file__).parent.glob('*.py')):
+            digest.update(path.name.encode('utf-8'))
+            digest.update(path.read_bytes())
+        _source_digest = digest.hexdigest()[:16]
+    return f"{__version__}+{_source_digest}"
+
+
+def iter_image_refs(md_text):
+    """列出Markdown文本中引用的图片地址"""
+    for match in IMAGE_REF_RE.finditer(md_text):
+        yield next(group for group in match.groups() if group)
+
+
+def _hash_file(digest, path):
+    """把文件内容写入摘要"""
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+
+
+def content_key(md_bytes, options, base_path, namespace='document'):
+    """计算Markdown内容在给定选项下的转换结果摘要
+
+    Args:
+        md_bytes (bytes): Markdown内容
+        options (ConversionOptions): 转换选项
+        base_path (Path): 解析相对图片路径的目录
+        namespace (str): 区分整篇文档和片段等不同用途
+
+    Returns:
+        str: 十六进制的SHA-256摘要；启用远程图片且内容引用了远程图片时返回 None，
+            远程图片可能随时变化，这样的结果不应缓存
+    """
+    digest = hashlib.sha256()
+    digest.update(f"md2word-{namespace}-v{CACHE_FORMAT}\0{converter_version()}\0".encode('utf-8'))
+    digest.update(json.dumps(options.output_dict(), sort_keys=True, default=str).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(md_bytes)
+
+    reference = getattr(options, 'reference_docx', None)
+    if reference:
+        digest.update(b'\0reference\0')
+        _hash_file(digest, reference)
+
+    # process_image 会嵌入的本地图片
+    if options.process_images:
+        text = md_bytes.decode('utf-8', errors='replace')
+        for src in sorted(set(iter_image_refs(text))):
+            digest.update(b'\0image\0' + src.encode('utf-8') + b'\0')
+            if src.startswith(('http://', 'https://')):
+                if options.remote_images:
+                    return None
+                continue
+            img_path = Path(base_path) / src
+            if img_path.is_file():
+                _hash_file(digest, img_path)
+            else:
+                digest.update(b'<missing>')
+    return digest.hexdigest()
+
+
+class CacheStats:
+    """缓存命中统计"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self):
+        return dict(vars(self), hit_rate=self.hit_rate)
+
+
+class ConversionCache:
+    """内容寻址的转换结果缓存
+
+    Args:
+        cache_dir (str): 缓存目录，默认为 default_cache_dir()
+        max_bytes (int): 缓存总大小上限，超出时按最近使用时间淘汰
+        link (bool): 命中时使用硬链接代替复制（输出文件与缓存共享数据）
+    """
+
+    # 缓存条目的文件扩展名
+    suffix = '.docx'
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, link=False):
+        self.cache_dir = Path(cache_dir or default_cache_dir())
+        self.max_bytes = max_bytes
+        self.link = link
+        self.stats = CacheStats()
+        # 缓存总大小的估计值（字节），第一次需要时扫描目录得到，之后按写入的条目累加
+        self._size = None
+
+    def key_for(self, input_file, options):
+        """计算一次转换的缓存键
+
+        Args:
+            input_file (str): 输入的Markdown文件路径
+            options (ConversionOptions): 转换选项
+
+        Returns:
+            str: 十六进制的SHA-256键，结果不可缓存时为 None（见 content_key）
+        """
+        with open(input_file, 'rb') as f:
+            md_bytes = f.read()
+        return content_key(md_bytes, options, Path(input_file).parent)
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    def fetch(self, key, output_file):
+        """命中时把缓存的文档放到输出路径
+
+        Returns:
+            bool: 是否命中
+        """
+        entry = self._entry_path(key)
+        # 先放到同目录的临时文件再重命名，输出文件始终是完整的文档
+        output = Path(output_file)
+        tmp_path = output.with_name(f".{output.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            if self.link:
+                try:
+                    os.link(entry, tmp_path)
+                except OSError:
+                    shutil.copyfile(entry, tmp_path)
+            else:
+                shutil.copyfile(entry, tmp_path)
+            os.replace(tmp_path, output)
+            # 更新修改时间，作为LRU淘汰依据
+            os.utime(entry)
+        except FileNotFoundError:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            self.stats.misses += 1
+            return False
+        self.stats.hits += 1
+        return True
+
+    def store(self, key, output_file):
+        """把新生成的文档存入缓存"""
+        with open(output_file, 'rb') as f:
+            self._write_entry(key, f)
+        self.stats.stores += 1
+        self.maybe_evict()
+
+    def _write_entry(self, key, source):
+        """原子地写入缓存条目（先写临时文件再重命名）"""
+        entry = self._entry_path(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(entry.parent), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                shutil.copyfileobj(source, tmp)
+                written = tmp.tell()
+            os.replace(tmp_path, entry)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self._size is not None:
+            self._size += written
+
+    def entries(self):
+        """列出缓存条目：(最近使用时间, 大小, 路径)"""
+        result = []
+        if self.cache_dir is None or not self.cache_dir.exists():
+            return result
+        for path in self.cache_dir.glob(f'*/*{self.suffix}'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            result.append((stat.st_mtime, stat.st_size, path))
+        return result
+
+    def size(self):
+        """缓存总大小（字节）"""
+        return sum(size for _, size, _ in self.entries())
+
+    def maybe_evict(self):
+        """估计的总大小超过上限时才扫描目录并淘汰条目
+
+        每次写入后都扫描整个目录会使批量转换的耗时随条目数平方增长；估计值偏小
+        （例如其他进程同时写入）时只会推迟淘汰，下一次扫描时纠正。
+        """
+        if self._size is None:
+            self._size = self.size()
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """淘汰最久未使用的条目，直到总大小不超过上限"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                self.stats.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def clear(self):
+        """清空缓存"""
+        for _, _, path in self.entries():
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        self._size = 0
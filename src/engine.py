@@ -0,0 +1,1027 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown转Word转换引擎
+不依赖Tkinter的无界面转换流水线，可在无显示环境、命令行和工作进程中使用
+"""
+
+import copy
+import os
+import platform
+import threading
+import time
+import uuid
+from io import BytesIO
+from pathlib import Path
+import markdown
+from markdown.extensions.toc import slugify_unicode
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.oxml.parser import OxmlElement
+from docx.oxml.shape import CT_Inline
+from docx.shared import Inches, Pt, RGBColor
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
+from bs4 import BeautifulSoup
+
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+
+if __package__:
+    from .anchors import (TOC_TITLE, AnchorIndex, HeadingSlugProcessor, add_bookmark,
+                          enable_update_fields, fill_toc, toc_field)
+    from .cache import DEFAULT_MAX_BYTES
+    from .equations import EquationRenderer, math_source
+    from .fragments import append_block
+    from .highlight import DEFAULT_CODE_STYLE, build_code_block, code_language
+    from .images import DEFAULT_IMAGE_DPI, IMAGE_WIDTH_INCHES, ImageProcessor
+    from .inline import MATH, inline_segments, runs_xml
+    from .metrics import ConversionMetrics
+    from .remote import RemoteFetcher, is_remote
+    from .resources import resource_resolver
+    from .tables import build_table, is_simple_table
+    from .tree_renderer import parse_tree
+else:
+    from anchors import (TOC_TITLE, AnchorIndex, HeadingSlugProcessor, add_bookmark,
+                         enable_update_fields, fill_toc, toc_field)
+    from cache import DEFAULT_MAX_BYTES
+    from equations import EquationRenderer, math_source
+    from fragments import append_block
+    from highlight import DEFAULT_CODE_STYLE, build_code_block, code_language
+    from images import DEFAULT_IMAGE_DPI, IMAGE_WIDTH_INCHES, ImageProcessor
+    from inline import MATH, inline_segments, runs_xml
+    from metrics import ConversionMetrics
+    from remote import RemoteFetcher, is_remote
+    from resources import resource_resolver
+    from tables import build_table, is_simple_table
+    from tree_renderer import parse_tree
+
+
+# 转换时启用的Markdown扩展
+# （代码高亮由渲染器直接调用Pygments完成，见 highlight.py，不使用codehilite）
+MARKDOWN_EXTENSIONS = ['extra', 'toc', 'tables', 'fenced_code', 'mdx_math']
+
+# toc 扩展保留标题中的中文等字符生成锚点，“#中文-标题”形式的链接可以指向标题；
+# mdx_math 识别 $...$ 行内公式（公式转换见 equations.py）
+MARKDOWN_EXTENSION_CONFIGS = {'toc': {'slugify': slugify_unicode},
+                              'mdx_math': {'enable_dollar_delimiter': True}}
+
+# Markdown解析方式：tree 直接渲染元素树，html 经HTML字符串和BeautifulSoup（兼容回退）
+PARSERS = ('tree', 'html')
+
+# 不影响转换结果的运行时选项，不参与缓存键计算
+RUNTIME_OPTIONS = ('image_cache_dir', 'remote_cache_dir', 'equation_cache_dir', 'cache_max_bytes')
+
+# 各阶段在总进度（0-100）中所占的区间
+PROGRESS_READ = (0, 10)
+PROGRESS_PARSE = (10, 30)
+PROGRESS_RENDER = (30, 90)
+PROGRESS_SAVE = (90, 100)
+
+# 读取和写入文件的块大小
+IO_CHUNK_SIZE = 1024 * 1024
+
+# 估计保存后的文档大小时，正文中每个XML元素压缩后约占的字节数，以及其他XML部件的压缩比
+PACKED_BYTES_PER_ELEMENT = 2
+XML_COMPRESSION_RATIO = 20
+
+# 已设置样式的模板文档缓存，键为 (字体, 参考文档, 参考文档修改时间)
+_template_cache = {}
+_template_lock = threading.Lock()
+
+# 每个线程可复用的Markdown解析器，键为扩展列表
+_markdown_local = threading.local()
+
+
+def get_document_fonts(system=None):
+    """根据操作系统选择Word文档使用的字体
+
+    Args:
+        system (str): 操作系统名称，默认为当前系统
+
+    Returns:
+        tuple: (正文字体, 代码字体)
+    """
+    system = system or platform.system()
+    if system == "Windows":
+        return '微软雅黑', 'Consolas'
+    elif system == "Darwin":  # macOS
+        return 'PingFang SC', 'SF Mono'
+    else:  # Linux
+        return 'DejaVu Sans', 'DejaVu Sans Mono'
+
+
+class ProgressRange:
+    """把某个阶段的完成量映射到总进度中的一段区间
+
+    只在整数百分比变化时调用回调，避免大量块级元素时频繁通知界面。
+
+    Args:
+        callback (callable): 接收进度百分比的回调，可以为空
+        start (int): 区间起点
+        end (int): 区间终点
+    """
+
+    def __init__(self, callback, start, end):
+        self.callback = callback
+        self.start = start
+        self.end = end
+        self.last = None
+
+    def update(self, done, total):
+        """报告已完成 done / total"""
+        if not self.callback:
+            return
+        value = self.start + (self.end - self.start) * min(done, total) // max(total, 1)
+        if value != self.last:
+            self.last = value
+            self.callback(value)
+
+    def finish(self):
+        self.update(1, 1)
+
+
+class ConversionOptions:
+    """转换选项，与GUI中的复选框一一对应
+
+    image_dpi 为图片按6英寸宽度嵌入时的目标分辨率，超出的图片会被缩小；
+    image_cache_dir 为处理后图片的磁盘缓存目录，为空时只在内存中缓存。
+    remote_images 为真时下载并嵌入远程（http/https）图片，下载结果缓存在
+    remote_cache_dir 中。code_style 为代码块高亮使用的Pygments样式名。
+    equation_cache_dir 为转换后公式的磁盘缓存目录，为空时只在内存中缓存。
+    cache_max_bytes 为上述每个磁盘缓存的总大小上限，超出时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, preserve_formatting=True, include_toc=False,
+                 process_images=True, clean_formatting=True, system=None,
+                 parser='tree', reference_docx=None, image_dpi=DEFAULT_IMAGE_DPI,
+                 image_cache_dir=None, remote_images=False, remote_cache_dir=None,
+                 code_style=DEFAULT_CODE_STYLE, equation_cache_dir=None,
+                 cache_max_bytes=DEFAULT_MAX_BYTES):
+        if parser not in PARSERS:
+            raise ValueError(f"未知的解析方式: {parser}")
+        self.preserve_formatting = preserve_formatting
+        self.include_toc = include_toc
+        self.process_images = process_images
+        self.clean_formatting = clean_formatting
+        self.system = system or platform.system()
+        self.parser = parser
+        self.reference_docx = str(reference_docx) if reference_docx else None
+        self.image_dpi = image_dpi
+        self.image_cache_dir = str(image_cache_dir) if image_cache_dir else None
+        self.remote_images = remote_images
+        self.remote_cache_dir = str(remote_cache_dir) if remote_cache_dir else None
+        self.code_style = code_style
+        self.equation_cache_dir = str(equation_cache_dir) if equation_cache_dir else None
+        self.cache_max_bytes = cache_max_bytes
+
+    def to_dict(self):
+        """返回选项的字典形式"""
+        return dict(vars(self))
+
+    def output_dict(self):
+        """返回影响转换结果的选项（不含缓存目录等运行时选项）"""
+        return {k: v for k, v in vars(self).items() if k not in RUNTIME_OPTIONS}
+
+    def __repr__(self):
+        items = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"ConversionOptions({items})"
+
+
+class DocumentRenderer:
+    """将解析后的HTML元素渲染到Word文档
+
+    resources 为资源解析器 callable(src) -> bytes | None（见 resources.py）时，
+    本地图片由它提供，不读取文件系统。media 为流式包写入器（见 package_writer.py）时，
+    图片交给它写入压缩包，不作为图片部件保存在文档对象中。
+
+    标题的锚点在渲染时登记到 anchors（见 anchors.py）并生成书签，“#锚点”链接
+    渲染为指向书签的超链接，不需要额外遍历文档。
+    """
+
+    def __init__(self, options=None, log_callback=None, metrics=None, resources=None):
+        self.options = options or ConversionOptions()
+        self.log_callback = log_callback
+        self.metrics = metrics if metrics is not None else ConversionMetrics()
+        self.resources = resources
+        self._resource_data = {}
+        self.media = None
+        self.document_code_font = 'Courier New'
+        self._style_ids = {}
+        self._images = None
+        self._remote = None
+        self._equations = None
+        self._next_shape_id = None
+        self.anchors = AnchorIndex()
+        self._toc = None
+        self.base_path = Path.cwd()
+
+    @property
+    def images(self):
+        """图片处理器（同一进程中相同设置的转换共享处理结果）"""
+        if self._images is None:
+            self._images = ImageProcessor.shared(self.options.image_dpi,
+                                                 self.options.image_cache_dir,
+                                                 self.options.cache_max_bytes)
+        return self._images
+
+    @property
+    def remote(self):
+        """远程图片下载器（同一进程中共享连接池和下载结果）"""
+        if self._remote is None:
+            self._remote = RemoteFetcher.shared(self.options.remote_cache_dir,
+                                                self.options.cache_max_bytes)
+        return self._remote
+
+    @property
+    def equations(self):
+        """公式转换器（同一进程中相同缓存目录的转换共享转换结果）"""
+        if self._equations is None:
+            self._equations = EquationRenderer.shared(self.options.equation_cache_dir,
+                                                      self.options.cache_max_bytes)
+        return self._equations
+
+    def log_message(self, message):
+        """输出日志消息"""
+        if self.log_callback:
+            self.log_callback(message)
+
+    def new_document(self):
+        """创建已设置好样式的空白Word文档
+
+        样式设置好的模板按字体和参考文档缓存，之后每次只需复制模板。
+        """
+        key = self._template_key()
+        with _template_lock:
+            template = _template_cache.get(key)
+            if template is None:
+                template = self._build_template()
+                _template_cache[key] = template
+            doc = copy.deepcopy(template)
+
+        self.document_code_font = key[0][1]
+        self._style_ids = {}
+        self._next_shape_id = None
+        self.anchors = AnchorIndex()
+        self._toc = None
+        return doc
+
+    def _template_key(self):
+        """模板缓存键"""
+        reference = self.options.reference_docx
+        mtime = os.path.getmtime(reference) if reference else None
+        return get_document_fonts(self.options.system), reference, mtime
+
+    def _build_template(self):
+        """创建模板文档
+
+        指定参考文档时沿用其样式并清空正文，否则使用默认模板并设置平台字体。
+        """
+        reference = self.options.reference_docx
+        if not reference:
+            doc = Document()
+            self.setup_document_styles(doc)
+            return doc
+
+        doc = Document(reference)
+        body = doc.element.body
+        for child in list(body):
+            if child.tag != qn('w:sectPr'):
+                body.remove(child)
+        return doc
+
+    def style_id(self, doc, style_name):
+        """返回样式名对应的样式ID（按文档缓存，避免python-docx每次遍历样式表）"""
+        style_id = self._style_ids.get(style_name)
+        if style_id is None:
+            style_id = doc.styles[style_name].style_id
+            self._style_ids[style_name] = style_id
+        return style_id
+
+    def add_paragraph(self, doc, text='', style=None):
+        """添加段落，样式通过缓存的样式ID设置
+
+        段落直接插入到分节属性之前（见 fragments.append_block），不经过
+        python-docx 的 add_paragraph。
+        """
+        p = OxmlElement('w:p')
+        append_block(doc, p)
+        paragraph = Paragraph(p, doc._body)
+        if style:
+            p.style = self.style_id(doc, style)
+        if text:
+            paragraph.add_run(text)
+        return paragraph
+
+    def add_picture(self, run, data, width):
+        """在run末尾插入图片
+
+        图形对象ID由渲染器按文档递增分配：python-docx的 next_id 每次都在整个
+        文档中查找最大ID，图片较多时耗时随图片数平方增长。
+        """
+        part = run.part
+        if self.media is not None:
+            rid, image = self.media.add_image(data)
+        else:
+            rid, image = part.get_or_add_image(BytesIO(data))
+        cx, cy = image.scaled_dimensions(width, None)
+        if self._next_shape_id is None:
+            self._next_shape_id = part.next_id
+        inline = CT_Inline.new_pic_inline(self._next_shape_id, rid, image.filename, cx, cy)
+        self._next_shape_id += 1
+        run._r.add_drawing(inline)
+
+    def reserve_shape_ids(self, next_id):
+        """确保之后分配的图形对象ID不小于 next_id（文档中有其他来源的图片时调用）"""
+        self._next_shape_id = max(self._next_shape_id or 0, next_id)
+
+    def reserve_bookmark_ids(self, next_id):
+        """确保之后分配的书签ID不小于 next_id（文档中有其他来源的书签时调用）"""
+        self.anchors.next_id = max(self.anchors.next_id, next_id)
+
+    def add_toc(self, doc):
+        """在正文末尾（通常是文档开头）添加目录标题和TOC域
+
+        Word打开文档时更新域并计算页码；整篇文档在内存中时，渲染结束后可调用
+        finish_toc() 预先填入目录项。
+        """
+        try:
+            style = self.style_id(doc, 'TOC Heading')
+        except KeyError:
+            style = None
+        title = self.add_paragraph(doc, TOC_TITLE)
+        if style:
+            title._p.style = style
+        begin, end = toc_field()
+        append_block(doc, begin)
+        append_block(doc, end)
+        enable_update_fields(doc)
+        self._toc = (begin, end)
+
+    def finish_toc(self):
+        """把渲染时登记的标题填入 add_toc() 添加的目录（需要整篇文档都由本渲染器渲染）"""
+        if self._toc is not None:
+            fill_toc(*self._toc, self.anchors)
+
+    def add_heading_anchor(self, paragraph, anchor, level, text):
+        """登记标题锚点，并用书签包围标题段落"""
+        if anchor:
+            name, bookmark_id = self.anchors.add(anchor, level, text)
+            add_bookmark(paragraph._p, name, bookmark_id)
+
+    def setup_document_styles(self, doc):
+        """设置文档样式"""
+        styles = doc.styles
+
+        # 根据操作系统选择合适的字体
+        font_name, code_font_name = get_document_fonts(self.options.system)
+
+        # 设置标题样式
+        for i in range(1, 7):
+            try:
+                heading_style = styles[f'Heading {i}']
+                heading_style.font.name = font_name
+                heading_style.font.size = Pt(24 - i * 2)
+                heading_style.font.bold = True
+                heading_style.font.color.rgb = RGBColor(0x2c, 0x3e, 0x50)
+            except Exception as e:
+                self.log_message(f"设置标题样式时警告: {str(e)}")
+
+        # 设置正文样式
+        try:
+            normal_style = styles['Normal']
+            normal_style.font.name = font_name
+            normal_style.font.size = Pt(12)
+            normal_style.paragraph_format.space_after = Pt(6)
+            normal_style.paragraph_format.line_spacing = 1.15
+        except Exception as e:
+            self.log_message(f"设置正文样式时警告: {str(e)}")
+
+        # 设置代码字体（用于后续代码块）
+        self.document_code_font = code_font_name
+
+    def html_to_docx(self, soup, doc, base_path, progress=None):
+        """将HTML转换为Word文档
+
+        Args:
+            soup: 解析结果的根节点
+            doc (docx.document.Document): 目标文档
+            base_path (Path): 解析相对图片路径的目录
+            progress (ProgressRange): 按已处理的块级元素数报告进度
+
+        图片预处理、公式预先转换（有公式时）和渲染的耗时分别计入 metrics 的
+        images、equations 和 render 阶段，每个块级元素的耗时按标签记录。
+        """
+        self.base_path = Path(base_path)
+        metrics = self.metrics
+        if self.options.process_images:
+            with metrics.stage('images'):
+                self.prefetch_images(soup, self.base_path)
+        self.prefetch_equations(soup)
+        with metrics.stage('render'):
+            elements = [element for element in soup.children if hasattr(element, 'name')]
+            for i, element in enumerate(elements):
+                start = time.perf_counter()
+                self.process_element(element, doc, base_path)
+                metrics.add_element(element.name, time.perf_counter() - start)
+                if progress is not None:
+                    progress.update(i + 1, len(elements))
+
+    def prefetch_images(self, soup, base_path):
+        """渲染前并行下载远程图片，并并行处理文档引用的所有图片"""
+        paths = []
+        urls = []
+        blobs = []
+        for img in soup.find_all('img'):
+            src = img.get('src', '')
+            if not src:
+                continue
+            if is_remote(src):
+                if self.options.remote_images:
+                    urls.append(src)
+            elif self.resources is not None:
+                try:
+                    data = self.resource(src)
+                except Exception:
+                    # 错误在渲染时由 process_image 报告
+                    continue
+                if data is not None:
+                    blobs.append(data)
+            else:
+                paths.append(base_path / src)
+
+        if urls:
+            self.remote.prefetch(urls)
+            # 只取已下载的结果，失败的地址在渲染时由 process_image 报告
+            for url in dict.fromkeys(urls):
+                data = self.remote.cached(url)
+                if data is not None:
+                    blobs.append(data)
+        if paths or blobs:
+            self.images.prepare(paths, blobs)
+
+    def prefetch_equations(self, soup):
+        """渲染前转换文档中的所有公式（未缓存的公式较多时并行转换）"""
+        sources = []
+        for script in soup.find_all('script'):
+            source = math_source(script)
+            if source is not None:
+                sources.append(source[0])
+        if sources:
+            with self.metrics.stage('equations'):
+                self.equations.prepare(sources)
+
+    def render_math(self, tex, display):
+        """公式对应的OMML（行内公式为 m:oMath，独立公式为 m:oMathPara）"""
+        return self.equations.render(tex, display)
+
+    def process_element(self, element, doc, base_path):
+        """处理HTML元素"""
+        if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+            # 处理标题
+            level = int(element.name[1])
+            text = element.get_text().strip()
+            heading = self.add_paragraph(doc, text, f'Heading {level}')
+            self.add_heading_anchor(heading, element.get('id'), level, text)
+
+        elif element.name == 'p':
+            # 只包含一张图片的段落按独立图片处理
+            image = self._sole_image(element)
+            if image is not None:
+                if self.options.process_images:
+                    self.process_image(image, doc, base_path)
+                return
+
+            # 处理段落
+            paragraph = self.add_paragraph(doc)
+            self.process_inline_elements(element, paragraph)
+
+        elif element.name == 'ul':
+            # 处理无序列表
+            for li in element.find_all('li', recursive=False):
+                paragraph = self.add_paragraph(doc, style='List Bullet')
+                self.process_inline_elements(li, paragraph)
+
+        elif element.name == 'ol':
+            # 处理有序列表
+            for li in element.find_all('li', recursive=False):
+                paragraph = self.add_paragraph(doc, style='List Number')
+                self.process_inline_elements(li, paragraph)
+
+        elif element.name == 'blockquote':
+            # 处理引用
+            paragraph = self.add_paragraph(doc, style='Quote')
+            self.process_inline_elements(element, paragraph)
+
+        elif element.name == 'pre':
+            # 处理代码块
+            self.process_code_block(element, doc)
+
+        elif element.name == 'table':
+            # 处理表格
+            self.process_table(element, doc)
+
+        elif element.name == 'img' and self.options.process_images:
+            # 处理图片
+            self.process_image(element, doc, base_path)
+
+        elif element.name == 'hr':
+            # 处理分隔线
+            paragraph = self.add_paragraph(doc)
+            paragraph.add_run().add_break(WD_BREAK.LINE)
+
+    def process_inline_elements(self, element, paragraph):
+        """处理内联元素
+
+        任意层嵌套的粗体、斜体、代码、链接和删除线格式会叠加，相邻的同格式
+        文本合并为一个run；所有run一次性生成XML后追加到段落中。
+        """
+        segments = inline_segments(element, images=self.options.process_images,
+                                   anchors=self.anchors.resolve, math=self.render_math)
+        if not segments:
+            return
+        runs = parse_xml(f'<w:p {nsdecls("w")}>{runs_xml(segments, self.document_code_font)}</w:p>')
+        # 公式以外的每个片段对应一个 w:r（内部链接的run在 w:hyperlink 中）
+        run_elements = list(runs.iter(qn('w:r')))
+        paragraph._p.extend(list(runs))
+        segments = [segment for segment in segments if segment[0] is not MATH]
+        for (fmt, value), r in zip(segments, run_elements):
+            if fmt is None:
+                # 段落中的行内图片，失败时去掉占位的run
+                if not self.add_inline_image(value, Run(r, paragraph)):
+                    r.getparent().remove(r)
+
+    def process_code_block(self, pre_element, doc):
+        """处理代码块
+
+        按 <code class="language-xxx"> 的语言用Pygments高亮，按记号类型设置颜色和
+        粗斜体，相邻的同格式记号合并为一个run；未知语言和超大代码块按纯文本输出。
+        """
+        code_text = pre_element.get_text()
+        language = code_language(pre_element)
+        style_id = self.style_id(doc, 'No Spacing')
+        try:
+            p = build_code_block(code_text, language, style_id, self.document_code_font,
+                                 self.options.code_style)
+        except ValueError as e:
+            self.log_message(f"代码高亮失败，按纯文本输出: {str(e)}")
+            p = build_code_block(code_text, None, style_id, self.document_code_font)
+        append_block(doc, p)
+
+    def process_table(self, table_element, doc):
+        """处理表格
+
+        普通表格一次性生成整张表格的XML（单元格内保留粗体、斜体、代码和链接格式）；
+        含合并单元格或块级内容的表格逐单元格处理。
+        """
+        rows = table_element.find_all('tr')
+        if not rows:
+            return
+
+        # 计算列数
+        row_cells = [row.find_all(['td', 'th']) for row in rows]
+        max_cols = max(len(cells) for cells in row_cells)
+        if not max_cols:
+            return
+
+        if is_simple_table(row_cells):
+            tbl = build_table(row_cells, max_cols, doc._block_width,
+                              self.style_id(doc, 'Table Grid'), self.document_code_font,
+                              self.anchors.resolve, self.render_math)
+            append_block(doc, tbl)
+        else:
+            self.process_table_cells(rows, max_cols, doc)
+
+    def process_table_cells(self, rows, max_cols, doc):
+        """逐单元格处理表格（合并单元格等特殊情况）"""
+        # 创建表格
+        table = doc.add_table(rows=len(rows), cols=max_cols)
+        table._tbl.tblStyle_val = self.style_id(doc, 'Table Grid')
+
+        for i, row in enumerate(rows):
+            cells = row.find_all(['td', 'th'])
+            for j, cell in enumerate(cells):
+                if j < max_cols:
+                    table.cell(i, j).text = cell.get_text().strip()
+                    # 如果是表头，设置粗体
+                    if cell.name == 'th':
+                        for paragraph in table.cell(i, j).paragraphs:
+                            for run in paragraph.runs:
+                                run.bold = True
+
+    def _sole_image(self, element):
+        """段落只包含一张图片（及空白）时返回该图片元素"""
+        image = None
+        for child in element.children:
+            if hasattr(child, 'name'):
+                if child.name != 'img' or image is not None:
+                    return None
+                image = child
+            elif str(child).strip():
+                return None
+        return image
+
+    def load_image(self, src, base_path):
+        """读取并处理图片，本地图片不存在或未启用远程图片时返回 None"""
+        if not src:
+            return None
+        if is_remote(src):
+            if not self.options.remote_images:
+                return None
+            return self.images.process_bytes(self.remote.get(src))
+        if self.resources is not None:
+            data = self.resource(src)
+            return self.images.process_bytes(data) if data is not None else None
+        return self.images.load(Path(base_path) / src)
+
+    def resource(self, src):
+        """从资源解析器读取图片字节，同一地址在一次转换中只读取一次"""
+        if src not in self._resource_data:
+            self._resource_data[src] = self.resources(src)
+        return self._resource_data[src]
+
+    def add_inline_image(self, img_element, run):
+        """在run中插入行内图片，宽度按目标分辨率计算且不超过6英寸
+
+        Returns:
+            bool: 是否插入了图片
+        """
+        try:
+            processed = self.load_image(img_element.get('src', ''), self.base_path)
+            if processed is None:
+                return False
+            width = min(IMAGE_WIDTH_INCHES, processed.width / self.options.image_dpi)
+            self.add_picture(run, processed.data, Inches(width))
+            return True
+        except Exception as e:
+            self.log_message(f"处理图片时出错: {str(e)}")
+            return False
+
+    def process_image(self, img_element, doc, base_path):
+        """处理图片
+
+        图片经 ImageProcessor 缩小和转码后嵌入；python-docx按内容的SHA-1
+        复用图片部件，相同的图片在文档中只保存一次。
+        """
+        try:
+            src = img_element.get('src', '')
+            alt = img_element.get('alt', '')
+
+            processed = self.load_image(src, base_path)
+            if processed is not None:
+                paragraph = self.add_paragraph(doc)
+                run = paragraph.add_run()
+                self.add_picture(run, processed.data, Inches(IMAGE_WIDTH_INCHES))
+
+                # 添加图片说明
+                if alt:
+                    caption = self.add_paragraph(doc, f"图片: {alt}")
+                    caption.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        except Exception as e:
+            self.log_message(f"处理图片时出错: {str(e)}")
+
+
+def create_markdown(extensions=None):
+    """创建启用了转换所需扩展的Markdown解析器
+
+    启用 toc 扩展时在其之前注册 HeadingSlugProcessor，重名标题的 id 由渲染时的
+    AnchorIndex 去重（见 anchors.py）。
+    """
+    md = markdown.Markdown(extensions=list(extensions or MARKDOWN_EXTENSIONS),
+                           extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+    if 'toc' in md.treeprocessors:
+        md.treeprocessors.register(HeadingSlugProcessor(md), 'heading_slug', 6)
+    return md
+
+
+def get_markdown(extensions=None):
+    """返回当前线程中可复用的Markdown解析器
+
+    每组扩展只创建一次解析器（避免重复加载扩展和Pygments），取用时会先重置。
+
+    Args:
+        extensions (list): Markdown扩展名列表，默认为 MARKDOWN_EXTENSIONS
+
+    Returns:
+        markdown.Markdown: 已重置的解析器
+    """
+    key = tuple(extensions or MARKDOWN_EXTENSIONS)
+    instances = getattr(_markdown_local, 'instances', None)
+    if instances is None:
+        instances = _markdown_local.instances = {}
+    md = instances.get(key)
+    if md is None:
+        md = instances[key] = create_markdown(key)
+    md.reset()
+    return md
+
+
+def clear_caches():
+    """清空模板文档缓存和当前线程的Markdown解析器"""
+    with _template_lock:
+        _template_cache.clear()
+    _markdown_local.__dict__.clear()
+
+
+def parse_markdown(md, md_content, parser='tree', metrics=None):
+    """解析Markdown文本，返回可交给 html_to_docx 的根节点
+
+    Args:
+        md (markdown.Markdown): 已重置的Markdown解析器
+        md_content (str): Markdown文本
+        parser (str): 'tree' 直接使用元素树；'html' 序列化为HTML后用BeautifulSoup解析
+        metrics (ConversionMetrics): 记录 parse 阶段（html 方式另记 soup 阶段）的耗时
+
+    Returns:
+        具有 children 属性的根节点（MarkdownTreeNode 或 BeautifulSoup）
+    """
+    metrics = metrics if metrics is not None else ConversionMetrics()
+    if parser == 'html':
+        with metrics.stage('parse'):
+            html = md.convert(md_content)
+        with metrics.stage('soup'):
+            return BeautifulSoup(html, 'html.parser')
+    with metrics.stage('parse'):
+        return parse_tree(md, md_content)
+
+
+def _notify(callback, value):
+    """调用可选的回调函数"""
+    if callback:
+        callback(value)
+
+
+def read_markdown(path, progress=None):
+    """按块读取Markdown文件，按已读取的字节数报告进度"""
+    total = os.path.getsize(path)
+    parts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for chunk in iter(lambda: f.read(IO_CHUNK_SIZE), ''):
+            parts.append(chunk)
+            if progress is not None:
+                progress.update(f.buffer.tell(), total)
+    return ''.join(parts)
+
+
+def temporary_path(path):
+    """与目标文件同目录的临时文件路径，写完后用 os.replace 原子地替换目标文件"""
+    path = Path(path)
+    return path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+
+
+class ProgressFile:
+    """统计写入字节数并报告进度的文件包装，其他操作直接交给被包装的文件
+
+    报告进度时抛出异常（取消转换）后不再写入：python-docx 不会关闭写了一半的
+    ZipFile，它被回收时仍会写入目录，而临时文件此时已关闭并删除。
+
+    Args:
+        f: 可写的二进制文件
+        progress (ProgressRange): 按已写入字节数 / total 报告进度
+        total (int): 预计写入的总字节数
+    """
+
+    def __init__(self, f, progress, total):
+        self._file = f
+        self._progress = progress
+        self._total = max(total, 1)
+        self.written = 0
+        self.aborted = False
+
+    def write(self, data):
+        if self.aborted:
+            return len(data)
+        result = self._file.write(data)
+        self.written += len(data)
+        try:
+            self._progress.update(min(self.written, self._total), self._total)
+        except BaseException:
+            self.aborted = True
+            raise
+        return result
+
+    def seek(self, *args):
+        return 0 if self.aborted else self._file.seek(*args)
+
+    def tell(self):
+        return 0 if self.aborted else self._file.tell()
+
+    def flush(self):
+        if not self.aborted:
+            self._file.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def estimated_package_size(doc):
+    """保存后文档大小的估计值（字节），用于报告保存进度
+
+    图片等二进制部件按原大小计算（压缩率很低），其他XML部件按压缩比估计；
+    正文部件很大，不为估计大小而额外序列化，按其中的元素数估计。
+    """
+    size = 0
+    for part in doc.part.package.iter_parts():
+        if part is doc.part:
+            size += sum(1 for _ in doc.element.body.iter()) * PACKED_BYTES_PER_ELEMENT
+        elif part.content_type.endswith('xml'):
+            size += len(part.blob) // XML_COMPRESSION_RATIO
+        else:
+            size += len(part.blob)
+    return size
+
+
+def save_document(doc, output_file, progress=None):
+    """保存Word文档，按已写入的字节数报告进度
+
+    文档直接写入同目录的临时文件，再重命名为输出文件，其他程序（如正在打开
+    文档的Word）不会读到写了一半的文件；写入失败或被取消时保留原有的输出文件。
+    总字节数在写入前无法得知，进度按 estimated_package_size() 估计。
+    """
+    tmp_path = temporary_path(output_file)
+    try:
+        with open(tmp_path, 'xb') as f:
+            if progress is not None:
+                f = ProgressFile(f, progress, estimated_package_size(doc))
+            doc.save(f)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    if progress is not None:
+        progress.finish()
+
+
+def finish_document(doc, output_file, progress_callback=None, metrics=None):
+    """保存转换好的文档（占总进度的90-100），并记录保存耗时和输出大小"""
+    metrics = metrics if metrics is not None else ConversionMetrics()
+    with metrics.stage('save'):
+        save_document(doc, output_file, ProgressRange(progress_callback, *PROGRESS_SAVE))
+    metrics.output_bytes = os.path.getsize(output_file)
+
+
+def write_document(doc, stream, metrics=None):
+    """把文档直接写入可写的二进制流（不要求可定位），不经过内存中的中间副本
+
+    Returns:
+        int: 写入的字节数；流不支持 tell() 时为 None
+    """
+    metrics = metrics if metrics is not None else ConversionMetrics()
+    try:
+        start = stream.tell()
+    except (AttributeError, OSError, ValueError):
+        start = None
+    with metrics.stage('save'):
+        doc.save(stream)
+    if start is None:
+        return None
+    metrics.output_bytes = stream.tell() - start
+    return metrics.output_bytes
+
+
+def convert_to_stream(source, stream, options=None, resources=None, base_path=None,
+                      log_callback=None, progress_callback=None, metrics=None):
+    """将内存中的Markdown转换为Word文档并写入二进制流，不创建任何临时文件
+
+    Args:
+        source (str | bytes | file): Markdown文本，或可读的文本/二进制流
+        stream: 可写的二进制流（文件、BytesIO、socket.makefile('wb') 等）
+        options (ConversionOptions): 转换选项
+        resources: 图片资源：映射（路径 -> 字节）、zipfile.ZipFile、zip压缩包的字节，
+            或 callable(src) -> bytes | None；为空时不嵌入本地图片
+        base_path (str): Markdown在资源中的所在目录，相对图片路径按它解析
+        log_callback (callable): 接收日志消息的回调
+        progress_callback (callable): 接收进度百分比(0-100)的回调
+        metrics (ConversionMetrics): 记录各阶段耗时、元素统计和输出大小
+
+    Returns:
+        stream: 传入的流
+    """
+    doc = convert(source, options, base_path, log_callback, progress_callback, metrics,
+                  resources=resources if resources is not None else {})
+    _notify(progress_callback, PROGRESS_SAVE[0])
+    write_document(doc, stream, metrics)
+    _notify(progress_callback, 100)
+    return stream
+
+
+def convert(source, options=None, base_path=None, log_callback=None,
+            progress_callback=None, metrics=None, resources=None):
+    """将Markdown转换为Word文档对象
+
+    进度按实际完成的工作报告：读取文件按字节数（0-10），解析（10-30），
+    渲染按已处理的块级元素数（30-90）；保存由 convert_file 报告（90-100）。
+
+    Args:
+        source (str | bytes | os.PathLike | file): Markdown文本、可读的文本或二进制流，
+            或Markdown文件路径（使用 pathlib.Path 等路径对象传入）
+        options (ConversionOptions): 转换选项，默认使用GUI的默认选项
+        base_path (str | Path): 解析相对图片路径的目录，
+            默认为输入文件所在目录或当前目录；指定 resources 时为Markdown在资源中的所在目录
+        log_callback (callable): 接收日志消息的回调
+        progress_callback (callable): 接收进度百分比(0-100)的回调
+        metrics (ConversionMetrics): 记录各阶段耗时和文档统计，为空时不统计文档
+        resources: 图片资源（映射、zipfile.ZipFile 或 callable，见 resources.py），
+            指定时本地图片只从中读取，不访问文件系统
+
+    Returns:
+        docx.document.Document: 生成的Word文档
+    """
+    options = options or ConversionOptions()
+    collect = metrics is not None
+    metrics = metrics if collect else ConversionMetrics()
+
+    # 读取Markdown内容
+    if isinstance(source, os.PathLike):
+        _notify(log_callback, "正在读取Markdown文件...")
+        with metrics.stage('read'):
+            md_content = read_markdown(source, ProgressRange(progress_callback, *PROGRESS_READ))
+        if base_path is None:
+            base_path = Path(source).parent
+    else:
+        if hasattr(source, 'read'):
+            with metrics.stage('read'):
+                source = source.read()
+        md_content = str(source, 'utf-8') if isinstance(source, (bytes, bytearray, memoryview)) \
+            else source
+    if resources is not None:
+        resolver = resource_resolver(resources, Path(base_path).as_posix() if base_path else '')
+        base_path = Path.cwd()
+    else:
+        resolver = None
+        base_path = Path(base_path) if base_path is not None else Path.cwd()
+    _notify(progress_callback, PROGRESS_PARSE[0])
+
+    # 解析Markdown
+    _notify(log_callback, "正在解析Markdown...")
+    root = parse_markdown(get_markdown(), md_content, options.parser, metrics)
+
+    # 创建Word文档
+    _notify(log_callback, "正在创建Word文档...")
+    renderer = DocumentRenderer(options, log_callback, metrics, resolver)
+    doc = renderer.new_document()
+    if options.include_toc:
+        renderer.add_toc(doc)
+    _notify(progress_callback, PROGRESS_RENDER[0])
+
+    # 将解析结果转换为Word
+    _notify(log_callback, "正在转换内容...")
+    renderer.html_to_docx(root, doc, base_path,
+                          ProgressRange(progress_callback, *PROGRESS_RENDER))
+    renderer.finish_toc()
+    _notify(progress_callback, PROGRESS_RENDER[1])
+
+    if collect:
+        metrics.input_bytes = len(md_content.encode('utf-8'))
+        metrics.collect_document(doc)
+    return doc
+
+
+def convert_file(input_file, output_file, options=None, log_callback=None,
+                 progress_callback=None, cache=None, metrics=None):
+    """转换文件
+
+    Args:
+        input_file (str): 输入的Markdown文件路径
+        output_file (str): 输出的Word文件路径
+        options (ConversionOptions): 转换选项
+        log_callback (callable): 接收日志消息的回调
+        progress_callback (callable): 接收进度百分比(0-100)的回调
+        cache (ConversionCache): 转换结果缓存，为空时不使用缓存
+        metrics (ConversionMetrics): 记录各阶段耗时、元素统计和输出大小
+
+    Returns:
+        str: 输出的Word文件路径
+
+    Raises:
+        FileNotFoundError: 输入文件不存在
+        PermissionError: 输出路径无写权限
+    """
+    options = options or ConversionOptions()
+    _notify(progress_callback, 0)
+
+    # 命中缓存时直接使用缓存的文档
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key_for(input_file, options)
+        if cache_key is not None and cache.fetch(cache_key, output_file):
+            _notify(log_callback, f"使用缓存的转换结果: {output_file}")
+            if metrics is not None:
+                metrics.cached = True
+                metrics.input_bytes = os.path.getsize(input_file)
+                metrics.output_bytes = os.path.getsize(output_file)
+            _notify(progress_callback, 100)
+            return str(output_file)
+
+    doc = convert(Path(input_file), options, log_callback=log_callback,
+                  progress_callback=progress_callback, metrics=metrics)
+
+    # 保存文档
+    _notify(log_callback, f"正在保存到: {output_file}")
+    finish_document(doc, output_file, progress_callback, metrics)
+    if cache_key is not None:
+        cache.store(cache_key, output_file)
+    _notify(progress_callback, 100)
+    return str(output_file)
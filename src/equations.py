@@ -0,0 +1,736 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数学公式
+把 python-markdown-math 识别出的LaTeX公式（$...$、\\(...\\)、$$...$$、\\[...\\] 和
+\\begin...\\end 环境）转换为Word原生公式（OMML）。支持上下标、分式、根式、大型
+运算符、\\left...\\right 定界符、重音、字体命令、函数名以及矩阵、cases 和对齐环境；
+无法识别的命令按原文输出。转换结果按规范化的LaTeX源码在内存和磁盘上缓存，一篇
+文档中未缓存的公式较多时在渲染前用进程池并行转换
+"""
+
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from docx.oxml.ns import nsdecls
+
+if __package__:
+    from .cache import ConversionCache, DEFAULT_MAX_BYTES, default_cache_dir
+else:
+    from cache import ConversionCache, DEFAULT_MAX_BYTES, default_cache_dir
+
+
+# python-markdown-math 输出的 <script> 类型
+MATH_TYPE = 'math/tex'
+DISPLAY_MATH_TYPE = 'math/tex; mode=display'
+
+# 内存中缓存的公式数上限
+MEMORY_CACHE_ENTRIES = 10000
+
+# 未缓存的公式达到该数量时才使用进程池（启动工作进程本身需要约0.1秒）
+PARALLEL_MIN_EQUATIONS = 64
+
+# 转换逻辑变化时递增，使旧的磁盘缓存失效
+RENDERER_VERSION = 1
+
+_TOKEN_RE = re.compile(r'\\([A-Za-z]+|.)|(\d+(?:\.\d+)?)|(\s+)|(.)', re.DOTALL)
+
+# 各字体命令对应的 m:rPr
+_UPRIGHT = '<m:rPr><m:sty m:val="p"/></m:rPr>'
+_TEXT = '<m:rPr><m:nor/></m:rPr>'
+_ALIGN = '<m:rPr><m:aln/></m:rPr>'
+FONTS = {
+    'mathrm': _UPRIGHT, 'rm': _UPRIGHT, 'operatorname': _UPRIGHT,
+    'mathit': '<m:rPr><m:sty m:val="i"/></m:rPr>', 'it': '<m:rPr><m:sty m:val="i"/></m:rPr>',
+    'mathbf': '<m:rPr><m:sty m:val="b"/></m:rPr>', 'bf': '<m:rPr><m:sty m:val="b"/></m:rPr>',
+    'boldsymbol': '<m:rPr><m:sty m:val="bi"/></m:rPr>',
+    'bm': '<m:rPr><m:sty m:val="bi"/></m:rPr>',
+    'mathbb': '<m:rPr><m:scr m:val="double-struck"/><m:sty m:val="p"/></m:rPr>',
+    'mathcal': '<m:rPr><m:scr m:val="script"/><m:sty m:val="p"/></m:rPr>',
+    'cal': '<m:rPr><m:scr m:val="script"/><m:sty m:val="p"/></m:rPr>',
+    'mathscr': '<m:rPr><m:scr m:val="script"/><m:sty m:val="p"/></m:rPr>',
+    'mathfrak': '<m:rPr><m:scr m:val="fraktur"/><m:sty m:val="p"/></m:rPr>',
+    'mathsf': '<m:rPr><m:scr m:val="sans-serif"/><m:sty m:val="p"/></m:rPr>',
+    'mathtt': '<m:rPr><m:scr m:val="monospace"/><m:sty m:val="p"/></m:rPr>',
+}
+
+# 按原文输出的文本命令
+TEXT_COMMANDS = ('text', 'textrm', 'textnormal', 'mbox', 'textit', 'textbf', 'mathnormal')
+
+SYMBOLS = {
+    # 希腊字母
+    'alpha': 'α', 'beta': 'β', 'gamma': 'γ', 'delta': 'δ', 'epsilon': 'ϵ',
+    'varepsilon': 'ε', 'zeta': 'ζ', 'eta': 'η', 'theta': 'θ', 'vartheta': 'ϑ',
+    'iota': 'ι', 'kappa': 'κ', 'lambda': 'λ', 'mu': 'μ', 'nu': 'ν', 'xi': 'ξ',
+    'omicron': 'ο', 'pi': 'π', 'varpi': 'ϖ', 'rho': 'ρ', 'varrho': 'ϱ', 'sigma': 'σ',
+    'varsigma': 'ς', 'tau': 'τ', 'upsilon': 'υ', 'phi': 'ϕ', 'varphi': 'φ', 'chi': 'χ',
+    'psi': 'ψ', 'omega': 'ω', 'Gamma': 'Γ', 'Delta': 'Δ', 'Theta': 'Θ', 'Lambda': 'Λ',
+    'Xi': 'Ξ', 'Pi': 'Π', 'Sigma': 'Σ', 'Upsilon': 'Υ', 'Phi': 'Φ', 'Psi': 'Ψ',
+    'Omega': 'Ω',
+    # 二元运算符
+    'pm': '±', 'mp': '∓', 'times': '×', 'div': '÷', 'cdot': '⋅', 'ast': '∗',
+    'star': '⋆', 'circ': '∘', 'bullet': '∙', 'oplus': '⊕', 'ominus': '⊖',
+    'otimes': '⊗', 'oslash': '⊘', 'odot': '⊙', 'cup': '∪', 'cap': '∩', 'sqcup': '⊔',
+    'sqcap': '⊓', 'vee': '∨', 'lor': '∨', 'wedge': '∧', 'land': '∧', 'setminus': '∖',
+    'wr': '≀', 'amalg': '⨿', 'dagger': '†', 'ddagger': '‡',
+    # 关系符
+    'le': '≤', 'leq': '≤', 'ge': '≥', 'geq': '≥', 'neq': '≠', 'ne': '≠', 'll': '≪',
+    'gg': '≫', 'leqslant': '⩽', 'geqslant': '⩾', 'approx': '≈', 'sim': '∼',
+    'simeq': '≃', 'cong': '≅', 'equiv': '≡', 'propto': '∝', 'prec': '≺', 'succ': '≻',
+    'preceq': '⪯', 'succeq': '⪰', 'subset': '⊂', 'supset': '⊃', 'subseteq': '⊆',
+    'supseteq': '⊇', 'subsetneq': '⊊', 'supsetneq': '⊋', 'in': '∈', 'notin': '∉',
+    'ni': '∋', 'perp': '⊥', 'parallel': '∥', 'mid': '∣', 'nmid': '∤', 'vdash': '⊢',
+    'dashv': '⊣', 'models': '⊨', 'asymp': '≍', 'doteq': '≐', 'coloneqq': '≔',
+    # 箭头
+    'to': '→', 'rightarrow': '→', 'leftarrow': '←', 'gets': '←',
+    'leftrightarrow': '↔', 'Rightarrow': '⇒', 'Leftarrow': '⇐',
+    'Leftrightarrow': '⇔', 'iff': '⟺', 'implies': '⟹', 'impliedby': '⟸',
+    'mapsto': '↦', 'longrightarrow': '⟶', 'longleftarrow': '⟵',
+    'Longrightarrow': '⟹', 'Longleftarrow': '⟸', 'longmapsto': '⟼', 'uparrow': '↑',
+    'downarrow': '↓', 'updownarrow': '↕', 'Uparrow': '⇑', 'Downarrow': '⇓',
+    'nearrow': '↗', 'searrow': '↘', 'swarrow': '↙', 'nwarrow': '↖',
+    'hookrightarrow': '↪', 'hookleftarrow': '↩', 'rightleftharpoons': '⇌',
+    # 其他符号
+    'infty': '∞', 'partial': '∂', 'nabla': '∇', 'forall': '∀', 'exists': '∃',
+    'nexists': '∄', 'emptyset': '∅', 'varnothing': '∅', 'neg': '¬', 'lnot': '¬',
+    'aleph': 'ℵ', 'hbar': 'ℏ', 'ell': 'ℓ', 'wp': '℘', 'Re': 'ℜ', 'Im': 'ℑ',
+    'angle': '∠', 'triangle': '△', 'square': '□', 'Box': '□', 'top': '⊤', 'bot': '⊥',
+    'ldots': '…', 'dots': '…', 'cdots': '⋯', 'vdots': '⋮', 'ddots': '⋱',
+    'prime': '′', 'degree': '°', 'therefore': '∴', 'because': '∵', 'checkmark': '✓',
+    'clubsuit': '♣', 'diamondsuit': '♢', 'heartsuit': '♡', 'spadesuit': '♠',
+    'imath': 'ı', 'jmath': 'ȷ', 'S': '§', 'P': '¶', 'dag': '†', 'colon': ':',
+    # 定界符
+    'langle': '⟨', 'rangle': '⟩', 'lvert': '|', 'rvert': '|', 'vert': '|',
+    'lVert': '‖', 'rVert': '‖', 'Vert': '‖', '|': '‖', 'lfloor': '⌊', 'rfloor': '⌋',
+    'lceil': '⌈', 'rceil': '⌉', 'lbrace': '{', 'rbrace': '}', 'lbrack': '[',
+    'rbrack': ']', 'backslash': '\\', '{': '{', '}': '}',
+    # 转义字符和空白
+    '#': '#', '$': '$', '%': '%', '&': '&', '_': '_',
+    ',': '\u2009', ':': '\u2005', '>': '\u2005', ';': '\u2004', ' ': ' ',
+    'quad': '\u2003', 'qquad': '\u2003\u2003', 'enspace': '\u2002',
+}
+
+# 大型运算符：符号和上下限位置
+BIG_OPERATORS = {
+    'sum': ('∑', 'undOvr'), 'prod': ('∏', 'undOvr'), 'coprod': ('∐', 'undOvr'),
+    'bigcup': ('⋃', 'undOvr'), 'bigcap': ('⋂', 'undOvr'), 'bigvee': ('⋁', 'undOvr'),
+    'bigwedge': ('⋀', 'undOvr'), 'bigoplus': ('⨁', 'undOvr'),
+    'bigotimes': ('⨂', 'undOvr'), 'bigodot': ('⨀', 'undOvr'),
+    'bigsqcup': ('⨆', 'undOvr'), 'biguplus': ('⨄', 'undOvr'),
+    'int': ('∫', 'subSup'), 'iint': ('∬', 'subSup'), 'iiint': ('∭', 'subSup'),
+    'oint': ('∮', 'subSup'), 'oiint': ('∯', 'subSup'),
+}
+
+# 直立显示的函数名；LIMIT_FUNCTIONS 的下标放在正下方
+FUNCTIONS = (
+    'sin', 'cos', 'tan', 'cot', 'sec', 'csc', 'arcsin', 'arccos', 'arctan', 'sinh',
+    'cosh', 'tanh', 'coth', 'log', 'ln', 'lg', 'exp', 'det', 'dim', 'ker', 'deg', 'arg',
+    'gcd', 'hom', 'Pr', 'mod', 'bmod',
+)
+LIMIT_FUNCTIONS = ('lim', 'limsup', 'liminf', 'max', 'min', 'sup', 'inf', 'argmax', 'argmin')
+_FUNCTION_NAMES = {'limsup': 'lim sup', 'liminf': 'lim inf', 'argmax': 'arg max',
+                   'argmin': 'arg min', 'bmod': 'mod'}
+
+# 重音命令对应的组合字符
+ACCENTS = {
+    'hat': '\u0302', 'widehat': '\u0302', 'tilde': '\u0303', 'widetilde': '\u0303',
+    'bar': '\u0305', 'vec': '\u20d7', 'overrightarrow': '\u20d7', 'dot': '\u0307',
+    'ddot': '\u0308', 'check': '\u030c', 'breve': '\u0306', 'acute': '\u0301',
+    'grave': '\u0300', 'mathring': '\u030a',
+}
+
+# 大括号：符号和位置
+GROUP_CHARS = {'overbrace': ('⏞', 'top'), 'underbrace': ('⏟', 'bot')}
+
+# 矩阵环境的定界符
+MATRIX_DELIMITERS = {
+    'matrix': None, 'smallmatrix': None, 'array': None,
+    'pmatrix': ('(', ')'), 'bmatrix': ('[', ']'), 'Bmatrix': ('{', '}'),
+    'vmatrix': ('|', '|'), 'Vmatrix': ('‖', '‖'),
+}
+
+# 不影响输出的命令（大小、间距和编号）
+IGNORED = (
+    'displaystyle', 'textstyle', 'scriptstyle', 'scriptscriptstyle', 'limits', 'nolimits',
+    'big', 'Big', 'bigg', 'Bigg', 'bigl', 'bigr', 'Bigl', 'Bigr', 'biggl', 'biggr',
+    'Biggl', 'Biggr', 'nonumber', 'notag', '!', 'left', 'right', 'middle',
+)
+IGNORED_WITH_ARGUMENT = ('label', 'tag', 'hspace', 'vspace', 'phantom')
+
+
+def default_equation_cache_dir():
+    """返回默认的公式缓存目录"""
+    return os.path.join(os.path.dirname(default_cache_dir()), 'equations')
+
+
+def normalize_latex(tex):
+    """规范化LaTeX源码（合并空白），作为缓存键"""
+    return ' '.join(tex.split())
+
+
+def math_source(element):
+    """返回 python-markdown-math 公式元素的 (LaTeX源码, 是否为独立公式)，不是公式时返回 None"""
+    kind = element.get('type', '')
+    if kind not in (MATH_TYPE, DISPLAY_MATH_TYPE):
+        return None
+    return element.get_text(), kind == DISPLAY_MATH_TYPE
+
+
+def math_xml(omml, display=False):
+    """把 latex_to_omml() 的结果包装为行内公式（m:oMath）或独立公式（m:oMathPara）"""
+    if display:
+        return f'<m:oMathPara {nsdecls("m")}><m:oMath>{omml}</m:oMath></m:oMathPara>'
+    return f'<m:oMath {nsdecls("m")}>{omml}</m:oMath>'
+
+
+def latex_to_omml(tex):
+    """把LaTeX公式转换为OMML
+
+    Returns:
+        str: m:oMath 元素的内容（不含 m:oMath 本身）；无法解析时为原文
+    """
+    try:
+        return _LatexParser(tex).parse()
+    except (RecursionError, IndexError, ValueError):
+        return _run_xml(tex, _TEXT)
+
+
+def _run_xml(text, rpr=''):
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<m:r>{rpr}<m:t{space}>{escape(text)}</m:t></m:r>'
+
+
+def _attr(value):
+    return escape(value, {'"': '&quot;'})
+
+
+def _join(items):
+    """把解析得到的项拼接为XML，相邻的同格式文字合并为一个 m:r"""
+    parts = []
+    text = []
+    rpr = None
+    for item in items:
+        if isinstance(item, _Run):
+            if text and item.rpr != rpr:
+                parts.append(_run_xml(''.join(text), rpr))
+                text = []
+            text.append(item.text)
+            rpr = item.rpr
+            continue
+        if text:
+            parts.append(_run_xml(''.join(text), rpr))
+            text = []
+        parts.append(item.xml() if isinstance(item, _Nary) else item)
+    if text:
+        parts.append(_run_xml(''.join(text), rpr))
+    return ''.join(parts)
+
+
+class _Run:
+    """一段文字；limits 为真时下标放在正下方（lim、max 等）"""
+
+    __slots__ = ('text', 'rpr', 'limits')
+
+    def __init__(self, text, rpr='', limits=False):
+        self.text = text
+        self.rpr = rpr
+        self.limits = limits
+
+
+class _Limits(str):
+    """上下标放在正上方/正下方的结构（\\underbrace 等）"""
+
+    limits = True
+
+
+class _Nary:
+    """大型运算符，上下限和运算对象在解析到时填入"""
+
+    __slots__ = ('char', 'location', 'sub', 'sup', 'operand')
+
+    def __init__(self, char, location):
+        self.char = char
+        self.location = location
+        self.sub = None
+        self.sup = None
+        self.operand = None
+
+    def xml(self):
+        props = [f'<m:chr m:val="{self.char}"/><m:limLoc m:val="{self.location}"/>']
+        if self.sub is None:
+            props.append('<m:subHide m:val="1"/>')
+        if self.sup is None:
+            props.append('<m:supHide m:val="1"/>')
+        operand = _join([self.operand]) if self.operand is not None else ''
+        return (f'<m:nary><m:naryPr>{"".join(props)}</m:naryPr>'
+                f'<m:sub>{self.sub or ""}</m:sub><m:sup>{self.sup or ""}</m:sup>'
+                f'<m:e>{operand}</m:e></m:nary>')
+
+
+class _LatexParser:
+    """递归下降的LaTeX公式解析器，直接生成OMML"""
+
+    def __init__(self, tex):
+        # 记号：(命令名或None, 文字)；命令名为 None 时是普通字符、数字或空白
+        self.tokens = []
+        for match in _TOKEN_RE.finditer(tex):
+            command, number, space, char = match.groups()
+            if command is not None:
+                self.tokens.append((command, match.group(0)))
+            elif space is not None:
+                self.tokens.append((None, ' '))
+            else:
+                self.tokens.append((None, number or char))
+        self.pos = 0
+        self.rpr = ''
+
+    def parse(self):
+        return self.parse_rows(None)
+
+    # 记号读取
+
+    def peek(self):
+        """下一个非空白记号，没有时返回 (None, None)"""
+        while self.pos < len(self.tokens) and self.tokens[self.pos] == (None, ' '):
+            self.pos += 1
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None, None
+
+    def next(self):
+        token = self.peek()
+        if token[1] is not None:
+            self.pos += 1
+        return token
+
+    def raw_group(self):
+        """读取 {...} 中的原文（用于 \\text 和环境名）"""
+        if self.peek() != (None, '{'):
+            return self.next()[1] or ''
+        self.pos += 1
+        depth = 0
+        text = []
+        while self.pos < len(self.tokens):
+            command, value = self.tokens[self.pos]
+            self.pos += 1
+            if command is None and value == '{':
+                depth += 1
+            elif command is None and value == '}':
+                if not depth:
+                    break
+                depth -= 1
+            elif command is not None and command in SYMBOLS and not command.isalpha():
+                # \{、\$ 等转义字符
+                value = SYMBOLS[command]
+            text.append(value)
+        return ''.join(text)
+
+    # 结构
+
+    def parse_sequence(self, stops):
+        """解析到 stops 中的记号（按原文比较，不消耗）或结尾为止，返回项列表"""
+        items = []
+        while True:
+            command, value = self.peek()
+            if value is None or value in stops:
+                return items
+            if command is None and value in ('^', '_', "'"):
+                self.attach_scripts(items)
+                continue
+            self.pos += 1
+            item = self.parse_token(command, value, stops)
+            if item is None:
+                continue
+            if items and isinstance(items[-1], _Nary) and items[-1].operand is None:
+                items[-1].operand = item
+            else:
+                items.append(item)
+
+    def parse_group(self):
+        """解析 {...}，返回拼接好的XML"""
+        rpr = self.rpr
+        items = self.parse_sequence(('}',))
+        self.next()
+        self.rpr = rpr
+        return _join(items)
+
+    def parse_argument(self):
+        """命令的一个参数：{...} 或单个记号"""
+        command, value = self.peek()
+        if value is None:
+            return ''
+        if command is None and value == '{':
+            self.pos += 1
+            return self.parse_group()
+        if command is None and len(value) > 1:
+            # \frac12：数字记号拆开，只取第一位
+            self.tokens[self.pos] = (None, value[1:])
+            return _join([self.char(value[0])])
+        self.pos += 1
+        item = self.parse_token(command, value, ())
+        return _join([item]) if item is not None else ''
+
+    def optional_argument(self):
+        """可选参数 [...]，没有时返回 None"""
+        if self.peek() != (None, '['):
+            return None
+        self.pos += 1
+        items = self.parse_sequence((']',))
+        self.next()
+        return _join(items)
+
+    def attach_scripts(self, items):
+        """把上标、下标和撇号附加到前一项"""
+        sub = sup = None
+        primes = ''
+        while True:
+            command, value = self.peek()
+            if command is not None or value not in ('^', '_', "'"):
+                break
+            self.pos += 1
+            if value == "'":
+                primes += '′'
+            elif value == '^' and sup is None:
+                sup = self.parse_argument()
+            elif value == '_' and sub is None:
+                sub = self.parse_argument()
+            else:
+                break
+        if primes:
+            sup = _run_xml(primes) + (sup or '')
+
+        base = items.pop() if items else _Run('')
+        if isinstance(base, _Nary):
+            if base.operand is None and not primes:
+                base.sub = sub if sub is not None else base.sub
+                base.sup = sup if sup is not None else base.sup
+                items.append(base)
+                return
+            base.operand = self.scripts(base.operand or _Run(''), sub, sup)
+            items.append(base)
+            return
+        items.append(self.scripts(base, sub, sup))
+
+    def scripts(self, base, sub, sup):
+        e = _join([base])
+        if getattr(base, 'limits', False):
+            if sub is not None:
+                e = f'<m:limLow><m:e>{e}</m:e><m:lim>{sub}</m:lim></m:limLow>'
+            if sup is not None:
+                e = f'<m:limUpp><m:e>{e}</m:e><m:lim>{sup}</m:lim></m:limUpp>'
+            return e
+        if sub is not None and sup is not None:
+            return (f'<m:sSubSup><m:e>{e}</m:e><m:sub>{sub}</m:sub>'
+                    f'<m:sup>{sup}</m:sup></m:sSubSup>')
+        if sup is not None:
+            return f'<m:sSup><m:e>{e}</m:e><m:sup>{sup}</m:sup></m:sSup>'
+        return f'<m:sSub><m:e>{e}</m:e><m:sub>{sub}</m:sub></m:sSub>'
+
+    def char(self, value):
+        if value == '-':
+            value = '−'
+        elif value == '~':
+            value = '\u00a0'
+        return _Run(value, self.rpr)
+
+    def parse_token(self, command, value, stops):
+        """解析一个记号，返回一项（_Run、_Nary 或XML），不产生输出时返回 None"""
+        if command is None:
+            if value == '{':
+                return self.parse_group()
+            if value in ('}', '&'):
+                # 多余的右括号，或环境外的对齐符
+                return None
+            return self.char(value)
+
+        if command in FONTS:
+            if command.isalpha() and len(command) <= 3 and command != 'bm':
+                # \bf、\rm 等旧式字体命令作用到组的结尾
+                self.rpr = FONTS[command]
+                return None
+            if command == 'operatorname' and self.peek() == (None, '*'):
+                self.pos += 1
+                rpr, self.rpr = self.rpr, FONTS[command]
+                text = self.parse_argument()
+                self.rpr = rpr
+                return _Limits(text)
+            rpr, self.rpr = self.rpr, FONTS[command]
+            text = self.parse_argument()
+            self.rpr = rpr
+            return text
+        if command in TEXT_COMMANDS:
+            return _Run(self.raw_group(), _TEXT)
+        if command in SYMBOLS:
+            return _Run(SYMBOLS[command], self.rpr)
+        if command in BIG_OPERATORS:
+            return _Nary(*BIG_OPERATORS[command])
+        if command in FUNCTIONS or command in LIMIT_FUNCTIONS:
+            return _Run(_FUNCTION_NAMES.get(command, command), _UPRIGHT,
+                        limits=command in LIMIT_FUNCTIONS)
+        if command in ('frac', 'dfrac', 'tfrac', 'cfrac'):
+            num = self.parse_argument()
+            den = self.parse_argument()
+            return f'<m:f><m:num>{num}</m:num><m:den>{den}</m:den></m:f>'
+        if command in ('binom', 'dbinom', 'tbinom'):
+            top = self.parse_argument()
+            bottom = self.parse_argument()
+            return (f'<m:d><m:e><m:f><m:fPr><m:type m:val="noBar"/></m:fPr>'
+                    f'<m:num>{top}</m:num><m:den>{bottom}</m:den></m:f></m:e></m:d>')
+        if command == 'sqrt':
+            degree = self.optional_argument()
+            e = self.parse_argument()
+            if degree is None:
+                return (f'<m:rad><m:radPr><m:degHide m:val="1"/></m:radPr><m:deg/>'
+                        f'<m:e>{e}</m:e></m:rad>')
+            return f'<m:rad><m:deg>{degree}</m:deg><m:e>{e}</m:e></m:rad>'
+        if command in ACCENTS:
+            e = self.parse_argument()
+            return (f'<m:acc><m:accPr><m:chr m:val="{ACCENTS[command]}"/></m:accPr>'
+                    f'<m:e>{e}</m:e></m:acc>')
+        if command in ('overline', 'underline'):
+            pos = 'top' if command == 'overline' else 'bot'
+            e = self.parse_argument()
+            return f'<m:bar><m:barPr><m:pos m:val="{pos}"/></m:barPr><m:e>{e}</m:e></m:bar>'
+        if command in GROUP_CHARS:
+            chr_, pos = GROUP_CHARS[command]
+            e = self.parse_argument()
+            return _Limits(f'<m:groupChr><m:groupChrPr><m:chr m:val="{chr_}"/>'
+                           f'<m:pos m:val="{pos}"/></m:groupChrPr><m:e>{e}</m:e></m:groupChr>')
+        if command in ('overset', 'stackrel', 'underset'):
+            script = self.parse_argument()
+            e = self.parse_argument()
+            kind = 'limLow' if command == 'underset' else 'limUpp'
+            return f'<m:{kind}><m:e>{e}</m:e><m:lim>{script}</m:lim></m:{kind}>'
+        if command == 'left':
+            return self.parse_delimited()
+        if command == 'begin':
+            return self.parse_environment(self.raw_group())
+        if command == 'end':
+            # 没有对应 \begin 的 \end
+            self.raw_group()
+            return None
+        if command == 'not':
+            # 否定：在下一个符号上叠加斜线
+            command, value = self.next()
+            if command is not None:
+                value = SYMBOLS.get(command, value)
+            return _Run((value or '') + '\u0338', self.rpr)
+        if command == 'pmod':
+            e = self.parse_argument()
+            return f'<m:d><m:e>{_run_xml("mod", _UPRIGHT)}{_run_xml(" ")}{e}</m:e></m:d>'
+        if command in IGNORED:
+            return None
+        if command in IGNORED_WITH_ARGUMENT:
+            self.raw_group()
+            return None
+        if command == '\\':
+            return None
+        # 未知命令按原文输出
+        return _Run(value, _TEXT)
+
+    def delimiter(self):
+        """\\left、\\right 后的定界符（“.”表示不显示）"""
+        command, value = self.next()
+        if value is None or value == '.':
+            return ''
+        if command is not None:
+            return SYMBOLS.get(command, '')
+        return value
+
+    def parse_delimited(self):
+        begin = self.delimiter()
+        items = self.parse_sequence(('\\right',))
+        if self.next()[0] == 'right':
+            end = self.delimiter()
+        else:
+            end = ''
+        return (f'<m:d><m:dPr><m:begChr m:val="{_attr(begin)}"/><m:endChr m:val="{_attr(end)}"/>'
+                f'</m:dPr><m:e>{_join(items)}</m:e></m:d>')
+
+    def parse_cells(self, name):
+        """解析环境或整个公式的行和单元格，返回行列表（每行为单元格XML列表）"""
+        stops = ('&', '\\\\', '\\end')
+        rows = [[]]
+        while True:
+            rows[-1].append(self.parse_sequence(stops))
+            command, value = self.next()
+            if value is None:
+                break
+            if command == 'end':
+                self.raw_group()
+                if name is not None:
+                    break
+                # 公式中多余的 \end
+                continue
+            if command == '\\':
+                # \\[2pt] 中的间距
+                self.optional_argument()
+                rows.append([])
+        if len(rows) > 1 and rows[-1] == [[]]:
+            rows.pop()
+        return rows
+
+    def parse_rows(self, name):
+        """解析对齐环境（或整个公式）：多行时为公式数组，& 处对齐"""
+        rows = self.parse_cells(name)
+        lines = []
+        for cells in rows:
+            items = list(cells[0])
+            for cell in cells[1:]:
+                items.append(_Run('', _ALIGN))
+                items.extend(cell)
+            lines.append(items)
+        if len(lines) == 1:
+            return _join([item for item in lines[0] if not (
+                isinstance(item, _Run) and item.rpr == _ALIGN)])
+        return '<m:eqArr>' + ''.join(f'<m:e>{_join(line)}</m:e>' for line in lines) + '</m:eqArr>'
+
+    def parse_environment(self, name):
+        name = name.rstrip('*')
+        if name in ('array', 'alignat', 'subarray'):
+            # 列格式说明
+            self.raw_group()
+        if name in MATRIX_DELIMITERS or name == 'cases' or name == 'array':
+            rows = self.parse_cells(name)
+            matrix = self.matrix_xml(rows, 'left' if name == 'cases' else 'center')
+            if name == 'cases':
+                return (f'<m:d><m:dPr><m:begChr m:val="{{"/><m:endChr m:val=""/></m:dPr>'
+                        f'<m:e>{matrix}</m:e></m:d>')
+            delimiters = MATRIX_DELIMITERS.get(name)
+            if delimiters is None:
+                return matrix
+            begin, end = delimiters
+            return (f'<m:d><m:dPr><m:begChr m:val="{begin}"/><m:endChr m:val="{end}"/></m:dPr>'
+                    f'<m:e>{matrix}</m:e></m:d>')
+        return self.parse_rows(name)
+
+    def matrix_xml(self, rows, justification):
+        columns = max(len(cells) for cells in rows)
+        body = ''.join(
+            '<m:mr>' + ''.join(f'<m:e>{_join(cell)}</m:e>' for cell in cells)
+            + '<m:e/>' * (columns - len(cells)) + '</m:mr>'
+            for cells in rows)
+        return (f'<m:m><m:mPr><m:mcs><m:mc><m:mcPr><m:count m:val="{columns}"/>'
+                f'<m:mcJc m:val="{justification}"/></m:mcPr></m:mc></m:mcs></m:mPr>'
+                f'{body}</m:m>')
+
+
+class EquationCache(ConversionCache):
+    """转换后公式的磁盘缓存"""
+
+    suffix = '.omml'
+
+    def get(self, key):
+        entry = self._entry_path(key)
+        try:
+            data = entry.read_bytes()
+            os.utime(entry)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return data.decode('utf-8')
+
+    def put(self, key, omml):
+        self._write_entry(key, BytesIO(omml.encode('utf-8')))
+        self.stats.stores += 1
+        self.maybe_evict()
+
+
+class EquationRenderer:
+    """带缓存的公式转换器
+
+    Args:
+        cache_dir (str): 磁盘缓存目录，为空时只在内存中缓存
+        workers (int): 并行转换的进程数（解析是纯Python代码，线程无法并行）
+        max_bytes (int): 磁盘缓存总大小上限
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir=None, workers=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.disk_cache = EquationCache(cache_dir, max_bytes) if cache_dir else None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """返回进程内共享的转换器，使多次转换复用转换结果"""
+        key = (str(cache_dir) if cache_dir else None, max_bytes)
+        with cls._shared_lock:
+            renderer = cls._shared.get(key)
+            if renderer is None:
+                renderer = cls._shared[key] = cls(cache_dir, max_bytes=max_bytes)
+            return renderer
+
+    def render(self, tex, display=False):
+        """公式的 m:oMath（display 为真时为 m:oMathPara）XML"""
+        return math_xml(self.omml(tex), display)
+
+    def omml(self, tex):
+        """LaTeX公式转换为OMML，结果按规范化的源码缓存"""
+        source = normalize_latex(tex)
+        omml = self._cached(source)
+        if omml is None:
+            omml = latex_to_omml(source)
+            self._store(source, omml)
+        return omml
+
+    def prepare(self, sources):
+        """转换一组公式，结果放入缓存
+
+        未缓存的公式较多时用进程池并行转换；已在工作进程中（批量、书籍模式和
+        转换服务的进程池）时不再嵌套进程池。
+        """
+        missing = [source for source in dict.fromkeys(normalize_latex(t) for t in sources)
+                   if self._cached(source) is None]
+        if (len(missing) < PARALLEL_MIN_EQUATIONS or self.workers <= 1
+                or multiprocessing.parent_process() is not None):
+            for source in missing:
+                self._store(source, latex_to_omml(source))
+            return
+        workers = min(self.workers, len(missing) // PARALLEL_MIN_EQUATIONS + 1)
+        chunksize = max(1, len(missing) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for source, omml in zip(missing, executor.map(latex_to_omml, missing,
+                                                          chunksize=chunksize)):
+                self._store(source, omml)
+
+    def _cached(self, source):
+        """内存或磁盘缓存中的转换结果，没有时返回 None"""
+        with self._lock:
+            omml = self._memory.get(source)
+            if omml is not None:
+                self._memory.move_to_end(source)
+                return omml
+        if self.disk_cache is None:
+            return None
+        omml = self.disk_cache.get(self._disk_key(source))
+        if omml is not None:
+            self._remember(source, omml)
+        return omml
+
+    def _store(self, source, omml):
+        self._remember(source, omml)
+        if self.disk_cache is not None:
+            self.disk_cache.put(self._disk_key(source), omml)
+
+    def _disk_key(self, source):
+        digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        return f"{digest}-v{RENDERER_VERSION}"
+
+    def _remember(self, source, omml):
+        with self._lock:
+            self._memory[source] = omml
+            self._memory.move_to_end(source)
+            while len(self._memory) > MEMORY_CACHE_ENTRIES:
+                self._memory.popitem(last=False)
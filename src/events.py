@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面事件通道
+工作线程只把日志、状态和进度事件放入线程安全的队列，由Tk主循环定时取出并
+合并后一次性更新界面；日志按行数上限保留最近的内容。本模块不依赖Tkinter。
+"""
+
+import queue
+from collections import deque
+
+
+# 日志视图最多保留的行数
+DEFAULT_LOG_LINES = 1000
+
+# 单次取出的最大事件数，避免大量日志时阻塞主循环
+MAX_EVENTS_PER_DRAIN = 5000
+
+# 事件类型
+LOG = 'log'
+STATUS = 'status'
+PROGRESS = 'progress'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+
+class EventBatch:
+    """一次取出并合并后的事件
+
+    Attributes:
+        logs (list): 按顺序排列的日志消息
+        status (str): 最新的状态文本，没有更新时为 None
+        progress (float): 最新的进度，没有更新时为 None
+        results (list): 转换结束事件 (类型, 数据)，按顺序排列
+    """
+
+    __slots__ = ('logs', 'status', 'progress', 'results')
+
+    def __init__(self):
+        self.logs = []
+        self.status = None
+        self.progress = None
+        self.results = []
+
+    def __bool__(self):
+        return bool(self.logs or self.results) or self.status is not None \
+            or self.progress is not None
+
+
+class EventChannel:
+    """工作线程到界面线程的事件通道
+
+    所有 post 方法都可以在任意线程中调用；drain() 只应在界面线程中调用。
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def post(self, kind, payload=None):
+        """放入一个事件"""
+        self._queue.put((kind, payload))
+
+    def log(self, message):
+        self.post(LOG, message)
+
+    def status(self, message):
+        self.post(STATUS, message)
+
+    def progress(self, value):
+        self.post(PROGRESS, value)
+
+    def finished(self, payload=None):
+        self.post(FINISHED, payload)
+
+    def failed(self, error):
+        self.post(FAILED, error)
+
+    def drain(self, max_events=MAX_EVENTS_PER_DRAIN):
+        """取出当前队列中的事件并合并
+
+        连续的状态和进度更新只保留最后一个，日志保持顺序。
+
+        Returns:
+            EventBatch: 合并后的事件
+        """
+        batch = EventBatch()
+        for _ in range(max_events):
+            try:
+                kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == LOG:
+                batch.logs.append(payload)
+            elif kind == STATUS:
+                batch.status = payload
+            elif kind == PROGRESS:
+                batch.progress = payload
+            else:
+                batch.results.append((kind, payload))
+        return batch
+
+
+class LogBuffer:
+    """环形日志缓冲区，只保留最近的 max_lines 行
+
+    Args:
+        max_lines (int): 最多保留的行数
+    """
+
+    def __init__(self, max_lines=DEFAULT_LOG_LINES):
+        self.max_lines = max_lines
+        self.lines = deque(maxlen=max_lines)
+        self.dropped = 0
+
+    def extend(self, messages):
+        """追加消息（多行消息按行拆分），返回需要从视图顶部删除的行数"""
+        before = len(self.lines)
+        added = 0
+        for message in messages:
+            for line in str(message).split('\n'):
+                self.lines.append(line)
+                added += 1
+        overflow = max(0, before + added - self.max_lines)
+        self.dropped += overflow
+        return overflow
+
+    def clear(self):
+        self.lines.clear()
+        self.dropped = 0
+
+    def text(self):
+        return '\n'.join(self.lines)
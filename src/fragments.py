@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WordprocessingML片段
+把渲染好的正文元素连同其引用的关系（图片、外部链接）保存为可序列化的片段，
+并在另一个文档中拼接回去；拼接时重新分配关系ID、图形对象ID和书签ID，
+保证结果文档中的ID唯一；片段带有标题锚点时登记到目标文档的锚点索引，重名
+标题的书签名加后缀。增量转换、多文件合并和并行渲染都基于此模块。
+"""
+
+from io import BytesIO
+from lxml import etree
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+
+# 元素上引用关系ID的属性
+REL_ATTRIBUTES = (qn('r:embed'), qn('r:id'), qn('r:link'))
+
+_BOOKMARK_TAGS = (qn('w:bookmarkStart'), qn('w:bookmarkEnd'))
+_DOCPR_TAGS = ('{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}docPr',)
+
+# 正文中带有关系ID属性的元素：图片、超链接、图表、SmartArt、VML图片和嵌入内容
+_REL_TAGS = (qn('a:blip'), qn('a:hlinkClick'), qn('a:hlinkHover'), qn('w:hyperlink'),
+             qn('c:chart'), qn('dgm:relIds'), qn('w:altChunk'),
+             '{urn:schemas-microsoft-com:vml}imagedata',
+             '{urn:schemas-microsoft-com:office:office}OLEObject')
+
+# 一次解析片段中所有元素时包裹它们的容器
+_CONTAINER = (f'<w:body {nsdecls("w")}>'.encode(), b'</w:body>')
+
+
+class Fragment:
+    """一组正文元素及其引用的关系
+
+    Attributes:
+        elements (list): 每个正文元素序列化后的XML字节串
+        images (dict): 关系ID -> 图片字节
+        external (dict): 关系ID -> (关系类型, 外部目标地址)
+        anchors (list): 按文档顺序排列的标题锚点 (锚点, 级别, 标题文字, 书签名)，
+            见 AnchorIndex.headings
+    """
+
+    __slots__ = ('elements', 'images', 'external', 'anchors')
+
+    def __init__(self, elements=None, images=None, external=None, anchors=None):
+        self.elements = elements or []
+        self.images = images or {}
+        self.external = external or {}
+        self.anchors = anchors or []
+
+    def __getstate__(self):
+        return self.elements, self.images, self.external, self.anchors
+
+    def __setstate__(self, state):
+        self.elements, self.images, self.external, self.anchors = state
+
+    @property
+    def size(self):
+        """片段的大致字节数"""
+        return sum(len(x) for x in self.elements) + sum(len(b) for b in self.images.values())
+
+
+def body_elements(doc):
+    """返回正文中除分节属性(sectPr)以外的块级元素"""
+    return [child for child in doc.element.body if child.tag != qn('w:sectPr')]
+
+
+def last_block(doc):
+    """返回正文中最后一个块级元素（不含sectPr），正文为空时返回 None"""
+    body = doc.element.body
+    for child in reversed(body):
+        if child.tag != qn('w:sectPr'):
+            return child
+    return None
+
+
+def blocks_after(doc, marker):
+    """返回 marker 之后追加的块级元素
+
+    Args:
+        doc (docx.document.Document): 文档
+        marker: 渲染前 last_block() 的返回值
+    """
+    siblings = marker.itersiblings() if marker is not None else iter(doc.element.body)
+    return [child for child in siblings if child.tag != qn('w:sectPr')]
+
+
+def capture_fragment(doc, elements, anchors=None):
+    """把文档中的一组正文元素保存为片段
+
+    Args:
+        doc (docx.document.Document): 元素所在的文档
+        elements (list): 正文块级元素（lxml元素）
+        anchors (list): 元素中的标题锚点，见 Fragment.anchors
+
+    Returns:
+        Fragment: 可序列化的片段
+    """
+    fragment = Fragment(anchors=list(anchors or ()))
+    rels = doc.part.rels
+    for element in elements:
+        fragment.elements.append(etree.tostring(element))
+        for node in element.iter():
+            for attr in REL_ATTRIBUTES:
+                rid = node.get(attr)
+                if not rid or rid not in rels:
+                    continue
+                rel = rels[rid]
+                if rel.is_external:
+                    fragment.external[rid] = (rel.reltype, rel.target_ref)
+                elif rel.reltype == RT.IMAGE:
+                    fragment.images[rid] = rel.target_part.blob
+    return fragment
+
+
+def append_block(doc, element):
+    """把块级元素追加到正文末尾（分节属性之前）
+
+    分节属性总是正文的最后一个子元素，直接取最后一个子元素即可；python-docx
+    的 add_paragraph 每次从头查找 sectPr，元素较多时耗时随元素数平方增长。
+    """
+    body = doc.element.body
+    try:
+        last = body[-1]
+    except IndexError:
+        last = None
+    if last is not None and last.tag == qn('w:sectPr'):
+        last.addprevious(element)
+    else:
+        body.append(element)
+
+
+class FragmentSplicer:
+    """把片段拼接到目标文档
+
+    图片通过 python-docx 按内容去重后添加，相同图片只嵌入一次；图形对象ID和
+    书签ID从目标文档当前的最大值之后连续分配。media 为流式包写入器（见
+    package_writer.py）时图片交给它写入。
+    """
+
+    def __init__(self, doc, media=None):
+        self.doc = doc
+        self.media = media
+        self.next_shape_id = 1
+        self.next_bookmark_id = 0
+        self.observe(doc.element.body)
+
+    def observe(self, element):
+        """记录文档中已使用的ID（直接渲染到目标文档的元素需要调用）"""
+        for node in element.iter(*_DOCPR_TAGS):
+            value = node.get('id', '')
+            if value.isdigit():
+                self.next_shape_id = max(self.next_shape_id, int(value) + 1)
+        for node in element.iter(*_BOOKMARK_TAGS):
+            value = node.get(qn('w:id'), '')
+            if value.isdigit():
+                self.next_bookmark_id = max(self.next_bookmark_id, int(value) + 1)
+
+    def splice(self, fragment, anchors=None):
+        """拼接片段，返回追加的正文元素列表
+
+        Args:
+            fragment (Fragment): 要拼接的片段
+            anchors (AnchorIndex): 目标文档的锚点索引；片段的标题锚点按拼接顺序登记，
+                与之前的标题重名时改写书签名。为空时书签名保持不变
+        """
+        name_map = {}
+        if anchors is not None:
+            for anchor, level, text, name in fragment.anchors:
+                new_name, _ = anchors.add(anchor, level, text)
+                if new_name != name:
+                    name_map[name] = new_name
+
+        part = self.doc.part
+        rid_map = {}
+        for rid, blob in fragment.images.items():
+            if self.media is not None:
+                rid_map[rid], _ = self.media.add_image(blob)
+            else:
+                rid_map[rid], _ = part.get_or_add_image(BytesIO(blob))
+        for rid, (reltype, target) in fragment.external.items():
+            rid_map[rid] = part.relate_to(target, reltype, is_external=True)
+
+        # 所有元素一次解析、一次改写ID，避免每个元素单独调用解析器
+        container = parse_xml(b''.join((_CONTAINER[0], *fragment.elements, _CONTAINER[1])))
+        self._remap(container, rid_map, {}, name_map)
+        appended = list(container)
+        for element in appended:
+            append_block(self.doc, element)
+        return appended
+
+    def _remap(self, element, rid_map, bookmark_map, name_map=None):
+        """重写关系ID、图形对象ID、书签ID和书签名（name_map 中的）
+
+        按标签只访问需要改写的元素：在Python中逐个检查所有节点是拼接的主要开销。
+        """
+        tags = _DOCPR_TAGS + _BOOKMARK_TAGS + (_REL_TAGS if rid_map else ())
+        for node in element.iter(*tags):
+            tag = node.tag
+            if tag in _DOCPR_TAGS:
+                node.set('id', str(self.next_shape_id))
+                self.next_shape_id += 1
+            elif tag in _BOOKMARK_TAGS:
+                old = node.get(qn('w:id'))
+                if old not in bookmark_map:
+                    bookmark_map[old] = str(self.next_bookmark_id)
+                    self.next_bookmark_id += 1
+                node.set(qn('w:id'), bookmark_map[old])
+                if name_map:
+                    name = node.get(qn('w:name'))
+                    if name in name_map:
+                        node.set(qn('w:name'), name_map[name])
+            else:
+                for attr in REL_ATTRIBUTES:
+                    rid = node.get(attr)
+                    if rid in rid_map:
+                        node.set(attr, rid_map[rid])
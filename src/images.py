@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片处理
+基于Pillow的图片预处理：只读取文件头获取尺寸，超出目标分辨率时按目标DPI缩小
+并重新压缩，python-docx无法嵌入的格式转码为PNG；处理结果按内容哈希在内存和
+磁盘上缓存，一篇文档中的图片在渲染前并行处理
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+from docx.image import SIGNATURES
+
+if __package__:
+    from .cache import ConversionCache, DEFAULT_MAX_BYTES, default_cache_dir
+else:
+    from cache import ConversionCache, DEFAULT_MAX_BYTES, default_cache_dir
+
+
+# 默认目标分辨率（按6英寸宽度计算像素宽度）
+DEFAULT_IMAGE_DPI = 150
+
+# 图片在文档中的宽度（英寸）
+IMAGE_WIDTH_INCHES = 6
+
+# 重新压缩JPEG时的质量
+JPEG_QUALITY = 85
+
+# 内存中缓存的处理结果总大小上限
+MEMORY_CACHE_BYTES = 256 * 1024 * 1024
+
+# 内存中记录的 文件路径 -> 内容哈希 条目数上限
+PATH_ENTRIES = 4096
+
+# 处理逻辑变化时递增，使旧的磁盘缓存失效
+PROCESSOR_VERSION = 1
+
+
+def default_image_cache_dir():
+    """返回默认的图片缓存目录"""
+    return os.path.join(os.path.dirname(default_cache_dir()), 'images')
+
+
+def docx_can_embed(data):
+    """判断python-docx能否直接嵌入该图片（与 docx.image 的格式识别一致）"""
+    return any(data[offset:offset + len(signature)] == signature
+               for _, offset, signature in SIGNATURES)
+
+
+class ProcessedImage:
+    """处理后的图片"""
+
+    __slots__ = ('data', 'width', 'height', 'format')
+
+    def __init__(self, data, width, height, format):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.format = format
+
+
+class ImageCache(ConversionCache):
+    """处理后图片的磁盘缓存"""
+
+    suffix = '.img'
+
+    def get(self, key):
+        entry = self._entry_path(key)
+        try:
+            with open(entry, 'rb') as f:
+                data = f.read()
+            os.utime(entry)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return data
+
+    def put(self, key, data):
+        self._write_entry(key, BytesIO(data))
+        self.stats.stores += 1
+        self.maybe_evict()
+
+
+class ImageProcessor:
+    """图片预处理器
+
+    Args:
+        target_dpi (int): 6英寸宽度下的目标分辨率，超出时缩小
+        cache_dir (str): 磁盘缓存目录，为空时只在内存中缓存
+        workers (int): 并行处理的线程数（Pillow解码和缩放时会释放GIL）
+        max_bytes (int): 磁盘缓存总大小上限
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, target_dpi=DEFAULT_IMAGE_DPI, cache_dir=None, workers=None,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.target_dpi = target_dpi
+        self.target_width = int(IMAGE_WIDTH_INCHES * target_dpi)
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.disk_cache = ImageCache(cache_dir, max_bytes) if cache_dir else None
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._paths = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, target_dpi=DEFAULT_IMAGE_DPI, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """返回进程内共享的处理器，使多次转换复用处理结果"""
+        key = (target_dpi, str(cache_dir) if cache_dir else None, max_bytes)
+        with cls._shared_lock:
+            processor = cls._shared.get(key)
+            if processor is None:
+                processor = cls._shared[key] = cls(target_dpi, cache_dir, max_bytes=max_bytes)
+            return processor
+
+    def load(self, path):
+        """读取并处理图片文件
+
+        Returns:
+            ProcessedImage: 处理结果；文件不存在时返回 None
+        """
+        path = Path(path)
+        try:
+            stat = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        path_key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            content_key = self._paths.get(path_key)
+            if content_key:
+                self._paths.move_to_end(path_key)
+            image = self._memory.get(content_key) if content_key else None
+        if image is not None:
+            return image
+
+        data = path.read_bytes()
+        image = self.process_bytes(data)
+        with self._lock:
+            self._paths[path_key] = self._content_key(data)
+            self._paths.move_to_end(path_key)
+            while len(self._paths) > PATH_ENTRIES:
+                self._paths.popitem(last=False)
+        return image
+
+    def process_bytes(self, data):
+        """处理图片字节，结果按内容哈希缓存"""
+        key = self._content_key(data)
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                return image
+
+        cached = self.disk_cache.get(key) if self.disk_cache else None
+        if cached is not None:
+            image = self._describe(cached)
+        else:
+            image = self.process(data)
+            if self.disk_cache and image.data is not data:
+                self.disk_cache.put(key, image.data)
+        self._remember(key, image)
+        return image
+
+    def prepare(self, paths, blobs=()):
+        """并行处理一组图片文件和图片字节，结果放入缓存"""
+        tasks = [(self.load, p) for p in dict.fromkeys(str(p) for p in paths)]
+        tasks += [(self.process_bytes, data) for data in blobs]
+        if len(tasks) <= 1 or self.workers <= 1:
+            for task in tasks:
+                self._safe_run(task)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+            list(executor.map(self._safe_run, tasks))
+
+    def _safe_run(self, task):
+        function, argument = task
+        try:
+            return function(argument)
+        except Exception:
+            # 错误在渲染时由 process_image 报告
+            return None
+
+    def process(self, data):
+        """缩小、重新压缩或转码图片
+
+        只读取文件头判断尺寸和格式；图片宽度不超过目标像素宽度且格式可直接嵌入时
+        原样返回，不做完整解码。
+        """
+        with Image.open(BytesIO(data)) as img:
+            width, height = img.size
+            fmt = img.format
+            embeddable = docx_can_embed(data)
+            animated = getattr(img, 'is_animated', False)
+            too_large = width > self.target_width and not animated
+
+            if embeddable and not too_large:
+                return ProcessedImage(data, width, height, fmt)
+
+            if too_large:
+                new_height = max(1, round(height * self.target_width / width))
+                if fmt == 'JPEG':
+                    # JPEG解码时直接按DCT缩放，避免解码完整分辨率
+                    img.draft(img.mode, (self.target_width, new_height))
+                if img.mode == 'P':
+                    img = img.convert('RGBA')
+                img = img.resize((self.target_width, new_height), Image.LANCZOS)
+                width, height = img.size
+
+            out = BytesIO()
+            if fmt == 'JPEG' and img.mode in ('RGB', 'L', 'CMYK'):
+                img.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True,
+                         dpi=(self.target_dpi, self.target_dpi))
+                out_fmt = 'JPEG'
+            else:
+                if img.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I', 'I;16'):
+                    img = img.convert('RGBA')
+                img.save(out, 'PNG', optimize=True, dpi=(self.target_dpi, self.target_dpi))
+                out_fmt = 'PNG'
+            result = out.getvalue()
+
+        if embeddable and len(result) >= len(data):
+            # 重新压缩没有变小时保留原图
+            return ProcessedImage(data, *self._size(data), fmt)
+        return ProcessedImage(result, width, height, out_fmt)
+
+    def _content_key(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{digest}-{self.target_dpi}-v{PROCESSOR_VERSION}"
+
+    def _describe(self, data):
+        with Image.open(BytesIO(data)) as img:
+            return ProcessedImage(data, img.size[0], img.size[1], img.format)
+
+    def _size(self, data):
+        with Image.open(BytesIO(data)) as img:
+            return img.size
+
+    def _remember(self, key, image):
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = image
+            self._memory_bytes += len(image.data)
+            while self._memory_bytes > MEMORY_CACHE_BYTES and len(self._memory) > 1:
+                _, old = self._memory.popitem(last=False)
+                self._memory_bytes -= len(old.data)
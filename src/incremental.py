@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量转换
+按顶层块缓存渲染好的WordprocessingML片段，键为块内容、转换选项和块内引用图片
+的哈希；再次转换时只重新渲染变化的块，其余块从缓存拼接
+
+注意：与流式转换相同，各块独立解析，引用式链接定义和脚注只在所在块内生效。
+"""
+
+import os
+import pickle
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+
+if __package__:
+    from .cache import ConversionCache, DEFAULT_MAX_BYTES, content_key, default_cache_dir
+    from .engine import (ConversionOptions, DocumentRenderer, PROGRESS_SAVE, ProgressRange,
+                         finish_document, get_markdown, parse_markdown, _notify)
+    from .fragments import FragmentSplicer, blocks_after, capture_fragment, last_block
+    from .metrics import ConversionMetrics
+    from .streaming import iter_blocks
+else:
+    from cache import ConversionCache, DEFAULT_MAX_BYTES, content_key, default_cache_dir
+    from engine import (ConversionOptions, DocumentRenderer, PROGRESS_SAVE, ProgressRange,
+                        finish_document, get_markdown, parse_markdown, _notify)
+    from fragments import FragmentSplicer, blocks_after, capture_fragment, last_block
+    from metrics import ConversionMetrics
+    from streaming import iter_blocks
+
+
+# 内存中最多保留的片段数
+DEFAULT_MEMORY_ENTRIES = 8192
+
+
+def default_fragment_dir():
+    """返回默认的片段缓存目录"""
+    return os.path.join(os.path.dirname(default_cache_dir()), 'fragments')
+
+
+class FragmentCache(ConversionCache):
+    """按块缓存渲染结果
+
+    片段先查内存LRU，再查磁盘；cache_dir 为空时只使用内存。
+
+    Args:
+        cache_dir (str): 磁盘缓存目录，为空时不落盘
+        max_bytes (int): 磁盘缓存总大小上限
+        memory_entries (int): 内存中最多保留的片段数
+    """
+
+    suffix = '.frag'
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES,
+                 memory_entries=DEFAULT_MEMORY_ENTRIES):
+        super().__init__(cache_dir or default_cache_dir(), max_bytes)
+        if not cache_dir:
+            self.cache_dir = None
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+
+    def __getstate__(self):
+        # 传给工作进程时不复制内存中的片段
+        state = dict(self.__dict__)
+        state['memory'] = OrderedDict()
+        return state
+
+    def key_for_block(self, block, options, base_path):
+        """计算块的缓存键，块的结果不可缓存时为 None（见 content_key）"""
+        return content_key(block.encode('utf-8'), options, base_path, namespace='fragment')
+
+    def get(self, key):
+        """取出片段，未命中时返回 None"""
+        fragment = self.memory.get(key)
+        if fragment is not None:
+            self.memory.move_to_end(key)
+            self.stats.hits += 1
+            return fragment
+
+        if self.cache_dir is not None:
+            entry = self._entry_path(key)
+            try:
+                with open(entry, 'rb') as f:
+                    fragment = pickle.load(f)
+                os.utime(entry)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                fragment = None
+        if fragment is None:
+            self.stats.misses += 1
+            return None
+
+        self._remember(key, fragment)
+        self.stats.hits += 1
+        return fragment
+
+    def put(self, key, fragment):
+        """存入片段"""
+        self._remember(key, fragment)
+        if self.cache_dir is not None:
+            self._write_entry(key, BytesIO(pickle.dumps(fragment, pickle.HIGHEST_PROTOCOL)))
+        self.stats.stores += 1
+
+    def _remember(self, key, fragment):
+        self.memory[key] = fragment
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+
+def convert_incremental(input_file, output_file, options=None, fragment_cache=None,
+                        log_callback=None, progress_callback=None, metrics=None):
+    """增量转换文件
+
+    Args:
+        input_file (str): 输入的Markdown文件路径
+        output_file (str): 输出的Word文件路径
+        options (ConversionOptions): 转换选项
+        fragment_cache (FragmentCache): 片段缓存；同一进程内重复转换时应复用同一个实例
+        log_callback (callable): 接收日志消息的回调
+        progress_callback (callable): 接收进度百分比(0-100)的回调
+        metrics (ConversionMetrics): 记录各阶段耗时（拼接缓存片段计入 splice 阶段）、
+            元素统计和输出大小
+
+    Returns:
+        str: 输出的Word文件路径
+    """
+    options = options or ConversionOptions()
+    fragment_cache = fragment_cache if fragment_cache is not None else FragmentCache()
+    collect = metrics is not None
+    metrics = metrics if collect else ConversionMetrics()
+    base_path = Path(input_file).parent
+
+    _notify(progress_callback, 0)
+    with metrics.stage('read'):
+        with open(input_file, 'r', encoding='utf-8') as f:
+            blocks = list(iter_blocks(f))
+    metrics.input_bytes = os.path.getsize(input_file)
+
+    renderer = DocumentRenderer(options, log_callback, metrics)
+    doc = renderer.new_document()
+    if options.include_toc:
+        renderer.add_toc(doc)
+    splicer = FragmentSplicer(doc)
+
+    rendered = 0
+    progress = ProgressRange(progress_callback, 0, PROGRESS_SAVE[0])
+    for i, block in enumerate(blocks):
+        key = fragment_cache.key_for_block(block, options, base_path)
+        fragment = fragment_cache.get(key) if key is not None else None
+        if fragment is not None:
+            with metrics.stage('splice'):
+                splicer.splice(fragment, renderer.anchors)
+        else:
+            # 只渲染变化的块，并把新元素及其标题锚点保存为片段
+            marker = last_block(doc)
+            headings = len(renderer.anchors.headings)
+            renderer.reserve_shape_ids(splicer.next_shape_id)
+            renderer.reserve_bookmark_ids(splicer.next_bookmark_id)
+            root = parse_markdown(get_markdown(), block, options.parser, metrics)
+            renderer.html_to_docx(root, doc, base_path)
+            elements = blocks_after(doc, marker)
+            for element in elements:
+                splicer.observe(element)
+            if key is not None:
+                fragment_cache.put(key, capture_fragment(doc, elements,
+                                                         renderer.anchors.headings[headings:]))
+            rendered += 1
+        progress.update(i + 1, len(blocks))
+
+    _notify(log_callback, f"增量转换: 重新渲染 {rendered}/{len(blocks)} 个块")
+    if collect:
+        metrics.collect_document(doc)
+    _notify(log_callback, f"正在保存到: {output_file}")
+    finish_document(doc, output_file, progress_callback, metrics)
+    fragment_cache.maybe_evict()
+    _notify(progress_callback, 100)
+    return str(output_file)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行内元素渲染
+按格式状态栈（粗体、斜体、代码、链接、删除线）遍历任意层嵌套的行内元素，
+把文本整理成带格式的片段，相邻的同格式文本合并为一个片段；片段直接拼成
+w:r XML，每种格式的 w:rPr 只生成一次。“#锚点”链接的片段放在指向书签的
+w:hyperlink 中（见 anchors.py），公式片段直接输出为OMML（见 equations.py）
+"""
+
+import re
+from urllib.parse import unquote
+from xml.sax.saxutils import escape
+
+from bs4.element import PreformattedString
+
+if __package__:
+    from .equations import math_source
+else:
+    from equations import math_source
+
+
+# 各种格式对应的行内标签
+BOLD_TAGS = ('strong', 'b')
+ITALIC_TAGS = ('em', 'i')
+CODE_TAGS = ('code', 'kbd', 'samp')
+STRIKE_TAGS = ('del', 's', 'strike')
+
+LINK_COLOR = '007ACC'
+
+# 行内代码字号（半磅）
+CODE_FONT_SIZE = 20
+
+# 需要转为 w:tab / w:br 的字符
+_SPECIAL_CHARS_RE = re.compile(r'([\t\r\n])')
+
+# (格式, 代码字体) -> w:rPr XML
+_rpr_cache = {}
+
+# 公式片段的格式标记，片段的文本为 m:oMath / m:oMathPara XML
+MATH = object()
+
+
+class InlineFormat:
+    """不可变的行内格式状态
+
+    anchor 为内部链接指向的书签名，不影响文字格式。
+    """
+
+    __slots__ = ('bold', 'italic', 'code', 'link', 'strike', 'anchor')
+
+    def __init__(self, bold=False, italic=False, code=False, link=False, strike=False,
+                 anchor=None):
+        self.bold = bold
+        self.italic = italic
+        self.code = code
+        self.link = link
+        self.strike = strike
+        self.anchor = anchor
+
+    def key(self):
+        return (self.bold, self.italic, self.code, self.link, self.strike, self.anchor)
+
+    def style_key(self):
+        """决定 w:rPr 的部分"""
+        return (self.bold, self.italic, self.code, self.link, self.strike)
+
+    def replace(self, **changes):
+        """返回修改了部分属性的新格式"""
+        values = dict(zip(self.__slots__, self.key()))
+        values.update(changes)
+        return InlineFormat(**values)
+
+    def __eq__(self, other):
+        return isinstance(other, InlineFormat) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        flags = [name for name in self.__slots__ if getattr(self, name)]
+        return f"InlineFormat({', '.join(flags)})"
+
+
+PLAIN = InlineFormat()
+
+
+def inline_segments(element, images=True, base=PLAIN, anchors=None, math=None):
+    """把元素的行内内容整理为带格式的片段
+
+    用显式的栈遍历，嵌套的格式会叠加（如 <em> 中的 <strong> 为粗斜体，
+    链接中的 <code> 为代码字体加链接颜色）；有 href 的链接在文字后追加
+    " (url)"，“#锚点”链接改为记录书签名，<br> 转为换行，注释等非文本节点被忽略。
+    python-markdown-math 输出的公式（<script type="math/tex">）交给 math 转换。
+
+    Args:
+        element: BeautifulSoup 或 MarkdownTreeNode 节点
+        images (bool): 是否保留 <img>；为假时忽略图片
+        base (InlineFormat): 初始格式（如表头单元格为粗体）
+        anchors (callable): 锚点 -> 书签名；为空时“#锚点”链接与其他链接相同
+        math (callable): (LaTeX源码, 是否为独立公式) -> 公式XML；为空时公式按原文输出
+
+    Returns:
+        list: (InlineFormat, 文本) 列表；图片片段为 (None, img 元素)，公式片段为
+            (MATH, 公式XML)。相邻的同格式文本已合并。
+    """
+    segments = []
+    # 独立公式后由Markdown加入的换行需要去掉
+    after_display = False
+
+    def add_text(text, fmt):
+        nonlocal after_display
+        if after_display:
+            text = text.lstrip('\n')
+            after_display = not text
+        if not text:
+            return
+        if segments and segments[-1][0] == fmt:
+            segments[-1] = (fmt, segments[-1][1] + text)
+        else:
+            segments.append((fmt, text))
+
+    stack = [(iter(element.children), base, None)]
+    while stack:
+        children, fmt, suffix = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if suffix is not None:
+                add_text(suffix, fmt)
+            continue
+
+        name = getattr(child, 'name', None)
+        if name is None:
+            if not isinstance(child, PreformattedString):
+                add_text(str(child), fmt)
+            continue
+        if name == 'img':
+            if images:
+                segments.append((None, child))
+            continue
+        if name == 'br':
+            add_text('\n', fmt)
+            continue
+        if name == 'script' and math is not None:
+            source = math_source(child)
+            if source is not None:
+                if source[1] and segments and isinstance(segments[-1][0], InlineFormat):
+                    # 独立公式前的换行
+                    text = segments[-1][1].rstrip('\n')
+                    if text:
+                        segments[-1] = (segments[-1][0], text)
+                    else:
+                        segments.pop()
+                segments.append((MATH, math(*source)))
+                after_display = source[1]
+                continue
+
+        suffix = None
+        if name in BOLD_TAGS:
+            fmt = fmt.replace(bold=True)
+        elif name in ITALIC_TAGS:
+            fmt = fmt.replace(italic=True)
+        elif name in CODE_TAGS:
+            fmt = fmt.replace(code=True)
+        elif name in STRIKE_TAGS:
+            fmt = fmt.replace(strike=True)
+        elif name == 'a':
+            url = child.get('href', '')
+            if anchors is not None and len(url) > 1 and url[0] == '#':
+                fmt = fmt.replace(link=True, anchor=anchors(unquote(url[1:])))
+            elif url:
+                fmt = fmt.replace(link=True)
+                suffix = f" ({url})"
+        stack.append((iter(child.children), fmt, suffix))
+    return segments
+
+
+def strip_segments(segments):
+    """去掉首尾空白（与 get_text().strip() 相同）和图片，返回新的片段列表"""
+    segments = [segment for segment in segments if segment[0] is not None]
+    while segments and segments[0][0] is not MATH and not segments[0][1].strip():
+        segments.pop(0)
+    while segments and segments[-1][0] is not MATH and not segments[-1][1].strip():
+        segments.pop()
+    if segments and segments[0][0] is not MATH:
+        segments[0] = (segments[0][0], segments[0][1].lstrip())
+    if segments and segments[-1][0] is not MATH:
+        segments[-1] = (segments[-1][0], segments[-1][1].rstrip())
+    return segments
+
+
+def text_xml(text):
+    """文本转为 w:t / w:tab / w:br，与python-docx的 run.text 相同"""
+    parts = []
+    for piece in _SPECIAL_CHARS_RE.split(text):
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece in ('\r', '\n'):
+            parts.append('<w:br/>')
+        elif piece:
+            space = ' xml:space="preserve"' if len(piece.strip()) < len(piece) else ''
+            parts.append(f'<w:t{space}>{escape(piece)}</w:t>')
+    return ''.join(parts)
+
+
+def rpr_xml(fmt, code_font):
+    """格式对应的 w:rPr XML（无格式时为空字符串），按格式和字体缓存"""
+    key = (fmt.style_key(), code_font)
+    rpr = _rpr_cache.get(key)
+    if rpr is not None:
+        return rpr
+
+    props = []
+    if fmt.code:
+        font = escape(code_font, {'"': '&quot;'})
+        props.append(f'<w:rFonts w:ascii="{font}" w:hAnsi="{font}"/>')
+    if fmt.bold:
+        props.append('<w:b/>')
+    if fmt.italic:
+        props.append('<w:i/>')
+    if fmt.strike:
+        props.append('<w:strike/>')
+    if fmt.link:
+        props.append(f'<w:color w:val="{LINK_COLOR}"/>')
+    if fmt.code:
+        props.append(f'<w:sz w:val="{CODE_FONT_SIZE}"/>')
+    rpr = _rpr_cache[key] = f"<w:rPr>{''.join(props)}</w:rPr>" if props else ''
+    return rpr
+
+
+def run_xml(text, fmt, code_font):
+    """单个 w:r 的XML"""
+    return f'<w:r>{rpr_xml(fmt, code_font)}{text_xml(text)}</w:r>'
+
+
+def runs_xml(segments, code_font):
+    """片段列表对应的 w:r XML
+
+    图片片段生成空的 <w:r/> 占位；指向同一书签的相邻片段放在一个 w:hyperlink 中。
+    公式片段原样输出，其余每个片段恰好对应一个 w:r。
+    """
+    parts = []
+    anchor = None
+    for fmt, text in segments:
+        target = fmt.anchor if fmt is not None and fmt is not MATH else None
+        if target != anchor:
+            if anchor is not None:
+                parts.append('</w:hyperlink>')
+            if target is not None:
+                name = escape(target, {'"': '&quot;'})
+                parts.append(f'<w:hyperlink w:anchor="{name}" w:history="1">')
+            anchor = target
+        if fmt is MATH:
+            parts.append(text)
+        else:
+            parts.append('<w:r/>' if fmt is None else run_xml(text, fmt, code_font))
+    if anchor is not None:
+        parts.append('</w:hyperlink>')
+    return ''.join(parts)
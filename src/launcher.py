@@ -2,74 +2,88 @@
 # -*- coding: utf-8 -*-
 """
 跨平台启动器 - 自动检测系统并启动Markdown转Word转换器
+
+依赖检查只查找模块（不导入），界面在当前进程中启动，不再另外启动解释器
 """
 
-import os
-import sys
+import importlib
+import importlib.util
 import platform
 import subprocess
+import sys
+import time
 from pathlib import Path
 
+# 启动器开始运行的时间，用于计算窗口显示用时
+STARTED_AT = time.perf_counter()
+
+# 依赖包名 -> 用于检查的模块名（tkinter 检查其C扩展，部分Linux发行版单独打包）
+REQUIRED_MODULES = {
+    'tkinter': '_tkinter',
+    'python-docx': 'docx',
+    'markdown': 'markdown',
+    'beautifulsoup4': 'bs4',
+    'lxml': 'lxml',
+    'Pillow': 'PIL',
+    'pygments': 'pygments',
+}
+
+# 支持的最低Python版本（tracemalloc.reset_peak、Executor.shutdown(cancel_futures=...)）
+MIN_PYTHON = (3, 9)
+
+# 依赖清单
+REQUIREMENTS_FILE = Path(__file__).resolve().parent.parent / 'requirements.txt'
+
 
 def get_python_command():
-    """获取合适的Python命令"""
-    commands = ['python3', 'python']
-    for cmd in commands:
-        try:
-            result = subprocess.run([cmd, '--version'], 
-                                  capture_output=True, text=True)
-            if result.returncode == 0:
-                return cmd
-        except FileNotFoundError:
-            continue
-    return None
+    """获取当前运行的Python解释器"""
+    return sys.executable or None
+
+
+def module_available(name):
+    """判断模块能否导入（只查找模块规格，不执行模块代码）"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
 
 
 def check_dependencies():
-    """检查依赖包是否已安装"""
-    required_packages = [
-        'tkinter',
-        'python-docx', 
-        'markdown',
-        'beautifulsoup4',
-        'lxml',
-        'Pillow'
-    ]
-    
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            if package == 'tkinter':
-                import tkinter
-            elif package == 'python-docx':
-                import docx
-            elif package == 'beautifulsoup4':
-                import bs4
-            else:
-                __import__(package.replace('-', '_'))
-        except ImportError:
-            missing_packages.append(package)
-    
-    return missing_packages
+    """检查依赖包是否已安装
+
+    Returns:
+        list: 缺少的依赖包名
+    """
+    return [package for package, module in REQUIRED_MODULES.items()
+            if not module_available(module)]
 
 
 def install_dependencies():
-    """安装依赖包"""
+    """用当前解释器的pip安装依赖包"""
     python_cmd = get_python_command()
     if not python_cmd:
         print("错误: 未找到Python解释器")
         return False
-    
+
+    requirements = REQUIREMENTS_FILE if REQUIREMENTS_FILE.exists() else Path('requirements.txt')
     try:
         print("正在安装依赖包...")
-        result = subprocess.run([
-            python_cmd, '-m', 'pip', 'install', '-r', 'requirements.txt'
-        ], check=True)
-        return True
+        subprocess.run([python_cmd, '-m', 'pip', 'install', '-r', str(requirements)], check=True)
     except subprocess.CalledProcessError as e:
         print(f"安装依赖包失败: {e}")
         return False
+    # 让新安装的包在当前进程中可以导入
+    importlib.invalidate_caches()
+    return True
+
+
+def run_gui(started_at=STARTED_AT):
+    """在当前进程中启动图形界面"""
+    if __package__:
+        from .md_to_word_converter import MarkdownToWordConverter
+    else:
+        from md_to_word_converter import MarkdownToWordConverter
+    MarkdownToWordConverter(started_at=started_at).run()
 
 
 def main():
@@ -77,32 +91,36 @@ def main():
     print("=" * 50)
     print("    Markdown转Word转换器 - 跨平台启动器")
     print("=" * 50)
-    
+
     # 检测系统信息
     system = platform.system()
     print(f"操作系统: {system}")
     print(f"Python版本: {platform.python_version()}")
     print(f"架构: {platform.machine()}")
     print()
-    
-    # 获取Python命令
+
+    required = '.'.join(map(str, MIN_PYTHON))
     python_cmd = get_python_command()
     if not python_cmd:
         print("错误: 未找到Python解释器")
-        print("请确保已安装Python 3.7或更高版本")
+        print(f"请确保已安装Python {required}或更高版本")
+        input("按Enter键退出...")
+        return
+    if sys.version_info < MIN_PYTHON:
+        print(f"错误: 需要Python {required}或更高版本")
         input("按Enter键退出...")
         return
-    
-    print(f"使用Python命令: {python_cmd}")
-    
+
+    print(f"使用Python: {python_cmd}")
+
     # 检查依赖
     print("检查依赖包...")
     missing = check_dependencies()
-    
+
     if missing:
         print(f"缺少以下依赖包: {', '.join(missing)}")
         if input("是否自动安装? (y/n): ").lower() == 'y':
-            if not install_dependencies():
+            if not install_dependencies() or check_dependencies():
                 print("依赖安装失败，程序无法启动")
                 input("按Enter键退出...")
                 return
@@ -112,20 +130,16 @@ def main():
             return
     else:
         print("✅ 所有依赖包已安装")
-    
+
     # 启动主程序
     print("\n正在启动Markdown转Word转换器...")
     try:
-        converter_path = Path(__file__).parent / "md_to_word_converter.py"
-        if converter_path.exists():
-            os.system(f"{python_cmd} {converter_path}")
-        else:
-            print("错误: 找不到主程序文件 md_to_word_converter.py")
+        run_gui()
     except KeyboardInterrupt:
         print("\n程序被用户中断")
     except Exception as e:
         print(f"启动程序时出错: {e}")
-    
+
     print("\n程序已退出")
 
 
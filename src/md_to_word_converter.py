@@ -2,6 +2,9 @@
 Markdown到Word转换器
 支持保持原有格式的Markdown文档转换
 跨平台支持：Windows、macOS、Linux
+
+转换引擎（markdown、python-docx、BeautifulSoup、Pillow、Pygments）在窗口显示后
+由后台线程预先导入，模块加载时只导入Tkinter。
 """
 
 import tkinter as tk
@@ -10,19 +13,45 @@ import os
 import sys
 import platform
 import threading
+import time
 from pathlib import Path
-import markdown
-from docx import Document
-from docx.shared import Inches, Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
-from docx.enum.style import WD_STYLE_TYPE
-from docx.oxml.shared import OxmlElement, qn
-from bs4 import BeautifulSoup
-import re
+
+if __package__:
+    from .events import EventChannel, LogBuffer, FINISHED, FAILED
+else:
+    from events import EventChannel, LogBuffer, FINISHED, FAILED
+
+
+# 界面处理工作线程事件的间隔（毫秒）
+EVENT_POLL_MS = 50
+
+# 日志视图最多保留的行数
+LOG_MAX_LINES = 1000
+
+# 从启动到窗口显示的目标用时（毫秒），超出时在日志中提示
+STARTUP_BUDGET_MS = 500
+
+# 本模块加载的时间，未指定启动时间时作为起点
+_MODULE_LOADED_AT = time.perf_counter()
+
+
+def load_engine():
+    """导入转换引擎，返回 (engine, images) 模块
+
+    首次调用需要导入所有转换依赖；多个线程同时调用时由导入锁保证只导入一次。
+    """
+    if __package__:
+        from . import engine, images
+    else:
+        import engine
+        import images
+    return engine, images
 
 
 class MarkdownToWordConverter:
-    def __init__(self):
+    def __init__(self, started_at=None):
+        self.started_at = started_at if started_at is not None else _MODULE_LOADED_AT
+        self.startup_ms = None
         self.root = tk.Tk()
         self.root.title("Markdown转Word转换器")
         self.root.geometry("800x600")
@@ -31,6 +60,13 @@ class MarkdownToWordConverter:
         self.system = platform.system()
         self.setup_platform_config()
         
+        # 工作线程通过事件通道更新界面
+        self.events = EventChannel()
+        self.log_buffer = LogBuffer(LOG_MAX_LINES)
+        
+        # 监视模式的停止信号，未在监视时为 None
+        self.watch_stop = None
+        
         # 设置窗口图标（如果存在）
         self.setup_window_icon()
         
@@ -38,6 +74,24 @@ class MarkdownToWordConverter:
         self.setup_styles()
         
         self.setup_ui()
+        self.root.after(EVENT_POLL_MS, self.process_events)
+        self.root.after_idle(self.on_window_ready)
+
+    def on_window_ready(self):
+        """窗口首次显示后记录启动用时，并在后台线程中预热转换引擎"""
+        self.startup_ms = (time.perf_counter() - self.started_at) * 1000
+        note = f"（超过目标 {STARTUP_BUDGET_MS} ms）" if self.startup_ms > STARTUP_BUDGET_MS else ""
+        self.log_message(f"界面启动用时 {self.startup_ms:.0f} ms{note}")
+        threading.Thread(target=self.warm_up, daemon=True).start()
+
+    def warm_up(self):
+        """导入转换引擎并准备默认样式模板，使第一次转换不必等待导入"""
+        try:
+            engine, _ = load_engine()
+            engine.create_markdown()
+            engine.DocumentRenderer(engine.ConversionOptions(system=self.system)).new_document()
+        except Exception as e:
+            self.log_message(f"预加载转换引擎失败: {str(e)}")
         
     def setup_platform_config(self):
         """根据操作系统设置平台相关配置"""
@@ -212,6 +266,16 @@ class MarkdownToWordConverter:
             bg=self.bg_color
         ).pack(anchor='w', padx=10, pady=5)
         
+        self.watch_changes = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            options_frame, 
+            text="监视文件变化（保存后自动重新转换）", 
+            variable=self.watch_changes,
+            command=self.on_watch_toggled,
+            font=self.default_font,
+            bg=self.bg_color
+        ).pack(anchor='w', padx=10, pady=5)
+        
         # 转换按钮
         convert_btn = ttk.Button(
             self.root, 
@@ -289,20 +353,47 @@ class MarkdownToWordConverter:
             self.output_path_var.set(filename)
             
     def log_message(self, message):
-        """添加日志消息"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """添加日志消息（可在任意线程中调用）"""
+        self.events.log(message)
         
     def update_status(self, message):
-        """更新状态"""
-        self.status_var.set(message)
-        self.root.update_idletasks()
+        """更新状态（可在任意线程中调用）"""
+        self.events.status(message)
         
     def update_progress(self, value):
-        """更新进度条"""
-        self.progress_var.set(value)
-        self.root.update_idletasks()
+        """更新进度条（可在任意线程中调用）"""
+        self.events.progress(value)
+        
+    def process_events(self):
+        """在Tk主循环中定时取出工作线程的事件，合并后一次性更新界面"""
+        try:
+            batch = self.events.drain()
+            if batch.logs:
+                self.append_logs(batch.logs)
+            if batch.status is not None:
+                self.status_var.set(batch.status)
+            if batch.progress is not None:
+                self.progress_var.set(batch.progress)
+            for kind, payload in batch.results:
+                if kind == FINISHED:
+                    messagebox.showinfo("成功", f"转换完成!\n文件已保存为: {payload}")
+                elif kind == FAILED:
+                    messagebox.showerror("错误", f"转换失败: {payload}")
+        finally:
+            self.root.after(EVENT_POLL_MS, self.process_events)
+            
+    def append_logs(self, messages):
+        """把一批日志写入日志视图，超出行数上限时删除最早的行"""
+        overflow = self.log_buffer.extend(messages)
+        if overflow >= len(self.log_buffer.lines):
+            # 这一批日志已超过上限，直接显示缓冲区内容
+            self.log_text.delete(1.0, tk.END)
+            self.log_text.insert(tk.END, self.log_buffer.text() + "\n")
+        else:
+            self.log_text.insert(tk.END, "\n".join(str(m) for m in messages) + "\n")
+            if overflow:
+                self.log_text.delete(1.0, f"{overflow + 1}.0")
+        self.log_text.see(tk.END)
         
     def start_conversion(self):
         """开始转换"""
@@ -321,228 +412,116 @@ class MarkdownToWordConverter:
             messagebox.showerror("错误", "输入文件不存在")
             return
             
-        # 在新线程中执行转换
+        # 在新线程中执行转换（选项在界面线程中读取）
+        self.stop_watching()
         self.log_text.delete(1.0, tk.END)
-        threading.Thread(target=self.convert_file, args=(input_file, output_file), daemon=True).start()
-        
-    def convert_file(self, input_file, output_file):
-        """转换文件"""
+        self.log_buffer.clear()
+        self.progress_var.set(0)
+        options = self.get_options()
+        if self.watch_changes.get():
+            self.watch_stop = threading.Event()
+            threading.Thread(target=self.watch_file, args=(input_file, output_file, options, self.watch_stop), daemon=True).start()
+        else:
+            threading.Thread(target=self.convert_file, args=(input_file, output_file, options), daemon=True).start()
+        
+    def on_watch_toggled(self):
+        """取消勾选监视时停止正在进行的监视"""
+        if not self.watch_changes.get() and self.stop_watching():
+            self.status_var.set("已停止监视")
+            
+    def stop_watching(self):
+        """停止监视，返回之前是否在监视"""
+        if self.watch_stop is None:
+            return False
+        self.watch_stop.set()
+        self.watch_stop = None
+        return True
+        
+    def get_options(self):
+        """读取界面复选框，返回转换选项的关键字参数
+
+        在界面线程中调用；ConversionOptions 由工作线程在导入引擎后创建。
+        """
+        return {
+            'preserve_formatting': self.preserve_formatting.get(),
+            'include_toc': self.include_toc.get(),
+            'process_images': self.process_images.get(),
+            'clean_formatting': self.clean_formatting.get(),
+            'system': self.system,
+        }
+
+    def convert_file(self, input_file, output_file, options=None):
+        """转换文件（在工作线程中运行，只通过事件通道更新界面）
+
+        Args:
+            options (dict | ConversionOptions): get_options() 的结果或转换选项
+        """
         try:
             self.update_status("正在转换...")
-            self.update_progress(0)
-            
-            # 读取Markdown文件
-            self.log_message("正在读取Markdown文件...")
-            with open(input_file, 'r', encoding='utf-8') as f:
-                md_content = f.read()
-            self.update_progress(20)
-            
-            # 转换Markdown为HTML
-            self.log_message("正在解析Markdown...")
-            md = markdown.Markdown(extensions=[
-                'extra', 'codehilite', 'toc', 'tables', 'fenced_code'
-            ])
-            html_content = md.convert(md_content)
-            self.update_progress(40)
-            
-            # 创建Word文档
-            self.log_message("正在创建Word文档...")
-            doc = Document()
-            self.setup_document_styles(doc)
-            self.update_progress(50)
-            
-            # 解析HTML并转换为Word
-            self.log_message("正在转换内容...")
-            soup = BeautifulSoup(html_content, 'html.parser')
-            self.html_to_docx(soup, doc, Path(input_file).parent)
-            self.update_progress(80)
-            
-            # 保存文档
-            self.log_message(f"正在保存到: {output_file}")
-            doc.save(output_file)
-            self.update_progress(100)
+            engine, images = load_engine()
+            options = self.build_options(engine, images, options)
+            engine.convert_file(
+                input_file,
+                output_file,
+                options,
+                log_callback=self.log_message,
+                progress_callback=self.update_progress
+            )
             
             self.update_status("转换完成")
             self.log_message("转换成功完成!")
-            messagebox.showinfo("成功", f"转换完成!\n文件已保存为: {output_file}")
+            self.events.finished(output_file)
             
         except Exception as e:
             self.update_status("转换失败")
             self.log_message(f"错误: {str(e)}")
-            messagebox.showerror("错误", f"转换失败: {str(e)}")
+            self.events.failed(str(e))
             
-    def setup_document_styles(self, doc):
-        """设置文档样式"""
-        styles = doc.styles
-        
-        # 根据操作系统选择合适的字体
-        if self.system == "Windows":
-            font_name = '微软雅黑'
-            code_font_name = 'Consolas'
-        elif self.system == "Darwin":  # macOS
-            font_name = 'PingFang SC'
-            code_font_name = 'SF Mono'
-        else:  # Linux
-            font_name = 'DejaVu Sans'
-            code_font_name = 'DejaVu Sans Mono'
-        
-        # 设置标题样式
-        for i in range(1, 7):
-            try:
-                heading_style = styles[f'Heading {i}']
-                heading_style.font.name = font_name
-                heading_style.font.size = Pt(24 - i * 2)
-                heading_style.font.bold = True
-                heading_style.font.color.rgb = RGBColor(0x2c, 0x3e, 0x50)
-            except Exception as e:
-                self.log_message(f"设置标题样式时警告: {str(e)}")
-            
-        # 设置正文样式
+    def build_options(self, engine, images, options):
+        """把 get_options() 的结果转为 ConversionOptions（已是转换选项时原样返回）"""
+        if isinstance(options, engine.ConversionOptions):
+            return options
+        values = {'system': self.system, 'image_cache_dir': images.default_image_cache_dir()}
+        values.update(options or {})
+        return engine.ConversionOptions(**values)
+
+    def watch_file(self, input_file, output_file, options, stop):
+        """监视输入文件及其引用的图片，保存后自动重新转换
+
+        在工作线程中运行，直到 stop 被设置；每次转换的结果只更新状态和日志，
+        不弹出对话框。
+        """
         try:
-            normal_style = styles['Normal']
-            normal_style.font.name = font_name
-            normal_style.font.size = Pt(12)
-            normal_style.paragraph_format.space_after = Pt(6)
-            normal_style.paragraph_format.line_spacing = 1.15
-        except Exception as e:
-            self.log_message(f"设置正文样式时警告: {str(e)}")
-            
-        # 设置代码字体（用于后续代码块）
-        self.document_code_font = code_font_name
-        
-    def html_to_docx(self, soup, doc, base_path):
-        """将HTML转换为Word文档"""
-        for element in soup.children:
-            if hasattr(element, 'name'):
-                self.process_element(element, doc, base_path)
-                
-    def process_element(self, element, doc, base_path):
-        """处理HTML元素"""
-        if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            # 处理标题
-            level = int(element.name[1])
-            heading = doc.add_heading(element.get_text().strip(), level=level)
-            
-        elif element.name == 'p':
-            # 处理段落
-            paragraph = doc.add_paragraph()
-            self.process_inline_elements(element, paragraph)
-            
-        elif element.name == 'ul':
-            # 处理无序列表
-            for li in element.find_all('li', recursive=False):
-                paragraph = doc.add_paragraph(style='List Bullet')
-                self.process_inline_elements(li, paragraph)
-                
-        elif element.name == 'ol':
-            # 处理有序列表
-            for li in element.find_all('li', recursive=False):
-                paragraph = doc.add_paragraph(style='List Number')
-                self.process_inline_elements(li, paragraph)
-                
-        elif element.name == 'blockquote':
-            # 处理引用
-            paragraph = doc.add_paragraph()
-            paragraph.style = 'Quote'
-            self.process_inline_elements(element, paragraph)
-            
-        elif element.name == 'pre':
-            # 处理代码块
-            code_text = element.get_text()
-            paragraph = doc.add_paragraph()
-            run = paragraph.add_run(code_text)
-            run.font.name = getattr(self, 'document_code_font', 'Courier New')
-            run.font.size = Pt(10)
-            paragraph.style = 'No Spacing'
-            
-        elif element.name == 'table':
-            # 处理表格
-            self.process_table(element, doc)
-            
-        elif element.name == 'img' and self.process_images.get():
-            # 处理图片
-            self.process_image(element, doc, base_path)
-            
-        elif element.name == 'hr':
-            # 处理分隔线
-            paragraph = doc.add_paragraph()
-            paragraph.add_run().add_break(WD_BREAK.LINE)
-            
-    def process_inline_elements(self, element, paragraph):
-        """处理内联元素"""
-        for child in element.children:
-            if hasattr(child, 'name'):
-                if child.name == 'strong' or child.name == 'b':
-                    run = paragraph.add_run(child.get_text())
-                    run.bold = True
-                elif child.name == 'em' or child.name == 'i':
-                    run = paragraph.add_run(child.get_text())
-                    run.italic = True
-                elif child.name == 'code':
-                    run = paragraph.add_run(child.get_text())
-                    run.font.name = getattr(self, 'document_code_font', 'Courier New')
-                    run.font.size = Pt(10)
-                elif child.name == 'a':
-                    # 处理链接
-                    text = child.get_text()
-                    url = child.get('href', '')
-                    if url:
-                        run = paragraph.add_run(f"{text} ({url})")
-                        run.font.color.rgb = RGBColor(0x00, 0x7a, 0xcc)
-                    else:
-                        run = paragraph.add_run(text)
-                else:
-                    paragraph.add_run(child.get_text())
+            engine, images = load_engine()
+            if __package__:
+                from .watch import ConversionCancelled, WatchSession
             else:
-                # 纯文本
-                paragraph.add_run(str(child))
-                
-    def process_table(self, table_element, doc):
-        """处理表格"""
-        rows = table_element.find_all('tr')
-        if not rows:
-            return
-            
-        # 计算列数
-        max_cols = max(len(row.find_all(['td', 'th'])) for row in rows)
-        
-        # 创建表格
-        table = doc.add_table(rows=len(rows), cols=max_cols)
-        table.style = 'Table Grid'
-        
-        for i, row in enumerate(rows):
-            cells = row.find_all(['td', 'th'])
-            for j, cell in enumerate(cells):
-                if j < max_cols:
-                    table.cell(i, j).text = cell.get_text().strip()
-                    # 如果是表头，设置粗体
-                    if cell.name == 'th':
-                        for paragraph in table.cell(i, j).paragraphs:
-                            for run in paragraph.runs:
-                                run.bold = True
-                                
-    def process_image(self, img_element, doc, base_path):
-        """处理图片"""
-        try:
-            src = img_element.get('src', '')
-            alt = img_element.get('alt', '')
-            
-            if src:
-                # 处理相对路径
-                if not src.startswith(('http://', 'https://')):
-                    img_path = base_path / src
-                    if img_path.exists():
-                        paragraph = doc.add_paragraph()
-                        run = paragraph.add_run()
-                        run.add_picture(str(img_path), width=Inches(6))
-                        
-                        # 添加图片说明
-                        if alt:
-                            caption = doc.add_paragraph(f"图片: {alt}")
-                            caption.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                            
+                from watch import ConversionCancelled, WatchSession
+            options = self.build_options(engine, images, options)
+
+            def convert(input_file, output_file, progress_callback):
+                self.update_status("正在转换...")
+                try:
+                    engine.convert_file(input_file, output_file, options,
+                                        log_callback=self.log_message,
+                                        progress_callback=progress_callback)
+                except ConversionCancelled:
+                    raise
+                except Exception as e:
+                    self.update_status("转换失败，等待文件的下一次修改")
+                    self.log_message(f"错误: {str(e)}")
+                    return
+                self.update_status(f"已于 {time.strftime('%H:%M:%S')} 更新，正在监视文件变化")
+                self.log_message(f"已保存到: {output_file}")
+
+            session = WatchSession([(input_file, output_file)], convert, options,
+                                   log_callback=self.log_message,
+                                   progress_callback=self.update_progress)
+            session.run(stop)
         except Exception as e:
-            self.log_message(f"处理图片时出错: {str(e)}")
+            self.update_status("监视失败")
+            self.log_message(f"错误: {str(e)}")
+            self.events.failed(str(e))
             
     def run(self):
         """运行应用程序"""
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换指标与性能分析
+记录一次转换各阶段（读取、解析、BeautifulSoup、图片预处理、公式转换、渲染、保存）的耗时、各类元素的
+处理次数和耗时，以及输出文档的段落数、文本段数和媒体大小；可输出为JSON日志行。
+profile_conversion() 为单次转换保存 cProfile 或 tracemalloc 快照，或按阶段统计
+内存分配和峰值常驻内存的内存报告。
+"""
+
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+
+
+# 支持的性能分析方式及其输出文件的扩展名
+PROFILE_SUFFIXES = {
+    'cprofile': '.prof',
+    'tracemalloc': '.tracemalloc',
+    'memory': '.memory.json',
+}
+PROFILE_MODES = tuple(PROFILE_SUFFIXES)
+
+# tracemalloc 记录的调用栈深度
+TRACEMALLOC_FRAMES = 25
+
+# 阶段名称，按流水线顺序排列
+STAGES = ('read', 'parse', 'soup', 'images', 'equations', 'render', 'splice', 'save')
+
+# 内存报告中各阶段留存的内存所对应的数据
+MEMORY_COMPONENTS = {
+    'read': 'Markdown源文本',
+    'parse': 'Markdown元素树（html解析方式为HTML字符串）',
+    'soup': 'BeautifulSoup树',
+    'images': '嵌入的图片（处理后的图片数据）',
+    'equations': '公式（OMML缓存）',
+    'render': 'python-docx文档树',
+    'splice': '拼接的片段',
+    'save': '输出文档',
+}
+
+# 峰值常驻内存（VmHWM）的来源，Linux上可以通过 clear_refs 重置
+_PROC_STATUS = '/proc/self/status'
+_PROC_CLEAR_REFS = '/proc/self/clear_refs'
+
+
+def _proc_status(field):
+    """/proc/self/status 中以kB为单位的字段（字节），不支持时返回 None"""
+    try:
+        with open(_PROC_STATUS) as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_bytes():
+    """进程当前的常驻内存（字节），不支持时（非Linux）返回 None"""
+    return _proc_status('VmRSS:')
+
+
+def peak_rss_bytes():
+    """进程的峰值常驻内存（字节），无法获取时返回 None"""
+    peak = _proc_status('VmHWM:')
+    if peak is not None:
+        return peak
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def reset_peak_rss():
+    """把峰值常驻内存重置为当前值（仅Linux支持）
+
+    Returns:
+        bool: 是否成功；不成功时 peak_rss_bytes() 为整个进程生命期的峰值
+    """
+    try:
+        with open(_PROC_CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class ElementStats:
+    """某一类元素的处理次数和总耗时"""
+
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+class StageMemory:
+    """某一阶段的内存统计
+
+    tracemalloc 只跟踪Python的分配，lxml（python-docx文档树）在C库中分配的内存
+    只体现在常驻内存的变化中。
+
+    Attributes:
+        retained_bytes (int): 阶段结束时比开始时多分配的内存（该阶段产生且仍被引用的数据）
+        peak_bytes (int): 阶段内分配量的峰值，相对于转换开始时
+        rss_retained_bytes (int): 阶段结束时比开始时多占用的常驻内存，不支持时为 None
+        peak_rss_bytes (int): 阶段内的峰值常驻内存（不能重置时为截至该阶段的进程峰值）
+    """
+
+    __slots__ = ('retained_bytes', 'peak_bytes', 'rss_retained_bytes', 'peak_rss_bytes')
+
+    def __init__(self):
+        self.retained_bytes = 0
+        self.peak_bytes = 0
+        self.rss_retained_bytes = None
+        self.peak_rss_bytes = None
+
+
+class MemoryProfile:
+    """按阶段统计一次转换的内存
+
+    由 ConversionMetrics.stage() 在每个阶段开始和结束时调用，需要 tracemalloc
+    正在跟踪。阶段可以嵌套（外层阶段的峰值包含内层阶段）；流式转换中多次出现的
+    阶段累加留存内存、取峰值的最大值。
+
+    Attributes:
+        stages (dict): 阶段名称 -> StageMemory
+        peak_traced_bytes (int): 整个转换期间分配量的峰值，相对于转换开始时
+        peak_rss_bytes (int): 整个转换期间的峰值常驻内存
+        rss_resettable (bool): 峰值常驻内存能否按阶段重置（否则为进程生命期的峰值）
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.peak_traced_bytes = 0
+        self.peak_rss_bytes = None
+        self.rss_resettable = False
+        self._baseline = 0
+        self._stack = []
+
+    def start(self):
+        """开始统计（记录当前分配量作为基线）"""
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        self.rss_resettable = reset_peak_rss()
+
+    def finish(self):
+        """结束统计，记录整个转换期间的峰值"""
+        peak = tracemalloc.get_traced_memory()[1]
+        self.peak_traced_bytes = max(self.peak_traced_bytes, peak - self._baseline)
+        self.peak_rss_bytes = _max(self.peak_rss_bytes, peak_rss_bytes())
+
+    def begin(self, name):
+        current, peak = tracemalloc.get_traced_memory()
+        rss = peak_rss_bytes()
+        # 重置峰值前先把峰值计入外层阶段和整个转换
+        self.peak_traced_bytes = max(self.peak_traced_bytes, peak - self._baseline)
+        self.peak_rss_bytes = _max(self.peak_rss_bytes, rss)
+        if self._stack:
+            outer = self._stack[-1]
+            outer[2] = max(outer[2], peak)
+            outer[3] = _max(outer[3], rss)
+        tracemalloc.reset_peak()
+        if self.rss_resettable:
+            reset_peak_rss()
+        self._stack.append([name, current, current, None, rss_bytes()])
+
+    def end(self):
+        name, before, peak, rss, rss_before = self._stack.pop()
+        rss_after = rss_bytes()
+        current, traced_peak = tracemalloc.get_traced_memory()
+        peak = max(peak, traced_peak)
+        rss = _max(rss, peak_rss_bytes())
+        if self._stack:
+            outer = self._stack[-1]
+            outer[2] = max(outer[2], peak)
+            outer[3] = _max(outer[3], rss)
+        self.peak_traced_bytes = max(self.peak_traced_bytes, peak - self._baseline)
+        self.peak_rss_bytes = _max(self.peak_rss_bytes, rss)
+
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageMemory()
+        stats.retained_bytes += current - before
+        stats.peak_bytes = max(stats.peak_bytes, peak - self._baseline)
+        stats.peak_rss_bytes = _max(stats.peak_rss_bytes, rss)
+        if rss_before is not None and rss_after is not None:
+            stats.rss_retained_bytes = (stats.rss_retained_bytes or 0) + rss_after - rss_before
+
+    def report(self, metrics=None):
+        """内存报告（可序列化为JSON的字典）
+
+        Args:
+            metrics (ConversionMetrics): 同一次转换的指标，提供输入、输出和媒体大小
+        """
+        input_bytes = metrics.input_bytes if metrics is not None else 0
+        ordered = [name for name in STAGES if name in self.stages]
+        ordered += [name for name in self.stages if name not in STAGES]
+        return {
+            'input_bytes': input_bytes,
+            'output_bytes': metrics.output_bytes if metrics is not None else 0,
+            'media_bytes': metrics.media_bytes if metrics is not None else 0,
+            'peak_traced_bytes': self.peak_traced_bytes,
+            'peak_ratio': round(self.peak_traced_bytes / input_bytes, 2) if input_bytes else None,
+            'peak_rss_bytes': self.peak_rss_bytes,
+            'peak_rss_scope': 'conversion' if self.rss_resettable else 'process',
+            'stages': {
+                name: {
+                    'component': MEMORY_COMPONENTS.get(name, name),
+                    'retained_bytes': self.stages[name].retained_bytes,
+                    'peak_bytes': self.stages[name].peak_bytes,
+                    'rss_retained_bytes': self.stages[name].rss_retained_bytes,
+                    'peak_rss_bytes': self.stages[name].peak_rss_bytes,
+                }
+                for name in ordered
+            },
+        }
+
+
+def _max(a, b):
+    """两个可能为 None 的值中较大的一个"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+class ConversionMetrics:
+    """一次转换的指标
+
+    阶段耗时可以多次累加（流式和增量转换按块解析和渲染）。
+
+    Attributes:
+        stages (dict): 阶段名称 -> 累计耗时（秒）
+        elements (dict): 元素标签 -> ElementStats
+        input_bytes (int): 输入的Markdown字节数
+        output_bytes (int): 输出的Word文件字节数
+        paragraphs (int): 文档中的段落数（包括表格中的段落）
+        runs (int): 文档中的文本段（w:r）数
+        tables (int): 文档中的表格数
+        images (int): 文档中的图片数
+        equations (int): 文档中的公式数
+        media_bytes (int): 嵌入的图片总字节数（相同图片只计一次）
+        cached (bool): 是否直接使用了缓存的转换结果
+        peak_traced_bytes (int): tracemalloc 分析时的峰值分配量，未分析时为 None
+        peak_rss_bytes (int): 内存分析时的峰值常驻内存，未分析时为 None
+        memory (MemoryProfile): 内存分析期间按阶段统计内存，否则为 None
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.elements = {}
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.paragraphs = 0
+        self.runs = 0
+        self.tables = 0
+        self.images = 0
+        self.equations = 0
+        self.media_bytes = 0
+        self.cached = False
+        self.peak_traced_bytes = None
+        self.peak_rss_bytes = None
+        self.memory = None
+
+    @contextmanager
+    def stage(self, name):
+        """计时一个阶段，耗时累加到 stages[name]；内存分析时同时统计该阶段的内存"""
+        memory = self.memory
+        if memory is not None:
+            memory.begin(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+            if memory is not None:
+                memory.end()
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_element(self, tag, seconds):
+        """记录处理一个元素的耗时"""
+        stats = self.elements.get(tag)
+        if stats is None:
+            stats = self.elements[tag] = ElementStats()
+        stats.count += 1
+        stats.seconds += seconds
+
+    def merge(self, other):
+        """累加另一次转换（如书籍中的一个章节）的阶段耗时、元素统计和输入大小
+
+        并行转换时累加的是各工作进程的耗时之和，会大于实际用时。
+        """
+        for name, seconds in other.stages.items():
+            self.add_stage(name, seconds)
+        for tag, stats in other.elements.items():
+            mine = self.elements.get(tag)
+            if mine is None:
+                mine = self.elements[tag] = ElementStats()
+            mine.count += stats.count
+            mine.seconds += stats.seconds
+        self.input_bytes += other.input_bytes
+
+    @property
+    def total_seconds(self):
+        return sum(self.stages.values())
+
+    def collect_document(self, doc):
+        """统计文档中的段落、文本段、表格、图片、公式数和媒体大小"""
+        self.paragraphs = self.runs = self.tables = self.images = self.equations = 0
+        self.add_blocks(doc.element.body)
+        self.media_bytes = sum(len(rel.target_part.blob) for rel in doc.part.rels.values()
+                               if rel.reltype == RT.IMAGE and not rel.is_external)
+
+    def add_blocks(self, element):
+        """累加 element 中的段落、文本段、表格、图片和公式数（流式写入时按块统计）"""
+        self.paragraphs += sum(1 for _ in element.iter(qn('w:p')))
+        self.runs += sum(1 for _ in element.iter(qn('w:r')))
+        self.tables += sum(1 for _ in element.iter(qn('w:tbl')))
+        self.images += sum(1 for _ in element.iter(qn('wp:inline')))
+        self.equations += sum(1 for _ in element.iter(qn('m:oMath')))
+
+    def to_dict(self):
+        """转换为可序列化为JSON的字典"""
+        ordered = [name for name in STAGES if name in self.stages]
+        ordered += [name for name in self.stages if name not in STAGES]
+        return {
+            'stages': {name: round(self.stages[name], 6) for name in ordered},
+            'total_seconds': round(self.total_seconds, 6),
+            'elements': {
+                tag: {'count': stats.count, 'seconds': round(stats.seconds, 6)}
+                for tag, stats in sorted(self.elements.items(),
+                                         key=lambda item: -item[1].seconds)
+            },
+            'input_bytes': self.input_bytes,
+            'output_bytes': self.output_bytes,
+            'paragraphs': self.paragraphs,
+            'runs': self.runs,
+            'tables': self.tables,
+            'images': self.images,
+            'equations': self.equations,
+            'media_bytes': self.media_bytes,
+            'cached': self.cached,
+            'peak_traced_bytes': self.peak_traced_bytes,
+            'peak_rss_bytes': self.peak_rss_bytes,
+        }
+
+    def to_json(self, **extra):
+        """输出为单行JSON，extra 中的字段（如文件名）放在最前面"""
+        record = dict(extra)
+        record.update(self.to_dict())
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+    def summary(self):
+        """简短的文字摘要，用于日志"""
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.to_dict()['stages'].items())
+        return (f"{stages}; {self.paragraphs} 段落, {self.runs} 文本段, "
+                f"{self.images} 图片 ({self.media_bytes / 1024:.0f} KB)")
+
+
+@contextmanager
+def profile_conversion(mode, output_path, metrics=None):
+    """在 with 块内对转换进行性能分析并把结果写入 output_path
+
+    Args:
+        mode (str): 'cprofile' 保存 pstats 格式的调用统计（可用 snakeviz 等工具查看）；
+            'tracemalloc' 保存内存分配快照（tracemalloc.Snapshot.load 读取）；
+            'memory' 保存JSON内存报告：各阶段留存的内存、峰值分配量和峰值常驻内存
+        output_path (str | Path): 输出文件路径
+        metrics (ConversionMetrics): 使用 tracemalloc 或 memory 时把峰值分配量记录到
+            metrics.peak_traced_bytes；memory 方式需要传入转换使用的 metrics
+            才能按阶段统计，否则报告中只有整体的峰值
+    """
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(str(output_path))
+    elif mode == 'tracemalloc':
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            if metrics is not None:
+                metrics.peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+            if started:
+                tracemalloc.stop()
+            snapshot.dump(str(output_path))
+    elif mode == 'memory':
+        started = not tracemalloc.is_tracing()
+        if started:
+            # 只需要总量，一层调用栈的开销最小
+            tracemalloc.start()
+        profile = MemoryProfile()
+        profile.start()
+        if metrics is not None:
+            metrics.memory = profile
+        try:
+            yield
+        finally:
+            profile.finish()
+            if started:
+                tracemalloc.stop()
+            if metrics is not None:
+                metrics.memory = None
+                metrics.peak_traced_bytes = profile.peak_traced_bytes
+                metrics.peak_rss_bytes = profile.peak_rss_bytes
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(profile.report(metrics), f, ensure_ascii=False, indent=2)
+    else:
+        raise ValueError(f"未知的性能分析方式: {mode}")
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式docx包写入
+python-docx 在保存前把整个 document.xml 作为lxml树保存在内存中，保存时才一次性
+压缩所有部件。流式写入器在每批块级元素渲染完成后，把它们直接序列化到压缩包中的
+word/document.xml 并从树中移除；图片在渲染时写入磁盘上的临时文件，文档写完后
+再分块复制到压缩包。样式、编号、关系和内容类型等部件在最后写入。输出文档的大小
+不再影响内存占用。
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+import zipfile
+
+from lxml import etree
+from docx.image.image import Image
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI, PackURI
+from docx.opc.part import Part
+from docx.opc.pkgwriter import _ContentTypesItem
+from docx.oxml.ns import qn
+
+if __package__:
+    from .engine import IO_CHUNK_SIZE, temporary_path
+    from .metrics import ConversionMetrics
+else:
+    from engine import IO_CHUNK_SIZE, temporary_path
+    from metrics import ConversionMetrics
+
+
+# 序列化文档根元素时标记正文内容位置的注释
+BODY_MARKER = 'md2word-body'
+
+# 正文元素序列化结果的结束标签
+BODY_END = b'</w:body>'
+
+
+def split_document(document):
+    """把文档根元素序列化为正文内容之前和之后的两段XML
+
+    Args:
+        document: w:document 元素，正文中只有分节属性（或为空）
+
+    Returns:
+        tuple: (head, tail) 字节串，正文块级元素写在两者之间
+    """
+    body = document.body
+    marker = etree.Comment(BODY_MARKER)
+    body.insert(0, marker)
+    try:
+        xml = serialize_part_xml(document)
+    finally:
+        body.remove(marker)
+    head, tail = xml.split(f'<!--{BODY_MARKER}-->'.encode())
+    return head, tail
+
+
+class StreamingPackageWriter:
+    """把文档逐批写入docx压缩包
+
+    渲染器追加的块级元素在每次 flush() 时写入压缩包并从树中移除，正文中只
+    保留分节属性。图片需通过 add_image() 添加（把写入器设为
+    DocumentRenderer.media）。写入目标为同目录的临时文件，close() 完成后才
+    替换输出文件；abort() 删除临时文件，保留原有的输出文件。
+
+    Args:
+        doc (docx.document.Document): 渲染目标文档（new_document() 的结果）
+        output_file (str | Path): 输出的Word文件路径
+        metrics (ConversionMetrics): 累加写入耗时（save阶段）、元素统计和输出大小
+    """
+
+    def __init__(self, doc, output_file, metrics=None):
+        self.doc = doc
+        self.output_file = output_file
+        self.metrics = metrics if metrics is not None else ConversionMetrics()
+        self.tmp_path = temporary_path(output_file)
+        self._archive = zipfile.ZipFile(self.tmp_path, 'x', zipfile.ZIP_DEFLATED)
+        self._spool = tempfile.TemporaryFile()
+        self._images = {}
+        self._media = {}
+        self._partnames = {str(part.partname) for part in doc.part.package.iter_parts()}
+        self._next_image = 1
+        self._next_rid = 1
+        self.closed = False
+
+        head, _ = split_document(doc.element)
+        # 大小未知，可能超过4GB，需要ZIP64
+        self._document = self._archive.open('word/document.xml', 'w', force_zip64=True)
+        self._document.write(head)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.closed:
+            return
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @property
+    def media_bytes(self):
+        """已写入的图片总字节数（相同图片只计一次）"""
+        return sum(length for _, length in self._media.values())
+
+    def add_image(self, data):
+        """添加图片，按内容去重，图片数据写入磁盘上的临时文件
+
+        Returns:
+            tuple: (关系ID, docx.image.image.Image)，与 part.get_or_add_image 相同
+        """
+        image = Image.from_blob(data)
+        digest = hashlib.sha1(data).digest()
+        rid = self._images.get(digest)
+        if rid is None:
+            rid = self._new_rid()
+            part = Part(self._new_partname(image.ext), image.content_type, b'',
+                        self.doc.part.package)
+            self.doc.part.rels.add_relationship(RT.IMAGE, part, rid)
+            self._media[part.partname] = (self._spool.tell(), len(data))
+            self._spool.write(data)
+            self._images[digest] = rid
+        return rid, image
+
+    def _new_rid(self):
+        """分配文档部件中未使用的关系ID"""
+        rels = self.doc.part.rels
+        while f'rId{self._next_rid}' in rels:
+            self._next_rid += 1
+        rid = f'rId{self._next_rid}'
+        self._next_rid += 1
+        return rid
+
+    def _new_partname(self, ext):
+        """分配包中未使用的图片部件名"""
+        while True:
+            partname = f'/word/media/image{self._next_image}.{ext}'
+            self._next_image += 1
+            if partname not in self._partnames:
+                self._partnames.add(partname)
+                return PackURI(partname)
+
+    def flush(self):
+        """把正文中已渲染的块级元素写入压缩包并从树中移除"""
+        body = self.doc.element.body
+        sect_pr = body[-1] if len(body) and body[-1].tag == qn('w:sectPr') else None
+        if len(body) == (sect_pr is not None):
+            return
+        with self.metrics.stage('save'):
+            # 分节属性在文档结尾写入；渲染表格时需要用它计算页面宽度，写完后放回
+            if sect_pr is not None:
+                body.remove(sect_pr)
+            self.metrics.add_blocks(body)
+            # 序列化整个正文元素，命名空间只在 w:body 上声明一次
+            xml = etree.tostring(body, encoding='UTF-8', xml_declaration=False)
+            start = xml.index(b'>') + 1
+            self._document.write(memoryview(xml)[start:-len(BODY_END)])
+            del body[:]
+            if sect_pr is not None:
+                body.append(sect_pr)
+
+    def close(self, progress=None):
+        """写入文档结尾、图片和其余部件，然后替换输出文件
+
+        Args:
+            progress (ProgressRange): 按已复制的图片字节数报告进度
+        """
+        try:
+            self.flush()
+            with self.metrics.stage('save'):
+                self._finish_document()
+                self._write_media(progress)
+                self._write_parts()
+                self._archive.close()
+                self._spool.close()
+                os.replace(self.tmp_path, self.output_file)
+            self.closed = True
+        except BaseException:
+            self.abort()
+            raise
+        self.metrics.media_bytes = self.media_bytes
+        self.metrics.output_bytes = os.path.getsize(self.output_file)
+        if progress is not None:
+            progress.finish()
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        self.closed = True
+        self._spool.close()
+        for close in (self._document.close, self._archive.close):
+            try:
+                close()
+            except (OSError, ValueError):
+                pass
+        if self.tmp_path.exists():
+            self.tmp_path.unlink()
+
+    def _finish_document(self):
+        """写入正文之后的分节属性和结束标签"""
+        _, tail = split_document(self.doc.element)
+        self._document.write(tail)
+        self._document.close()
+
+    def _write_media(self, progress):
+        """把临时文件中的图片分块复制到压缩包（图片已压缩，不再压缩）"""
+        total = self.media_bytes or 1
+        done = 0
+        for partname, (offset, length) in self._media.items():
+            info = zipfile.ZipInfo(partname.membername, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = length
+            self._spool.seek(offset)
+            with self._archive.open(info, 'w') as dst:
+                remaining = length
+                while remaining:
+                    data = self._spool.read(min(IO_CHUNK_SIZE, remaining))
+                    dst.write(data)
+                    remaining -= len(data)
+            done += length
+            if progress is not None:
+                progress.update(done, total)
+
+    def _write_parts(self):
+        """写入内容类型、包关系以及除正文和图片以外的部件"""
+        package = self.doc.part.package
+        parts = list(package.iter_parts())
+        for part in parts:
+            if part is not self.doc.part:
+                part.before_marshal()
+        archive = self._archive
+        archive.writestr(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+        archive.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        for part in parts:
+            if part is not self.doc.part and part.partname not in self._media:
+                archive.writestr(part.partname.membername, part.blob)
+            if len(part.rels):
+                archive.writestr(part.partname.rels_uri.membername, part.rels.xml)
+
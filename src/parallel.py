@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行渲染
+按顶层块边界把一篇Markdown文档切分为大小接近的分片，各分片在工作进程中解析
+并渲染为片段（见 fragments.py），主进程按原顺序拼接（见 book.py 的
+ChapterMerger）并逐片写入输出压缩包（见 package_writer.py）。拼接时重新分配
+关系ID、图形对象ID和书签ID，合并编号定义，重名标题的书签名按文档顺序加后缀，
+单个超大文档也能用上多个CPU核。
+
+注意：引用式链接定义会附加到每个分片，跨分片的引用式链接仍然有效；脚注和缩写
+只在其所在的分片内生效。
+"""
+
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+if __package__:
+    from .book import ChapterMerger, capture_chapter
+    from .engine import (ConversionOptions, DocumentRenderer, PROGRESS_SAVE, ProgressRange,
+                         get_markdown, parse_markdown, _notify)
+    from .metrics import ConversionMetrics
+    from .package_writer import StreamingPackageWriter
+    from .streaming import FENCE_RE, iter_blocks
+else:
+    from book import ChapterMerger, capture_chapter
+    from engine import (ConversionOptions, DocumentRenderer, PROGRESS_SAVE, ProgressRange,
+                        get_markdown, parse_markdown, _notify)
+    from metrics import ConversionMetrics
+    from package_writer import StreamingPackageWriter
+    from streaming import FENCE_RE, iter_blocks
+
+
+# 每个工作进程分到的分片数：分片越多负载越均衡，拼接的次数也越多
+SHARDS_PER_JOB = 4
+
+# 分片的最小大小（字符数），更小的文档在当前进程中渲染，不启动进程池
+MIN_SHARD_SIZE = 128 * 1024
+
+# 引用式链接定义（[id]: url "title"），不包括脚注定义 [^id]:
+REFERENCE_RE = re.compile(r' {0,3}\[(?!\^)[^\]]+\]:[ \t]*\S')
+
+
+def reference_definitions(blocks):
+    """收集文档中的引用式链接定义行（跳过围栏代码块中的行）
+
+    Args:
+        blocks (list): iter_blocks() 切分出的顶层块
+
+    Returns:
+        str: 所有定义行，每行以换行符结尾
+    """
+    definitions = []
+    for block in blocks:
+        # 大多数块不含定义，先做子串检查
+        if ']:' not in block:
+            continue
+        fence = None
+        for line in block.splitlines():
+            match = FENCE_RE.match(line)
+            if fence:
+                if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence):
+                    fence = None
+            elif match:
+                fence = match.group(1)
+            elif REFERENCE_RE.match(line):
+                definitions.append(line + '\n')
+    return ''.join(definitions)
+
+
+def split_shards(blocks, count, min_size=MIN_SHARD_SIZE):
+    """把顶层块按顺序分为至多 count 个大小接近的分片
+
+    每个分片不小于 min_size（最后一个分片除外），单个超大的块不会被拆开。
+
+    Returns:
+        list: 分片的Markdown文本
+    """
+    total = sum(len(block) for block in blocks)
+    count = max(1, min(count, total // max(min_size, 1)))
+    target = total / count
+    shards = []
+    shard = []
+    size = 0
+    for block in blocks:
+        shard.append(block)
+        size += len(block)
+        if size >= target and len(shards) < count - 1:
+            shards.append(''.join(shard))
+            shard = []
+            size = 0
+    if shard or not shards:
+        shards.append(''.join(shard))
+    return shards
+
+
+def render_shard(source, text, base_path, options):
+    """在工作进程中解析并渲染一个分片
+
+    Args:
+        source (str): 分片名称（用于日志）
+        text (str): 分片的Markdown文本
+        base_path (str | Path): 解析相对图片路径的目录
+        options (ConversionOptions): 转换选项（不含目录）
+
+    Returns:
+        Chapter: 可序列化的渲染结果，带有分片中的标题锚点
+    """
+    metrics = ConversionMetrics()
+    renderer = DocumentRenderer(options, metrics=metrics)
+    doc = renderer.new_document()
+    root = parse_markdown(get_markdown(), text, options.parser, metrics)
+    renderer.html_to_docx(root, doc, Path(base_path))
+    return capture_chapter(source, doc, metrics, renderer.anchors.headings)
+
+
+def iter_shards(source, shards, definitions, base_path, options, jobs):
+    """按原顺序产生渲染好的分片
+
+    jobs 大于1时提交给进程池，同时等待中的分片不超过 jobs 的两倍，主进程拼接
+    较慢时不会堆积大量已渲染的片段；为1时在当前进程中依次渲染。
+    """
+    names = [f"{source}#{i + 1}" for i in range(len(shards))]
+    if jobs == 1 or len(shards) <= 1:
+        for name, text in zip(names, shards):
+            yield render_shard(name, text + definitions, base_path, options)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=min(jobs, len(shards)))
+    try:
+        pending = deque()
+        for name, text in zip(names, shards):
+            pending.append(executor.submit(render_shard, name, text + definitions,
+                                           base_path, options))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def convert_parallel(input_file, output_file, options=None, jobs=None,
+                     min_shard_size=MIN_SHARD_SIZE, log_callback=None, progress_callback=None,
+                     cache=None, metrics=None):
+    """并行转换单个文件
+
+    Args:
+        input_file (str): 输入的Markdown文件路径
+        output_file (str): 输出的Word文件路径
+        options (ConversionOptions): 转换选项
+        jobs (int): 工作进程数，默认为CPU核数；为1或文档较小时在当前进程中渲染
+        min_shard_size (int): 分片的最小大小（字符数）
+        log_callback (callable): 接收日志消息的回调
+        progress_callback (callable): 接收进度百分比(0-100)的回调，按已拼接的分片数计算
+        cache (ConversionCache): 转换结果缓存，为空时不使用缓存
+        metrics (ConversionMetrics): 累加各分片的阶段耗时（splice 为拼接耗时），
+            记录文档的元素统计和输出大小
+
+    Returns:
+        str: 输出的Word文件路径
+    """
+    options = options or ConversionOptions()
+    metrics = metrics if metrics is not None else ConversionMetrics()
+    jobs = jobs or os.cpu_count() or 1
+    base_path = Path(input_file).parent
+    metrics.input_bytes = os.path.getsize(input_file)
+
+    _notify(progress_callback, 0)
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key_for(input_file, options)
+        if cache_key is not None and cache.fetch(cache_key, output_file):
+            _notify(log_callback, f"使用缓存的转换结果: {output_file}")
+            metrics.cached = True
+            metrics.output_bytes = os.path.getsize(output_file)
+            _notify(progress_callback, 100)
+            return str(output_file)
+
+    with metrics.stage('read'):
+        with open(input_file, 'r', encoding='utf-8') as f:
+            blocks = list(iter_blocks(f))
+        definitions = reference_definitions(blocks)
+        shards = split_shards(blocks, jobs * SHARDS_PER_JOB, min_shard_size)
+        del blocks
+
+    renderer = DocumentRenderer(options, log_callback, metrics)
+    doc = renderer.new_document()
+    if options.include_toc:
+        # 目录写在文档开头，只有域，由Word打开时更新；分片本身不带目录
+        renderer.add_toc(doc)
+        options = ConversionOptions(**dict(options.to_dict(), include_toc=False))
+
+    _notify(log_callback, f"正在并行渲染 {len(shards)} 个分片...")
+    progress = ProgressRange(progress_callback, 0, PROGRESS_SAVE[0])
+    with StreamingPackageWriter(doc, output_file, metrics) as writer:
+        merger = ChapterMerger(doc, writer)
+        for i, shard in enumerate(iter_shards(Path(input_file).name, shards, definitions,
+                                              base_path, options, jobs)):
+            metrics.merge(shard.metrics)
+            with metrics.stage('splice'):
+                merger.add(shard)
+            writer.flush()
+            progress.update(i + 1, len(shards))
+        _notify(log_callback, f"正在保存到: {output_file}")
+        writer.close(ProgressRange(progress_callback, *PROGRESS_SAVE))
+
+    if cache_key is not None:
+        cache.store(cache_key, output_file)
+    _notify(progress_callback, 100)
+    return str(output_file)
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程图片下载
+基于 http.client 的连接池下载器：每个主机限制并发连接数并复用keep-alive连接，
+渲染前并行预取文档中的全部远程图片；下载结果连同ETag/Last-Modified保存在磁盘上，
+在有效期内重复转换无需访问网络，过期后发送条件请求重新验证
+"""
+
+import hashlib
+import http.client
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urljoin, urlsplit
+
+if __package__:
+    from .cache import ConversionCache, DEFAULT_MAX_BYTES, default_cache_dir
+else:
+    from cache import ConversionCache, DEFAULT_MAX_BYTES, default_cache_dir
+
+
+# 每个主机的最大并发连接数
+DEFAULT_PER_HOST = 4
+
+# 预取时的最大并发下载数
+DEFAULT_WORKERS = 16
+
+# 连接和读取超时（秒）
+DEFAULT_TIMEOUT = 10
+
+# 单张图片的大小上限
+DEFAULT_MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# 服务器未给出 Cache-Control: max-age 时的有效期（秒）
+DEFAULT_MAX_AGE = 24 * 3600
+
+# 内存中最多保留的下载结果数和总字节数
+MEMORY_ENTRIES = 256
+MEMORY_BYTES = 256 * 1024 * 1024
+
+# 下载失败的地址在这段时间内（秒）直接报告失败，不再访问网络
+ERROR_TTL = 60
+
+# 最多跟随的重定向次数
+MAX_REDIRECTS = 5
+
+USER_AGENT = 'md2word'
+
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def is_remote(src):
+    """判断图片地址是否为远程地址"""
+    return src.startswith(('http://', 'https://'))
+
+
+def default_remote_cache_dir():
+    """返回默认的远程图片缓存目录"""
+    return os.path.join(os.path.dirname(default_cache_dir()), 'remote')
+
+
+class RemoteImageError(Exception):
+    """远程图片下载失败"""
+
+
+class CachedResponse:
+    """缓存的下载结果及其验证信息"""
+
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'stored_at', 'max_age')
+
+    def __init__(self, url, body, etag=None, last_modified=None, stored_at=None,
+                 max_age=DEFAULT_MAX_AGE):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at if stored_at is not None else time.time()
+        self.max_age = max_age
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @property
+    def fresh(self):
+        """是否仍在有效期内（无需重新验证）"""
+        return self.max_age is not None and time.time() - self.stored_at < self.max_age
+
+
+class RemoteCache(ConversionCache):
+    """下载结果的磁盘缓存"""
+
+    suffix = '.remote'
+
+    def key_for_url(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def get(self, url):
+        entry = self._entry_path(self.key_for_url(url))
+        try:
+            with open(entry, 'rb') as f:
+                response = pickle.load(f)
+            os.utime(entry)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return response
+
+    def put(self, response):
+        data = pickle.dumps(response, pickle.HIGHEST_PROTOCOL)
+        self._write_entry(self.key_for_url(response.url), BytesIO(data))
+        self.stats.stores += 1
+        self.maybe_evict()
+
+
+class HostPool:
+    """单个主机的连接池，限制并发连接数并复用空闲连接"""
+
+    def __init__(self, scheme, netloc, limit, timeout):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(limit)
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        self.slots.acquire()
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        connection_class = (http.client.HTTPSConnection if self.scheme == 'https'
+                            else http.client.HTTPConnection)
+        return connection_class(self.netloc, timeout=self.timeout)
+
+    def release(self, connection, reusable):
+        if reusable:
+            with self.lock:
+                self.idle.append(connection)
+        else:
+            connection.close()
+        self.slots.release()
+
+    def close(self):
+        with self.lock:
+            for connection in self.idle:
+                connection.close()
+            self.idle.clear()
+
+
+class RemoteFetcher:
+    """并发的远程图片下载器
+
+    Args:
+        cache_dir (str): 磁盘缓存目录，为空时只在内存中缓存
+        per_host (int): 每个主机的最大并发连接数
+        workers (int): 预取时的最大并发下载数
+        timeout (float): 连接和读取超时（秒）
+        max_bytes (int): 单张图片的大小上限，超出时放弃下载
+        max_age (int): 服务器未指定有效期时缓存的有效期（秒）
+        cache_bytes (int): 磁盘缓存总大小上限
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir=None, per_host=DEFAULT_PER_HOST, workers=DEFAULT_WORKERS,
+                 timeout=DEFAULT_TIMEOUT, max_bytes=DEFAULT_MAX_IMAGE_BYTES,
+                 max_age=DEFAULT_MAX_AGE, cache_bytes=DEFAULT_MAX_BYTES):
+        self.disk_cache = RemoteCache(cache_dir, cache_bytes) if cache_dir else None
+        self.per_host = per_host
+        self.workers = workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.requests = 0
+        self._pools = {}
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, cache_dir=None, cache_bytes=DEFAULT_MAX_BYTES):
+        """返回进程内共享的下载器，使多次转换复用连接和下载结果"""
+        key = (str(cache_dir) if cache_dir else None, cache_bytes)
+        with cls._shared_lock:
+            fetcher = cls._shared.get(key)
+            if fetcher is None:
+                fetcher = cls._shared[key] = cls(cache_dir, cache_bytes=cache_bytes)
+            return fetcher
+
+    def prefetch(self, urls):
+        """并行下载一组地址（跳过仍在有效期内的和最近失败的），失败的地址在 get() 时报告"""
+        with self._lock:
+            urls = [url for url in dict.fromkeys(urls)
+                    if (url not in self._memory or not self._memory[url].fresh)
+                    and self._recent_error(url) is None]
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(urls))) as executor:
+            list(executor.map(self._prefetch_one, urls))
+
+    def _prefetch_one(self, url):
+        try:
+            self.fetch(url)
+        except Exception:
+            # 错误已由 fetch() 记录，在 get() 时报告
+            pass
+
+    def _recent_error(self, url):
+        """ERROR_TTL 内该地址下载失败的异常，没有时返回 None（调用时需持有锁）"""
+        entry = self._errors.get(url)
+        if entry is None:
+            return None
+        error, failed_at = entry
+        if time.monotonic() - failed_at >= ERROR_TTL:
+            del self._errors[url]
+            return None
+        return error
+
+    def cached(self, url):
+        """返回内存中已下载的图片字节，没有时返回 None（不访问网络）"""
+        with self._lock:
+            response = self._memory.get(url)
+        return response.body if response is not None else None
+
+    def get(self, url):
+        """返回图片字节，优先使用预取结果
+
+        最近下载失败的地址直接抛出同一个错误，同一地址在文档中被引用多次时
+        只访问一次网络。
+
+        Raises:
+            RemoteImageError: 下载失败
+        """
+        with self._lock:
+            cached = self._memory.get(url)
+            error = self._recent_error(url)
+        if error is not None:
+            raise error
+        if cached is not None:
+            return cached.body
+        return self.fetch(url)
+
+    def fetch(self, url):
+        """下载图片；缓存在有效期内时不访问网络，过期时发送条件请求重新验证"""
+        with self._lock:
+            cached = self._memory.get(url)
+        if cached is None and self.disk_cache:
+            cached = self.disk_cache.get(url)
+        if cached is not None and cached.fresh:
+            self._remember(cached)
+            return cached.body
+
+        try:
+            response = self._download(url, cached)
+        except Exception as e:
+            with self._lock:
+                self._errors[url] = (e, time.monotonic())
+            raise
+        if self.disk_cache and response.max_age is not None:
+            self.disk_cache.put(response)
+        self._remember(response)
+        return response.body
+
+    def _remember(self, response):
+        """把下载结果放入内存，按条目数和总字节数淘汰最久未使用的结果"""
+        with self._lock:
+            self._errors.pop(response.url, None)
+            previous = self._memory.pop(response.url, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous.body)
+            self._memory[response.url] = response
+            self._memory_bytes += len(response.body)
+            while len(self._memory) > 1 and (len(self._memory) > MEMORY_ENTRIES
+                                             or self._memory_bytes > MEMORY_BYTES):
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted.body)
+
+    def _pool(self, scheme, netloc):
+        with self._lock:
+            pool = self._pools.get((scheme, netloc))
+            if pool is None:
+                pool = self._pools[(scheme, netloc)] = HostPool(
+                    scheme, netloc, self.per_host, self.timeout)
+            return pool
+
+    def _download(self, url, cached=None):
+        """发送请求，跟随重定向；cached 不为空时发送条件请求"""
+        target = url
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(target)
+            if parts.scheme not in ('http', 'https'):
+                raise RemoteImageError(f"不支持的地址: {target}")
+            headers = {'User-Agent': USER_AGENT, 'Accept': 'image/*'}
+            if cached is not None:
+                if cached.etag:
+                    headers['If-None-Match'] = cached.etag
+                if cached.last_modified:
+                    headers['If-Modified-Since'] = cached.last_modified
+
+            status, response_headers, body = self._request(parts, headers)
+            if status in _REDIRECT_STATUSES and response_headers.get('location'):
+                target = urljoin(target, response_headers['location'])
+                continue
+
+            max_age = self._max_age(response_headers)
+            if status == 304 and cached is not None:
+                return CachedResponse(url, cached.body,
+                                      response_headers.get('etag', cached.etag),
+                                      response_headers.get('last-modified', cached.last_modified),
+                                      max_age=max_age)
+            if status != 200:
+                raise RemoteImageError(f"下载失败 (HTTP {status}): {url}")
+            return CachedResponse(url, body, response_headers.get('etag'),
+                                  response_headers.get('last-modified'), max_age=max_age)
+        raise RemoteImageError(f"重定向次数过多: {url}")
+
+    def _request(self, parts, headers):
+        """在连接池中的连接上发送GET请求
+
+        Returns:
+            tuple: (状态码, 小写键的响应头字典, 响应体)
+        """
+        pool = self._pool(parts.scheme, parts.netloc)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        for attempt in range(2):
+            connection = pool.acquire()
+            reusable = False
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response_headers = {k.lower(): v for k, v in response.getheaders()}
+                length = response_headers.get('content-length')
+                if length and length.isdigit() and int(length) > self.max_bytes:
+                    raise RemoteImageError(f"图片超过大小上限: {parts.geturl()}")
+                body = response.read(self.max_bytes + 1)
+                if len(body) > self.max_bytes:
+                    raise RemoteImageError(f"图片超过大小上限: {parts.geturl()}")
+                reusable = not response.will_close
+                with self._lock:
+                    self.requests += 1
+                return response.status, response_headers, body
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                # 复用的keep-alive连接可能已被服务器关闭，换新连接重试一次
+                if attempt:
+                    raise RemoteImageError(f"无法下载 {parts.geturl()}: {e}") from e
+            except (OSError, http.client.HTTPException) as e:
+                raise RemoteImageError(f"无法下载 {parts.geturl()}: {e}") from e
+            finally:
+                pool.release(connection, reusable)
+
+    def _max_age(self, headers):
+        """根据 Cache-Control 计算有效期
+
+        Returns:
+            int: 有效期（秒），no-cache 时为0（每次重新验证），no-store 时为 None（不缓存）
+        """
+        directives = [d.strip().lower() for d in headers.get('cache-control', '').split(',')]
+        if 'no-store' in directives:
+            return None
+        if 'no-cache' in directives:
+            return 0
+        for directive in directives:
+            if directive.startswith('max-age='):
+                value = directive[len('max-age='):]
+                if value.isdigit():
+                    return int(value)
+        return self.max_age
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
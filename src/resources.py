@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片资源解析
+内存转换接口不读取文件系统，图片由资源解析器提供：映射（路径 -> 字节）、
+zip压缩包或任意 callable(src) -> bytes。所有形式都统一为 callable，
+找不到资源时返回 None。路径按Markdown文件所在目录解析，不能用绝对路径或
+“..”跳出资源根目录。
+"""
+
+import posixpath
+import zipfile
+from collections.abc import Mapping
+from io import BytesIO
+from urllib.parse import unquote
+
+
+def normalize_src(src, base=''):
+    """把图片地址转为资源根目录下的规范路径
+
+    Args:
+        src (str): Markdown中的图片地址
+        base (str): Markdown文件在资源根目录中的所在目录
+
+    Returns:
+        str: 规范路径（使用 / 分隔）；地址为绝对路径或跳出根目录时返回 None
+    """
+    src = unquote(src.split('#', 1)[0].split('?', 1)[0]).replace('\\', '/')
+    if not src or src.startswith('/') or ':' in src:
+        return None
+    path = posixpath.normpath(posixpath.join(base, src))
+    if path == '..' or path.startswith('../'):
+        return None
+    return path
+
+
+class MappingResources:
+    """由映射提供图片
+
+    Args:
+        mapping (Mapping): 路径 -> 图片字节，路径相对于资源根目录
+        base (str): Markdown文件在资源根目录中的所在目录
+    """
+
+    def __init__(self, mapping, base=''):
+        self.base = base
+        self.items = {}
+        for name, data in mapping.items():
+            key = normalize_src(str(name))
+            if key is not None:
+                self.items[key] = data
+
+    def __call__(self, src):
+        key = normalize_src(src, self.base)
+        return self.items.get(key) if key is not None else None
+
+
+class ZipResources:
+    """由zip压缩包提供图片，按需读取，不解压到磁盘
+
+    Args:
+        archive (zipfile.ZipFile): 压缩包
+        base (str): Markdown文件在压缩包中的所在目录
+    """
+
+    def __init__(self, archive, base=''):
+        self.archive = archive
+        self.base = base
+        self.names = {info.filename.replace('\\', '/'): info
+                      for info in archive.infolist() if not info.is_dir()}
+
+    def __call__(self, src):
+        key = normalize_src(src, self.base)
+        info = self.names.get(key) if key is not None else None
+        return self.archive.read(info) if info is not None else None
+
+
+def no_resources(src):
+    """不提供任何图片"""
+    return None
+
+
+def resource_resolver(resources, base=''):
+    """把各种形式的资源统一为 callable(src) -> bytes | None
+
+    Args:
+        resources: None、映射、zipfile.ZipFile、zip压缩包的字节，或 callable
+        base (str): Markdown文件在资源根目录中的所在目录（callable 不使用）
+
+    Returns:
+        callable: 资源解析器
+    """
+    if resources is None:
+        return no_resources
+    if isinstance(resources, zipfile.ZipFile):
+        return ZipResources(resources, base)
+    if isinstance(resources, (bytes, bytearray, memoryview)):
+        return ZipResources(zipfile.ZipFile(BytesIO(resources)), base)
+    if isinstance(resources, Mapping):
+        return MappingResources(resources, base)
+    if callable(resources):
+        return resources
+    raise TypeError(f"不支持的资源类型: {type(resources).__name__}")
@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地HTTP转换服务
+基于asyncio的HTTP/1.1服务，转换在有界的进程池中执行，无需启动Tk界面：
+
+    POST /convert   请求体为Markdown文本，或包含Markdown和图片的zip压缩包，返回 .docx
+    GET  /health    服务状态和队列深度
+    GET  /metrics   按状态码的请求数、延迟直方图、队列深度和各阶段累计耗时（JSON）
+
+所有工作进程都忙且排队的请求达到上限时立即返回429；请求体大小和每个请求的
+处理时间（含排队）分别受限。
+
+用法:
+    python -m src.server --port 8765 --workers 4
+    curl --data-binary @doc.md -o doc.docx "http://127.0.0.1:8765/convert?toc=1"
+    curl --data-binary @bundle.zip -H "Content-Type: application/zip" -o doc.docx \\
+        "http://127.0.0.1:8765/convert?main=index.md"
+"""
+
+import argparse
+import asyncio
+import bisect
+import http
+import json
+import os
+import posixpath
+import signal
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+if __package__:
+    from .batch import MARKDOWN_SUFFIXES
+    from .engine import ConversionOptions, DocumentRenderer, convert_to_stream, get_markdown
+    from .highlight import DEFAULT_CODE_STYLE
+    from .metrics import STAGES, ConversionMetrics
+else:
+    from batch import MARKDOWN_SUFFIXES
+    from engine import ConversionOptions, DocumentRenderer, convert_to_stream, get_markdown
+    from highlight import DEFAULT_CODE_STYLE
+    from metrics import STAGES, ConversionMetrics
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# 排队等待工作进程的请求数上限，超出时返回429
+DEFAULT_QUEUE_LIMIT = 32
+
+# 请求体大小上限
+DEFAULT_MAX_BODY_BYTES = 32 * 1024 * 1024
+
+# 每个转换请求的处理时间上限（秒，含排队）
+DEFAULT_TIMEOUT = 60.0
+
+# 工作进程未能按时中断转换时，服务端额外等待的时间（秒）
+TIMEOUT_GRACE = 5.0
+
+# 请求头大小上限，以及读取请求头的超时（秒，也是空闲连接的保持时间）
+MAX_HEADER_BYTES = 64 * 1024
+HEADER_TIMEOUT = 10.0
+
+# zip压缩包解压后的大小和文件数上限
+MAX_BUNDLE_BYTES = 256 * 1024 * 1024
+MAX_BUNDLE_FILES = 10000
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 返回429/503时建议客户端等待的秒数
+RETRY_AFTER_SECONDS = 1
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+
+# 查询参数 -> (ConversionOptions 参数, 类型)
+QUERY_OPTIONS = {
+    'toc': ('include_toc', bool),
+    'images': ('process_images', bool),
+    'code_style': ('code_style', str),
+    'parser': ('parser', str),
+    'image_dpi': ('image_dpi', int),
+}
+
+_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+_FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+class HTTPError(Exception):
+    """以指定状态码结束请求
+
+    Args:
+        status (int): HTTP状态码
+        message (str): 返回给客户端的错误说明
+        headers (dict): 额外的响应头
+        close (bool): 是否在响应后关闭连接（请求体未读取时必须关闭）
+    """
+
+    def __init__(self, status, message, headers=None, close=False):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+        self.close = close
+
+
+class BundleError(ValueError):
+    """上传的zip压缩包无效"""
+
+
+class ConversionTimeout(Exception):
+    """转换超过了请求的时间上限"""
+
+
+@contextmanager
+def limit_time(seconds):
+    """在 with 块内限制执行时间，超时抛出 ConversionTimeout
+
+    使用 SIGALRM，只在主线程中生效（进程池的工作进程在主线程中执行任务）；
+    其他线程或不支持 setitimer 的平台（Windows）上不做限制，由服务端的超时兜底。
+    """
+    if (not seconds or not hasattr(signal, 'setitimer')
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise ConversionTimeout(f"转换超过 {seconds:.1f} 秒")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def open_bundle(data, main=None):
+    """打开上传的zip压缩包并确定其中的Markdown文件（不解压到磁盘）
+
+    Args:
+        data (bytes): zip压缩包内容
+        main (str): 压缩包中Markdown文件的路径；为空时使用唯一的Markdown文件或 index.md
+
+    Returns:
+        tuple: (zipfile.ZipFile, Markdown文件在压缩包中的路径)
+
+    Raises:
+        BundleError: 压缩包无效、过大或找不到Markdown文件
+    """
+    try:
+        archive = zipfile.ZipFile(BytesIO(data))
+    except zipfile.BadZipFile:
+        raise BundleError("无效的zip压缩包")
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if len(members) > MAX_BUNDLE_FILES:
+        raise BundleError(f"压缩包中的文件超过 {MAX_BUNDLE_FILES} 个")
+    if sum(info.file_size for info in members) > MAX_BUNDLE_BYTES:
+        raise BundleError(f"压缩包解压后超过 {MAX_BUNDLE_BYTES // (1024 * 1024)} MB")
+    names = [info.filename for info in members]
+
+    if main is None:
+        markdown_files = [name for name in names if name.lower().endswith(MARKDOWN_SUFFIXES)]
+        if len(markdown_files) == 1:
+            main = markdown_files[0]
+        elif 'index.md' in markdown_files:
+            main = 'index.md'
+        else:
+            raise BundleError("压缩包中应只有一个Markdown文件或包含 index.md，也可以用 main 参数指定")
+    elif main not in names:
+        raise BundleError(f"压缩包中没有 {main}")
+    return archive, main
+
+
+def convert_payload(data, options, bundle=False, main=None, time_limit=None):
+    """在工作进程中转换一个请求（模块级函数，可以传给进程池）
+
+    完全在内存中进行：压缩包中的图片按需读取，直接上传的Markdown不能引用
+    任何本地文件。
+
+    Args:
+        data (bytes): Markdown文本（UTF-8）或zip压缩包
+        options (ConversionOptions): 转换选项
+        bundle (bool): data 是否为zip压缩包
+        main (str): 压缩包中Markdown文件的路径
+        time_limit (float): 时间上限（秒）
+
+    Returns:
+        tuple: (Word文档字节, 指标字典)
+
+    Raises:
+        BundleError: 压缩包无效
+        ConversionTimeout: 超过时间上限
+    """
+    metrics = ConversionMetrics()
+    output = BytesIO()
+    with limit_time(time_limit):
+        if bundle:
+            archive, main = open_bundle(data, main)
+            with archive:
+                try:
+                    source = archive.read(main).decode('utf-8')
+                except UnicodeDecodeError:
+                    raise BundleError(f"{main} 必须是UTF-8编码")
+                convert_to_stream(source, output, options, archive, posixpath.dirname(main),
+                                  metrics=metrics)
+        else:
+            convert_to_stream(data, output, options, metrics=metrics)
+    return output.getvalue(), metrics.to_dict()
+
+
+def warm_up(options):
+    """在工作进程中预先创建Markdown解析器和样式模板"""
+    get_markdown()
+    DocumentRenderer(options).new_document()
+
+
+class LatencyHistogram:
+    """延迟直方图（累计计数，与Prometheus直方图的 le 桶相同）
+
+    Args:
+        bounds (tuple): 桶上界（秒），按升序排列
+    """
+
+    __slots__ = ('bounds', 'counts', 'count', 'total')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def to_dict(self):
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'buckets': buckets, 'count': self.count, 'sum': round(self.total, 6)}
+
+
+class ServerStats:
+    """服务的累计统计"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.responses = {}
+        self.latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+        self.conversion = LatencyHistogram()
+        self.stages = {}
+        self.input_bytes = 0
+        self.output_bytes = 0
+
+    def count_response(self, status):
+        key = str(status)
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+    def add_conversion(self, seconds, metrics):
+        """记录一次成功转换的耗时和工作进程返回的指标"""
+        self.conversion.observe(seconds)
+        for name, value in metrics['stages'].items():
+            self.stages[name] = self.stages.get(name, 0.0) + value
+        self.input_bytes += metrics['input_bytes']
+        self.output_bytes += metrics['output_bytes']
+
+    def to_dict(self):
+        ordered = [name for name in STAGES if name in self.stages]
+        ordered += [name for name in self.stages if name not in STAGES]
+        return {
+            'uptime_seconds': round(time.monotonic() - self.started_at, 3),
+            'responses': dict(sorted(self.responses.items())),
+            'latency_seconds': self.latency.to_dict(),
+            'queue_wait_seconds': self.queue_wait.to_dict(),
+            'conversion_seconds': self.conversion.to_dict(),
+            'stage_seconds': {name: round(self.stages[name], 6) for name in ordered},
+            'input_bytes': self.input_bytes,
+            'output_bytes': self.output_bytes,
+        }
+
+
+class Request:
+    """解析后的HTTP请求"""
+
+    __slots__ = ('method', 'path', 'query', 'headers', 'body', 'keep_alive')
+
+    def __init__(self, method, target, version, headers):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = b''
+        connection = headers.get('connection', '').lower()
+        self.keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+
+def format_response(status, headers, body, keep_alive):
+    """生成HTTP/1.1响应的字节"""
+    lines = [f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    lines.append(f"Content-Length: {len(body)}")
+    lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body
+
+
+def json_body(data):
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def parse_bool(value):
+    value = value.lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    raise ValueError(f"无效的布尔值: {value}")
+
+
+class ConversionServer:
+    """HTTP转换服务
+
+    最多同时进行 workers 个转换，另有至多 queue_limit 个请求排队等待；
+    超出时立即返回429。
+
+    Args:
+        host (str): 监听地址，默认只监听本机
+        port (int): 监听端口，为0时由系统分配（启动后见 self.port）
+        workers (int): 工作进程数，默认为CPU核数
+        queue_limit (int): 排队请求数上限
+        max_body_bytes (int): 请求体大小上限，超出时返回413
+        timeout (float): 每个转换请求的时间上限（秒，含排队），超出时返回504
+        options (ConversionOptions): 默认转换选项，请求可用查询参数覆盖
+        executor (concurrent.futures.Executor): 执行转换的线程池或进程池，
+            默认创建 ProcessPoolExecutor（服务关闭时一并关闭）
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None,
+                 queue_limit=DEFAULT_QUEUE_LIMIT, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                 timeout=DEFAULT_TIMEOUT, options=None, executor=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_limit = queue_limit
+        self.max_body_bytes = max_body_bytes
+        self.timeout = timeout
+        self.timeout_grace = TIMEOUT_GRACE
+        self.options = options or ConversionOptions(remote_images=False)
+        self.executor = executor
+        self.owns_executor = executor is None
+        self.convert_function = convert_payload
+        self.stats = ServerStats()
+        self.running = 0
+        self.waiting = 0
+        self._slots = None
+        self._server = None
+
+    async def start(self):
+        """开始监听，并在后台预热工作进程"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.owns_executor:
+            loop = asyncio.get_running_loop()
+            for _ in range(self.workers):
+                loop.run_in_executor(self.executor, warm_up, self.options)
+
+    async def serve_forever(self):
+        """处理请求直到任务被取消（需先调用 start）"""
+        await self._server.serve_forever()
+
+    async def close(self):
+        """停止监听并关闭自己创建的进程池"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.owns_executor and self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def overloaded(self):
+        """所有工作进程都忙且队列已满"""
+        return self._slots.locked() and self.waiting >= self.queue_limit
+
+    async def handle_connection(self, reader, writer):
+        """处理一个连接上的请求（支持keep-alive）"""
+        try:
+            while True:
+                close = False
+                try:
+                    request = await self.read_request(reader, writer)
+                    if request is None:
+                        break
+                    close = not request.keep_alive
+                    status, headers, body = await self.dispatch(request)
+                except HTTPError as e:
+                    status = e.status
+                    headers = dict(e.headers, **{'Content-Type': JSON_CONTENT_TYPE})
+                    body = json_body({'error': e.message, 'status': e.status})
+                    close = close or e.close
+                self.stats.count_response(status)
+                writer.write(format_response(status, headers, body, not close))
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader, writer):
+        """读取一个请求，连接已关闭或空闲超时时返回 None
+
+        请求体在读取前检查大小上限和过载状态，拒绝时不读取请求体并关闭连接。
+        """
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HEADER_TIMEOUT)
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None
+            raise HTTPError(400, "请求不完整", close=True)
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "请求头过大", close=True)
+        except asyncio.TimeoutError:
+            return None
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HTTPError(400, "无效的请求行", close=True)
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        request = Request(method, target, version, headers)
+
+        if 'transfer-encoding' in headers:
+            raise HTTPError(411, "需要 Content-Length，不支持分块传输", close=True)
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, "无效的 Content-Length", close=True)
+        if length < 0:
+            raise HTTPError(400, "无效的 Content-Length", close=True)
+        if length > self.max_body_bytes:
+            raise HTTPError(413, f"请求体超过 {self.max_body_bytes} 字节上限", close=True)
+        if length and request.path == '/convert' and self.overloaded():
+            raise HTTPError(429, "转换队列已满，请稍后重试",
+                            {'Retry-After': str(RETRY_AFTER_SECONDS)}, close=True)
+        if length:
+            if headers.get('expect', '').lower() == '100-continue':
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            try:
+                request.body = await asyncio.wait_for(reader.readexactly(length), self.timeout)
+            except asyncio.TimeoutError:
+                raise HTTPError(408, "读取请求体超时", close=True)
+        return request
+
+    async def dispatch(self, request):
+        """按路径和方法分派请求，返回 (状态码, 响应头, 响应体)"""
+        routes = {
+            '/convert': ('POST', self.handle_convert),
+            '/health': ('GET', self.handle_health),
+            '/metrics': ('GET', self.handle_metrics),
+        }
+        if request.path not in routes:
+            raise HTTPError(404, f"未知的路径: {request.path}")
+        method, handler = routes[request.path]
+        if request.method != method:
+            raise HTTPError(405, f"{request.path} 只支持 {method}", {'Allow': method})
+        if request.path != '/convert':
+            return await handler(request)
+
+        start = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            self.stats.latency.observe(time.perf_counter() - start)
+
+    async def handle_health(self, request):
+        return 200, {'Content-Type': JSON_CONTENT_TYPE}, json_body(self.state())
+
+    async def handle_metrics(self, request):
+        data = self.state()
+        data.update(self.stats.to_dict())
+        return 200, {'Content-Type': JSON_CONTENT_TYPE}, json_body(data)
+
+    def state(self):
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'running': self.running,
+            'queue_depth': self.waiting,
+            'queue_limit': self.queue_limit,
+        }
+
+    def request_options(self, query):
+        """用查询参数覆盖默认转换选项
+
+        Raises:
+            HTTPError: 参数无效（400）
+        """
+        values = self.options.to_dict()
+        try:
+            for key, (name, kind) in QUERY_OPTIONS.items():
+                if key in query:
+                    values[name] = parse_bool(query[key]) if kind is bool else kind(query[key])
+            options = ConversionOptions(**values)
+        except ValueError as e:
+            raise HTTPError(400, f"无效的参数: {e}")
+        if options.image_dpi <= 0:
+            raise HTTPError(400, f"无效的参数: image_dpi 必须为正整数: {options.image_dpi}")
+        return options
+
+    async def handle_convert(self, request):
+        """转换请求：排队等待空闲的工作进程，在进程池中转换并返回Word文档"""
+        start = time.perf_counter()
+        body = request.body
+        if not body:
+            raise HTTPError(400, "请求体为空")
+        options = self.request_options(request.query)
+        bundle = (request.headers.get('content-type', '').startswith('application/zip')
+                  or body[:4] == b'PK\x03\x04')
+        if not bundle:
+            try:
+                body.decode('utf-8')
+            except UnicodeDecodeError:
+                raise HTTPError(400, "Markdown必须是UTF-8编码")
+
+        # 排队等待空闲的工作进程
+        if self.overloaded():
+            raise HTTPError(429, "转换队列已满，请稍后重试",
+                            {'Retry-After': str(RETRY_AFTER_SECONDS)})
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(503, "排队等待超时", {'Retry-After': str(RETRY_AFTER_SECONDS)})
+        finally:
+            self.waiting -= 1
+        queued = time.perf_counter() - start
+        self.stats.queue_wait.observe(queued)
+
+        # 名额在转换真正结束时才释放（超时返回后工作进程可能仍在运行）
+        remaining = max(self.timeout - queued, 0.001)
+        self.running += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self.executor, self.convert_function, body, options,
+                                          bundle, request.query.get('main'), remaining)
+        except BaseException:
+            self.release_slot()
+            raise
+        future.add_done_callback(lambda _: self.release_slot())
+        converting = time.perf_counter()
+        try:
+            data, metrics = await asyncio.wait_for(asyncio.shield(future),
+                                                   remaining + self.timeout_grace)
+        except (asyncio.TimeoutError, ConversionTimeout):
+            raise HTTPError(504, f"转换超过 {self.timeout:.0f} 秒上限")
+        except BundleError as e:
+            raise HTTPError(400, str(e))
+        except BrokenProcessPool:
+            self.restart_executor()
+            raise HTTPError(500, "工作进程异常退出")
+        except Exception as e:
+            raise HTTPError(500, f"转换失败: {e}")
+        self.stats.add_conversion(time.perf_counter() - converting, metrics)
+        return 200, {
+            'Content-Type': DOCX_CONTENT_TYPE,
+            'Content-Disposition': 'attachment; filename="document.docx"',
+        }, data
+
+    def release_slot(self):
+        self.running -= 1
+        self._slots.release()
+
+    def restart_executor(self):
+        """工作进程崩溃后重建进程池（只重建自己创建的进程池）"""
+        if self.owns_executor:
+            self.executor.shutdown(wait=False)
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="md2word-server",
+        description="本地HTTP转换服务：POST Markdown或zip压缩包到 /convert，返回Word文档"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址，默认只监听本机")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="工作进程数，默认为CPU核数")
+    parser.add_argument("--queue-limit", type=int, default=DEFAULT_QUEUE_LIMIT,
+                        help="排队请求数上限，超出时返回429")
+    parser.add_argument("--max-body-mb", type=float, default=DEFAULT_MAX_BODY_BYTES / (1024 * 1024),
+                        help="请求体大小上限（MB），超出时返回413")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="每个转换请求的时间上限（秒，含排队），超出时返回504")
+    parser.add_argument("--reference-docx", help="参考Word文档，沿用其中的样式")
+    parser.add_argument("--code-style", default=DEFAULT_CODE_STYLE,
+                        help="默认的代码块高亮样式，请求可用 code_style 参数覆盖")
+    return parser
+
+
+def main(argv=None):
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    options = ConversionOptions(reference_docx=args.reference_docx, code_style=args.code_style)
+    server = ConversionServer(args.host, args.port, args.workers, args.queue_limit,
+                              int(args.max_body_mb * 1024 * 1024), args.timeout, options)
+
+    async def serve():
+        await server.start()
+        print(f"转换服务已启动: http://{args.host}:{server.port} "
+              f"({server.workers} 个工作进程, 队列上限 {server.queue_limit})")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\n转换服务已停止")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
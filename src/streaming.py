@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式转换
+按顶层块边界切分超大Markdown文件，逐块解析并渲染，转换过程中不同时持有
+完整的Markdown文本、HTML字符串和BeautifulSoup树；渲染结果逐块写入输出的
+压缩包（见 package_writer.py），也不持有完整的文档树
+
+注意：分块解析时，引用式链接定义、脚注和缩写只在其所在的块内生效。
+"""
+
+import os
+import re
+from pathlib import Path
+
+if __package__:
+    from .engine import (ConversionOptions, DocumentRenderer, PROGRESS_SAVE, ProgressRange,
+                         get_markdown, parse_markdown, _notify)
+    from .metrics import ConversionMetrics
+    from .package_writer import StreamingPackageWriter
+else:
+    from engine import (ConversionOptions, DocumentRenderer, PROGRESS_SAVE, ProgressRange,
+                        get_markdown, parse_markdown, _notify)
+    from metrics import ConversionMetrics
+    from package_writer import StreamingPackageWriter
+
+
+# 默认每个解析块的大小（字符数）
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# 围栏代码块的起止标记（```或~~~，最多3个空格缩进）
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+
+# 列表项标记
+LIST_ITEM_RE = re.compile(r'^ {0,3}([*+-]|\d+[.)])\s')
+
+
+def iter_blocks(lines):
+    """将Markdown文本行切分为顶层块
+
+    空行之后出现的非缩进行视为新块的开始；围栏代码块整体保留在一个块中，
+    表格、列表（包括空行分隔的松散列表）和缩进代码块不会被拆开。
+
+    Args:
+        lines (iterable): Markdown文本行（可以保留行尾换行符）
+
+    Yields:
+        str: 顶层块的Markdown文本
+    """
+    block = []
+    fence = None
+    after_blank = False
+    in_list = False
+
+    for line in lines:
+        stripped = line.rstrip('\r\n')
+
+        if fence:
+            block.append(line)
+            match = FENCE_RE.match(stripped)
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence) \
+                    and not stripped.strip().lstrip(fence[0]):
+                fence = None
+            continue
+
+        if not stripped.strip():
+            block.append(line)
+            after_blank = True
+            continue
+
+        indented = stripped.startswith(('    ', '\t'))
+        is_list_item = bool(LIST_ITEM_RE.match(stripped))
+        if after_blank and not indented and block and not (in_list and is_list_item):
+            yield ''.join(block)
+            block = []
+        if not block or not block[0].strip():
+            in_list = is_list_item
+        after_blank = False
+
+        match = FENCE_RE.match(stripped)
+        if match:
+            fence = match.group(1)
+        block.append(line)
+
+    if block:
+        yield ''.join(block)
+
+
+def iter_chunks(lines, chunk_size=DEFAULT_CHUNK_SIZE):
+    """把相邻的顶层块合并为不超过 chunk_size 的解析块
+
+    单个超过 chunk_size 的块（如超长代码块）单独成为一个解析块。
+
+    Yields:
+        str: 解析块的Markdown文本
+    """
+    chunk = []
+    size = 0
+    for block in iter_blocks(lines):
+        if chunk and size + len(block) > chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+        chunk.append(block)
+        size += len(block)
+    if chunk:
+        yield ''.join(chunk)
+
+
+def convert_stream(input_file, output_file, options=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                   log_callback=None, progress_callback=None, cache=None, metrics=None):
+    """流式转换文件
+
+    逐块读取、解析和渲染，每个块的解析结果在渲染后立即释放，渲染出的正文元素
+    立即写入输出文件。
+
+    Args:
+        input_file (str): 输入的Markdown文件路径
+        output_file (str): 输出的Word文件路径
+        options (ConversionOptions): 转换选项
+        chunk_size (int): 每个解析块的大小（字符数）
+        log_callback (callable): 接收日志消息的回调
+        progress_callback (callable): 接收进度百分比(0-100)的回调
+        cache (ConversionCache): 转换结果缓存，为空时不使用缓存
+        metrics (ConversionMetrics): 记录各阶段的累计耗时、元素统计和输出大小
+
+    Returns:
+        str: 输出的Word文件路径
+    """
+    options = options or ConversionOptions()
+    metrics = metrics if metrics is not None else ConversionMetrics()
+    base_path = Path(input_file).parent
+    total_size = os.path.getsize(input_file) or 1
+    metrics.input_bytes = os.path.getsize(input_file)
+
+    _notify(progress_callback, 0)
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key_for(input_file, options)
+        if cache_key is not None and cache.fetch(cache_key, output_file):
+            _notify(log_callback, f"使用缓存的转换结果: {output_file}")
+            metrics.cached = True
+            metrics.output_bytes = os.path.getsize(output_file)
+            _notify(progress_callback, 100)
+            return str(output_file)
+
+    renderer = DocumentRenderer(options, log_callback, metrics)
+    doc = renderer.new_document()
+    if options.include_toc:
+        # 目录写在文档开头，只有域，由Word打开时更新
+        renderer.add_toc(doc)
+    md = get_markdown()
+
+    _notify(log_callback, "正在流式转换内容...")
+    progress = ProgressRange(progress_callback, 0, PROGRESS_SAVE[0])
+    with StreamingPackageWriter(doc, output_file, metrics) as writer, \
+            open(input_file, 'r', encoding='utf-8') as f:
+        renderer.media = writer
+        chunks = iter_chunks(f, chunk_size)
+        while True:
+            # 读取和切分的耗时计入 read 阶段
+            with metrics.stage('read'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            md.reset()
+            root = parse_markdown(md, chunk, options.parser, metrics)
+            renderer.html_to_docx(root, doc, base_path)
+            del root
+            # 渲染好的块立即写入压缩包，文档树中只保留当前块
+            writer.flush()
+            # 进度按已读取的字节数计算，写入图片和其余部件占最后10%
+            progress.update(f.buffer.tell(), total_size)
+        _notify(log_callback, f"正在保存到: {output_file}")
+        writer.close(ProgressRange(progress_callback, *PROGRESS_SAVE))
+
+    if cache_key is not None:
+        cache.store(cache_key, output_file)
+    _notify(progress_callback, 100)
+    return str(output_file)
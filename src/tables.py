@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表格快速生成
+一次性拼出整张表格的 w:tbl XML 并解析为元素，避免python-docx逐个单元格
+调用 table.cell()（每次遍历整个网格）和设置 .text（每次重建段落）；
+生成的结构与 python-docx 的 add_table 相同
+"""
+
+from xml.sax.saxutils import escape
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Emu
+
+if __package__:
+    from .inline import PLAIN, inline_segments, runs_xml, strip_segments
+else:
+    from inline import PLAIN, inline_segments, runs_xml, strip_segments
+
+
+# 单元格中出现时需要回退到逐单元格处理的元素
+EXOTIC_TAGS = ('table', 'ul', 'ol', 'pre', 'blockquote', 'img',
+               'h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# 合并单元格属性
+SPAN_ATTRIBUTES = ('colspan', 'rowspan')
+
+# 表头单元格的格式
+HEADER_FORMAT = PLAIN.replace(bold=True)
+
+
+def is_simple_table(row_cells):
+    """判断表格能否使用快速路径（没有合并单元格和块级内容）
+
+    Args:
+        row_cells (list): 每行的单元格（td/th）元素列表
+
+    Returns:
+        bool: 是否可以一次性生成XML
+    """
+    for cells in row_cells:
+        for cell in cells:
+            if any(cell.get(attr) for attr in SPAN_ATTRIBUTES):
+                return False
+            if cell.find_all(EXOTIC_TAGS):
+                return False
+    return True
+
+
+def cell_segments(cell, anchors=None, math=None):
+    """把单元格内容拆成带格式的文本片段
+
+    与段落使用相同的行内渲染（见 inline.inline_segments），表头单元格整体加粗，
+    首尾空白被去掉。
+
+    Returns:
+        list: (InlineFormat, 文本) 列表，公式片段为 (MATH, 公式XML)
+    """
+    base = HEADER_FORMAT if cell.name == 'th' else PLAIN
+    return strip_segments(inline_segments(cell, images=False, base=base, anchors=anchors,
+                                          math=math))
+
+
+def table_xml(row_cells, max_cols, block_width, style_id, code_font, anchors=None,
+              math=None):
+    """生成整张表格的XML
+
+    Args:
+        row_cells (list): 每行的单元格（td/th）元素列表
+        max_cols (int): 列数（不足的行补空单元格）
+        block_width (int): 正文宽度（EMU），各列平均分配
+        style_id (str): 表格样式ID
+        code_font (str): 行内代码字体
+        anchors (callable): 锚点 -> 书签名，单元格中的“#锚点”链接指向书签
+        math (callable): (LaTeX源码, 是否为独立公式) -> 公式XML，单元格中的公式为Word公式
+
+    Returns:
+        str: w:tbl 元素的XML
+    """
+    col_twips = Emu(block_width // max_cols).twips
+    tc_pr = f'<w:tcPr><w:tcW w:type="dxa" w:w="{col_twips}"/></w:tcPr>'
+    empty_cell = f'<w:tc>{tc_pr}<w:p/></w:tc>'
+
+    parts = [
+        f'<w:tbl {nsdecls("w")}><w:tblPr>',
+        f'<w:tblStyle w:val="{escape(style_id)}"/>' if style_id else '',
+        '<w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+        'w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr><w:tblGrid>',
+        f'<w:gridCol w:w="{col_twips}"/>' * max_cols,
+        '</w:tblGrid>',
+    ]
+    for cells in row_cells:
+        parts.append('<w:tr>')
+        cells = cells[:max_cols]
+        for cell in cells:
+            segments = cell_segments(cell, anchors, math)
+            if segments:
+                runs = runs_xml(segments, code_font)
+            else:
+                # 与 cell.text = '' 相同，保留一个空的 w:r
+                runs = '<w:r><w:rPr><w:b/></w:rPr></w:r>' if cell.name == 'th' else '<w:r/>'
+            parts.append(f'<w:tc>{tc_pr}<w:p>{runs}</w:p></w:tc>')
+        parts.append(empty_cell * (max_cols - len(cells)))
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    return ''.join(parts)
+
+
+def build_table(row_cells, max_cols, block_width, style_id, code_font, anchors=None,
+                math=None):
+    """生成 w:tbl 元素"""
+    return parse_xml(table_xml(row_cells, max_cols, block_width, style_id, code_font, anchors,
+                               math))
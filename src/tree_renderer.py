@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown元素树直接渲染
+直接使用Python-Markdown树处理器产生的ElementTree，跳过HTML序列化和
+BeautifulSoup重新解析；元素树节点被包装为与BeautifulSoup节点相同的接口，
+因此可以直接交给 process_element / process_inline_elements 处理
+"""
+
+import html
+import re
+import xml.etree.ElementTree as etree
+from markdown import util
+from bs4 import BeautifulSoup
+
+
+# 代码文本经过 util.code_escape 转义的三个字符
+_CODE_UNESCAPES = (('&lt;', '<'), ('&gt;', '>'), ('&amp;', '&'))
+
+# 原始HTML片段的起始标签
+_BLOCK_TAG_RE = re.compile(r'^<\/?([^ >]+)')
+
+
+def parse_tree(md, source):
+    """运行Python-Markdown的预处理器、块解析器和树处理器
+
+    与 Markdown.convert() 的前半部分相同，但不进行序列化和后处理。
+
+    Args:
+        md (markdown.Markdown): 已重置的Markdown解析器
+        source (str): Markdown文本
+
+    Returns:
+        MarkdownTreeNode: 文档根节点
+    """
+    if not source.strip():
+        return MarkdownTreeNode(etree.Element(md.doc_tag), md)
+
+    md.lines = source.split("\n")
+    for prep in md.preprocessors:
+        md.lines = prep.run(md.lines)
+
+    root = md.parser.parseDocument(md.lines).getroot()
+    for treeprocessor in md.treeprocessors:
+        new_root = treeprocessor.run(root)
+        if new_root is not None:
+            root = new_root
+    return MarkdownTreeNode(root, md, is_root=True)
+
+
+class MarkdownTreeNode:
+    """以BeautifulSoup节点接口包装的ElementTree元素
+
+    支持 name、children、get_text()、get() 和 find_all()；文本中的原始HTML占位符
+    会还原为BeautifulSoup解析的节点（仅解析占位符对应的HTML片段）。含有行内
+    原始HTML标签的元素（如 <span>...</span> 包裹了Markdown内容）无法逐节点还原，
+    这类元素单独序列化后回退到BeautifulSoup解析。
+    """
+
+    __slots__ = ('element', 'md', 'is_root')
+
+    def __init__(self, element, md, is_root=False):
+        self.element = element
+        self.md = md
+        self.is_root = is_root
+
+    @property
+    def name(self):
+        return self.element.tag
+
+    @property
+    def attrs(self):
+        return dict(self.element.attrib)
+
+    def get(self, key, default=None):
+        return self.element.get(key, default)
+
+    @property
+    def children(self):
+        """依次产生文本（str）和子节点，相邻的文本会被合并"""
+        if not self.is_root and self._has_inline_html():
+            yield from self._as_soup().children
+            return
+
+        pending = []
+        for child in self._iter_children():
+            if isinstance(child, str) and not hasattr(child, 'name'):
+                pending.append(child)
+                continue
+            if pending:
+                yield ''.join(pending)
+                pending = []
+            yield child
+        if pending:
+            yield ''.join(pending)
+
+    def _iter_children(self):
+        element = self.element
+        if element.text:
+            yield from self._expand_text(element.text)
+        for child in element:
+            stashed = self._block_placeholder(child)
+            if stashed is None:
+                yield MarkdownTreeNode(child, self.md)
+            else:
+                yield from self._stashed(stashed)
+            if child.tail:
+                yield from self._expand_text(child.tail)
+
+    def get_text(self):
+        return ''.join(
+            child.get_text() if hasattr(child, 'get_text') else child
+            for child in self.children
+        )
+
+    def find_all(self, name, recursive=True):
+        """查找后代节点（不进入原始HTML片段）"""
+        names = (name,) if isinstance(name, str) else tuple(name)
+        if recursive:
+            elements = self.element.iter()
+            next(elements)  # 跳过自身
+        else:
+            elements = iter(self.element)
+        return [MarkdownTreeNode(e, self.md) for e in elements if e.tag in names]
+
+    def _expand_text(self, text):
+        """还原文本中的占位符和转义"""
+        if isinstance(text, util.AtomicString):
+            for escaped, char in _CODE_UNESCAPES:
+                text = text.replace(escaped, char)
+        if util.AMP_SUBSTITUTE in text:
+            text = text.replace(util.AMP_SUBSTITUTE, '&')
+        if util.STX not in text:
+            yield text
+            return
+
+        pos = 0
+        for match in util.HTML_PLACEHOLDER_RE.finditer(text):
+            if match.start() > pos:
+                yield text[pos:match.start()]
+            yield from self._stashed(int(match.group(1)))
+            pos = match.end()
+        if pos < len(text):
+            yield text[pos:]
+
+    def _has_inline_html(self):
+        """判断元素内是否含有行内原始HTML标签"""
+        blocks = self.md.htmlStash.rawHtmlBlocks
+        for text in self.element.itertext():
+            if util.STX not in text:
+                continue
+            for match in util.HTML_PLACEHOLDER_RE.finditer(text):
+                index = int(match.group(1))
+                if index < len(blocks) and isinstance(blocks[index], str) and '<' in blocks[index]:
+                    return True
+        return False
+
+    def _as_soup(self):
+        """把元素序列化后用BeautifulSoup解析（回退路径）"""
+        output = self.md.serializer(self.element)
+        for postprocessor in self.md.postprocessors:
+            output = postprocessor.run(output)
+        soup = BeautifulSoup(output, 'html.parser')
+        return soup.find(self.element.tag) or soup
+
+    def _block_placeholder(self, element):
+        """判断元素是否为包裹块级原始HTML的段落
+
+        与 RawHtmlPostprocessor 相同：只含一个占位符、且HTML为块级元素的
+        <p> 会被原始HTML替换。
+
+        Returns:
+            int: 占位符序号，不是时返回 None
+        """
+        if element.tag != 'p' or len(element) or not element.text:
+            return None
+        match = util.HTML_PLACEHOLDER_RE.fullmatch(element.text.strip())
+        if not match:
+            return None
+        index = int(match.group(1))
+        blocks = self.md.htmlStash.rawHtmlBlocks
+        if index >= len(blocks):
+            return None
+        raw = blocks[index]
+        if not isinstance(raw, str):
+            return index
+        tag = _BLOCK_TAG_RE.match(raw.lstrip())
+        if tag and (tag.group(1)[0] in ('!', '?', '@', '%')
+                    or self.md.is_block_level(tag.group(1).lower().rstrip('/'))):
+            return index
+        return None
+
+    def _stashed(self, index):
+        """返回原始HTML占位符对应的节点"""
+        blocks = self.md.htmlStash.rawHtmlBlocks
+        if index >= len(blocks):
+            return
+        raw = blocks[index]
+        if not isinstance(raw, str):
+            # md_in_html 等扩展会存入元素
+            yield MarkdownTreeNode(raw, self.md)
+        elif '<' not in raw:
+            # 字符实体等纯文本片段
+            yield html.unescape(raw)
+        else:
+            yield from BeautifulSoup(raw, 'html.parser').children
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视模式
+监视Markdown文件、其中引用的本地图片和参考Word文档，保存后自动重新转换。
+Linux上使用inotify，其他平台按修改时间轮询；连续多次保存在静默一段时间后
+只转换一次；转换过程中出现新的修改时取消当前转换，防抖后重新开始。
+输出文件由 save_document 原子地替换，Word不会读到写了一半的文档。
+"""
+
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import unquote
+
+if __package__:
+    from .cache import iter_image_refs
+    from .remote import is_remote
+else:
+    from cache import iter_image_refs
+    from remote import is_remote
+
+
+# 最后一次修改后等待的静默时间（秒）
+DEFAULT_DEBOUNCE = 0.3
+
+# 文件持续变化时最多等待的时间（秒），超过后立即转换
+MAX_SETTLE_SECONDS = 5.0
+
+# 轮询修改时间的间隔（秒）
+POLL_INTERVAL = 0.5
+
+# 等待变化的单次超时（秒），决定响应停止请求的速度
+WAIT_TIMEOUT = 0.5
+
+# 转换过程中检查新修改的最小间隔（秒）
+CANCEL_CHECK_INTERVAL = 0.1
+
+# 监视后端
+BACKENDS = ('auto', 'inotify', 'poll')
+
+# inotify 事件（见 inotify(7)）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+
+# 编辑器保存文件时，直接写入产生 CLOSE_WRITE，先写临时文件再重命名产生 MOVED_TO
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event 的固定部分：wd, mask, cookie, len
+_EVENT_HEADER = struct.Struct('iIII')
+
+_EVENT_BUFFER_SIZE = 64 * 1024
+
+
+class ConversionCancelled(Exception):
+    """转换因输入再次变化而被取消"""
+
+
+def watched_paths(input_file, options=None):
+    """列出一次转换依赖的本地文件
+
+    包括Markdown文件本身、启用图片处理时引用的本地图片，以及参考Word文档。
+
+    Args:
+        input_file (str): Markdown文件路径
+        options (ConversionOptions): 转换选项
+
+    Returns:
+        list: 绝对路径（字符串），第一个为Markdown文件
+    """
+    input_path = Path(input_file).resolve()
+    paths = [str(input_path)]
+    try:
+        text = input_path.read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        text = ''
+    if options is None or options.process_images:
+        for src in iter_image_refs(text):
+            if is_remote(src) or src.startswith('data:'):
+                continue
+            path = str((input_path.parent / unquote(src)).resolve())
+            if path not in paths:
+                paths.append(path)
+    reference = getattr(options, 'reference_docx', None)
+    if reference:
+        paths.append(str(Path(reference).resolve()))
+    return paths
+
+
+class PollingMonitor:
+    """按修改时间和大小轮询文件变化，适用于所有平台
+
+    Args:
+        interval (float): 轮询间隔（秒）
+    """
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._snapshot = {}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def watch(self, paths):
+        """设置要监视的文件；已在监视的文件保留原有状态，不会漏掉期间的修改"""
+        self._snapshot = {path: self._snapshot[path] if path in self._snapshot else self._stat(path)
+                          for path in map(os.path.abspath, paths)}
+
+    def changes(self, timeout=0):
+        """等待文件变化
+
+        Args:
+            timeout (float): 最长等待时间（秒），为0时只检查一次
+
+        Returns:
+            set: 发生变化的路径，超时时为空
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path, state in self._snapshot.items():
+                current = self._stat(path)
+                if current != state:
+                    self._snapshot[path] = current
+                    changed.add(path)
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        self._snapshot = {}
+
+
+def _load_inotify():
+    """加载libc中的inotify函数，不可用时返回 None"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        init = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+        rm_watch = libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    init.argtypes = [ctypes.c_int]
+    add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class InotifyMonitor:
+    """基于Linux inotify的文件监视
+
+    监视文件所在的目录而不是文件本身，编辑器用“写临时文件再重命名”的方式
+    保存时也能收到事件。
+
+    Raises:
+        OSError: 当前系统不支持inotify
+    """
+
+    def __init__(self):
+        self._libc = _load_inotify()
+        if self._libc is None:
+            raise OSError("当前系统不支持inotify")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._paths = set()
+        self._dirs = {}
+        self._wds = {}
+
+    def watch(self, paths):
+        """设置要监视的文件，按需增删目录监视"""
+        self._paths = {os.path.abspath(path) for path in paths}
+        dirs = {os.path.dirname(path) for path in self._paths}
+        for directory in dirs - set(self._dirs):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), INOTIFY_MASK)
+            if wd >= 0:
+                self._dirs[directory] = wd
+                self._wds[wd] = directory
+        for directory in set(self._dirs) - dirs:
+            wd = self._dirs.pop(directory)
+            self._wds.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _read_events(self):
+        """读出所有排队的事件，返回其中涉及监视文件的路径"""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, _EVENT_BUFFER_SIZE)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # 事件队列溢出，无法确定哪些文件变化了
+                    changed.update(self._paths)
+                elif wd in self._wds and name:
+                    path = os.path.join(self._wds[wd], os.fsdecode(name))
+                    if path in self._paths:
+                        changed.add(path)
+
+    def changes(self, timeout=0):
+        """等待文件变化
+
+        Args:
+            timeout (float): 最长等待时间（秒），为0时只检查一次
+
+        Returns:
+            set: 发生变化的路径，超时时为空
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = max(0.0, deadline - time.monotonic())
+            if select.select([self._fd], [], [], remaining)[0]:
+                changed = self._read_events()
+                if changed:
+                    return changed
+            if time.monotonic() >= deadline:
+                return set()
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._dirs.clear()
+        self._wds.clear()
+
+
+def create_monitor(backend='auto', interval=POLL_INTERVAL):
+    """创建文件监视器
+
+    Args:
+        backend (str): 'inotify'、'poll'，或 'auto'（inotify可用时使用inotify）
+        interval (float): 轮询间隔（秒）
+
+    Returns:
+        InotifyMonitor | PollingMonitor: 监视器
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的监视方式: {backend}")
+    if backend != 'poll':
+        try:
+            return InotifyMonitor()
+        except OSError:
+            if backend == 'inotify':
+                raise
+    return PollingMonitor(interval)
+
+
+class WatchSession:
+    """监视一组转换任务，输入变化后防抖并重新转换
+
+    Args:
+        tasks (list): (输入文件, 输出文件) 元组列表
+        convert (callable): convert(input_file, output_file, progress_callback) 执行一次转换，
+            返回值传给 report；progress_callback 在检测到新的修改时抛出 ConversionCancelled
+        options (ConversionOptions): 转换选项，用于确定要监视的图片和参考文档
+        monitor: 文件监视器，默认为 create_monitor()，由会话负责关闭
+        debounce (float): 最后一次修改后等待的静默时间（秒）
+        report (callable): 每次转换完成后调用 report(convert的返回值)
+        log_callback (callable): 接收日志消息的回调
+        progress_callback (callable): 接收当前转换进度百分比(0-100)的回调
+    """
+
+    def __init__(self, tasks, convert, options=None, monitor=None, debounce=DEFAULT_DEBOUNCE,
+                 report=None, log_callback=None, progress_callback=None):
+        self.tasks = [(str(input_file), str(output_file)) for input_file, output_file in tasks]
+        self.convert = convert
+        self.options = options
+        self.monitor = monitor if monitor is not None else create_monitor()
+        self.debounce = debounce
+        self.report = report
+        self.log_callback = log_callback
+        self.progress_callback = progress_callback
+        self.conversions = 0
+        self.cancellations = 0
+        self._dependencies = [[] for _ in self.tasks]
+        self._interrupt = set()
+        self._last_check = 0.0
+
+    def log_message(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def refresh(self, indices):
+        """重新计算任务依赖的文件（图片引用可能已改变），并更新监视列表"""
+        for i in indices:
+            self._dependencies[i] = watched_paths(self.tasks[i][0], self.options)
+        self.monitor.watch({path for paths in self._dependencies for path in paths})
+
+    def affected(self, changed):
+        """受变化的文件影响的任务编号"""
+        return {i for i, paths in enumerate(self._dependencies) if changed.intersection(paths)}
+
+    def settle(self):
+        """防抖：等待文件静默 debounce 秒，返回期间变化的文件
+
+        文件持续变化超过 MAX_SETTLE_SECONDS 时不再等待。
+        """
+        changed = set()
+        deadline = time.monotonic() + MAX_SETTLE_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return changed
+            more = self.monitor.changes(min(self.debounce, remaining))
+            if not more:
+                return changed
+            changed |= more
+
+    def _progress(self, value):
+        """转换进度回调：检查是否有新的修改，有则取消当前转换"""
+        now = time.monotonic()
+        if now - self._last_check >= CANCEL_CHECK_INTERVAL:
+            self._last_check = now
+            changed = self.monitor.changes(0)
+            if changed:
+                self._interrupt |= changed
+                if self.affected(changed):
+                    raise ConversionCancelled()
+        if self.progress_callback:
+            self.progress_callback(value)
+
+    def convert_pending(self, pending, stop):
+        """依次转换待处理的任务
+
+        Returns:
+            set: 因新的修改而被取消、需要重新转换的任务编号
+        """
+        pending = sorted(pending)
+        for position, i in enumerate(pending):
+            if stop.is_set():
+                return set()
+            input_file, output_file = self.tasks[i]
+            self._last_check = time.monotonic()
+            try:
+                result = self.convert(input_file, output_file, self._progress)
+            except ConversionCancelled:
+                self.cancellations += 1
+                self.log_message(f"{input_file} 有新的修改，取消本次转换")
+                return set(pending[position:])
+            except Exception as e:
+                self.log_message(f"转换 {input_file} 时出错: {str(e)}")
+            else:
+                self.conversions += 1
+                if self.report:
+                    self.report(result)
+            self.refresh([i])
+        return set()
+
+    def run(self, stop=None):
+        """先转换所有任务，然后监视变化并重新转换，直到 stop 被设置
+
+        Args:
+            stop (threading.Event): 停止信号，为空时一直运行（可用 Ctrl+C 中断）
+        """
+        stop = stop or threading.Event()
+        try:
+            self.refresh(range(len(self.tasks)))
+            pending = set(range(len(self.tasks)))
+            while not stop.is_set():
+                if pending:
+                    pending = self.convert_pending(pending, stop)
+                    if pending:
+                        # 被取消：等新的修改静默后再转换
+                        self._interrupt |= self.settle()
+                    pending |= self.affected(self._interrupt)
+                    self._interrupt = set()
+                    continue
+                changed = self.monitor.changes(WAIT_TIMEOUT)
+                if changed:
+                    changed |= self.settle()
+                    pending = self.affected(changed)
+                    for path in sorted(changed):
+                        self.log_message(f"检测到修改: {path}")
+        finally:
+            self.monitor.close()
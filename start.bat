@@ -11,7 +11,7 @@ cd /d "%~dp0"
 REM 检查Python是否已安装
 python --version >nul 2>&1
 if errorlevel 1 (
-    echo 错误: 未找到Python，请先安装Python 3.7或更高版本
+    echo 错误: 未找到Python，请先安装Python 3.9或更高版本
     pause
     exit /b 1
 )
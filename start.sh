@@ -26,7 +26,7 @@ cd "$SCRIPT_DIR"
 # 检查Python是否已安装
 if ! command -v python3 &> /dev/null; then
     if ! command -v python &> /dev/null; then
-        echo "错误: 未找到Python，请先安装Python 3.7或更高版本"
+        echo "错误: 未找到Python，请先安装Python 3.9或更高版本"
         exit 1
     else
         PYTHON_CMD="python"
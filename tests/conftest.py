@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共用的辅助函数
+"""
+
+from io import BytesIO
+
+from PIL import Image
+
+
+def png_bytes(color='red', size=(8, 8)):
+    """生成一张纯色PNG图片"""
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
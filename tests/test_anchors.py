@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+锚点与目录测试 - 验证标题书签、内部链接、TOC域与预先填入的目录项，以及流式和书籍模式中的目录
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from docx.oxml.ns import qn
+from PIL import Image
+
+from src.anchors import AnchorIndex, bookmark_name
+from src.book import convert_book
+from src.engine import ConversionOptions, convert
+from src.streaming import convert_stream
+
+SAMPLE_MD = """# 简介
+
+见 [安装](#安装步骤) 和 [Getting Started](#getting-started)，外部 [链接](https://e.com)。
+
+## 安装步骤
+
+| 列1 | 列2 |
+|-----|-----|
+| [回到简介](#简介) | 2 |
+
+## Getting Started
+
+#### 深层
+"""
+
+
+def bookmarks(doc):
+    """文档中的书签名 -> 书签ID"""
+    return {b.get(qn('w:name')): b.get(qn('w:id'))
+            for b in doc.element.body.iter(qn('w:bookmarkStart'))}
+
+
+def hyperlink_anchors(element):
+    return [h.get(qn('w:anchor')) for h in element.iter(qn('w:hyperlink'))]
+
+
+def test_bookmark_name():
+    """测试合法书签名直接使用，中文、连字符和过长的锚点使用隐藏书签名"""
+    assert bookmark_name("intro") == "intro"
+    assert bookmark_name("getting-started").startswith("_Md")
+    assert bookmark_name("安装步骤") != bookmark_name("简介")
+    assert len(bookmark_name("a" * 50)) <= 40
+
+    index = AnchorIndex()
+    assert index.add("intro", 1, "Intro") == ("intro", 0)
+    assert index.add("intro", 2, "Intro") == ("intro_1", 1)
+    assert index.resolve("intro_1") == "intro_1"
+    assert index.add("intro_1", 1, "Intro_1") == ("intro_2", 2)
+    assert [heading[0] for heading in index.headings] == ["intro", "intro", "intro_1"]
+
+
+def test_headings_and_internal_links():
+    """测试标题带书签，内部链接（含前向链接和表格中的链接）指向书签且不附加地址"""
+    doc = convert(SAMPLE_MD)
+    names = bookmarks(doc)
+    assert set(names) == {bookmark_name(a) for a in
+                          ("简介", "安装步骤", "getting-started", "深层")}
+    assert len(set(names.values())) == 4
+
+    links = hyperlink_anchors(doc.paragraphs[1]._p)
+    assert links == [bookmark_name("安装步骤"), bookmark_name("getting-started")]
+    assert doc.paragraphs[1].text == "见 安装 和 Getting Started，外部 链接 (https://e.com)。"
+    assert hyperlink_anchors(doc.tables[0]._tbl) == [bookmark_name("简介")]
+    assert doc.tables[0].cell(1, 0).text == "回到简介"
+    # 没有目录时不生成TOC域
+    assert not list(doc.element.body.iter(qn('w:instrText')))
+
+
+def test_toc_field_with_prerendered_entries():
+    """测试 include_toc 生成TOC域，预先填入1-3级标题的目录项，并设置打开时更新域"""
+    doc = convert(SAMPLE_MD, ConversionOptions(include_toc=True))
+    body = doc.element.body
+    assert 'TOC \\o "1-3"' in next(body.iter(qn('w:instrText'))).text
+    assert doc.paragraphs[0].text == "目录"
+    entries = [p for p in doc.paragraphs[1:] if p._p.find(qn('w:hyperlink')) is not None][:3]
+    assert [p.text for p in entries] == ["简介", "安装步骤", "Getting Started"]
+    assert hyperlink_anchors(entries[2]._p) == [bookmark_name("getting-started")]
+    assert doc.settings.element.find(qn('w:updateFields')) is not None
+
+
+def test_inline_image_in_paragraph(tmp_path):
+    """测试段落中的行内图片与链接一起渲染"""
+    Image.new('RGB', (40, 30), 'red').save(tmp_path / "a.png")
+    source = tmp_path / "doc.md"
+    source.write_text("# 标题\n\n文字 ![图](a.png) [回到标题](#标题)\n", encoding='utf-8')
+    doc = convert(source)
+    assert len(doc.inline_shapes) == 1
+    assert hyperlink_anchors(doc.paragraphs[1]._p) == [bookmark_name("标题")]
+
+
+def test_streamed_duplicate_anchors_are_unique(tmp_path):
+    """测试分块转换时不同块中的同名标题得到不同的书签，目录为域"""
+    source = tmp_path / "doc.md"
+    source.write_text("".join(f"# 概述\n\n段落 {i}\n\n" for i in range(6)), encoding='utf-8')
+    output = tmp_path / "doc.docx"
+    convert_stream(source, output, ConversionOptions(include_toc=True), chunk_size=20)
+
+    doc = Document(str(output))
+    names = bookmarks(doc)
+    assert len(names) == 6 and len(set(names.values())) == 6
+    assert doc.paragraphs[0].text == "目录"
+    assert any('TOC' in t.text for t in doc.element.body.iter(qn('w:instrText')))
+
+
+def test_book_has_single_toc(tmp_path):
+    """测试书籍模式只在合并后的文档开头生成一个目录，章节间书签ID不冲突"""
+    chapters = []
+    for n in range(2):
+        chapter = tmp_path / f"{n}.md"
+        chapter.write_text(f"# 第{n}章\n\n## 小节\n\n[第0章](#第0章)\n", encoding='utf-8')
+        chapters.append(chapter)
+    output = tmp_path / "book.docx"
+    convert_book(chapters, output, ConversionOptions(include_toc=True), jobs=1)
+
+    doc = Document(str(output))
+    assert len([t for t in doc.element.body.iter(qn('w:instrText')) if 'TOC' in t.text]) == 1
+    ids = [b.get(qn('w:id')) for b in doc.element.body.iter(qn('w:bookmarkStart'))]
+    assert len(ids) == 4 and len(set(ids)) == 4
+    assert set(hyperlink_anchors(doc.element.body)) == {bookmark_name("第0章")}
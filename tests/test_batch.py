@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量转换测试 - 验证目录展开、目录结构保持和进程池转换
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import batch
+from src.batch import collect_inputs, main, run_batch
+
+
+def make_tree(root):
+    """创建测试用的Markdown目录树"""
+    (root / "guide").mkdir(parents=True)
+    (root / "a.md").write_text("# A\n\n正文", encoding='utf-8')
+    (root / "guide" / "b.md").write_text("# B\n\n- 项", encoding='utf-8')
+    (root / "guide" / "notes.txt").write_text("忽略", encoding='utf-8')
+
+
+def test_collect_directory_and_glob(tmp_path):
+    """测试目录和通配符输入的展开"""
+    make_tree(tmp_path)
+    from_dir = sorted(str(rel) for _, rel in collect_inputs([str(tmp_path)]))
+    assert from_dir == ["a.md", os.path.join("guide", "b.md")]
+
+    from_glob = collect_inputs([str(tmp_path / "**" / "*.md")])
+    assert len(from_glob) == 2
+
+
+def test_run_batch_keeps_layout(tmp_path):
+    """测试进程池批量转换并保持目录结构"""
+    make_tree(tmp_path / "in")
+    out = tmp_path / "out"
+    (tmp_path / "in" / "broken.md").write_bytes(b"\xff\xfe\x00")
+
+    batch = run_batch([str(tmp_path / "in")], str(out), jobs=2)
+
+    assert (out / "a.docx").exists()
+    assert (out / "guide" / "b.docx").exists()
+    assert len(batch.succeeded) == 2
+    assert [os.path.basename(r.input_file) for r in batch.failed] == ["broken.md"]
+    assert batch.files_per_second > 0
+
+
+def test_main_exit_code(tmp_path, capsys):
+    """测试命令行入口的输出和返回值"""
+    make_tree(tmp_path)
+    args = [str(tmp_path / "a.md"), "-o", str(tmp_path / "out"), "-j", "1",
+            "--cache-dir", str(tmp_path / "cache")]
+    assert main(args) == 0
+    assert "文件/秒" in capsys.readouterr().out
+    assert (tmp_path / "out" / "a.docx").exists()
+
+    assert main(args) == 0
+    assert "缓存: 1 命中" in capsys.readouterr().out
+
+
+def test_incremental_fragment_dir(tmp_path, monkeypatch, capsys):
+    """测试增量转换的片段保存在 --cache-dir 下，--no-cache 时不落盘"""
+    make_tree(tmp_path)
+    monkeypatch.setattr(batch, 'default_fragment_dir', lambda: str(tmp_path / "default"))
+    args = [str(tmp_path / "a.md"), "-o", str(tmp_path / "out"), "-j", "1", "--incremental"]
+    assert main(args + ["--cache-dir", str(tmp_path / "cache")]) == 0
+    assert list((tmp_path / "cache" / "fragments").glob("*/*.frag"))
+
+    assert main(args + ["--no-cache"]) == 0
+    assert (tmp_path / "out" / "a.docx").exists()
+    assert not (tmp_path / "default").exists()
+
+
+def test_conversion_modes_are_exclusive(tmp_path, capsys):
+    """测试 --incremental、--parallel 和 --stream 不能同时使用"""
+    make_tree(tmp_path)
+    for flags in (["--incremental", "--parallel"], ["--parallel", "--stream"],
+                  ["--incremental", "--stream"]):
+        with pytest.raises(SystemExit) as exc:
+            main([str(tmp_path / "a.md"), "--no-cache"] + flags)
+        assert exc.value.code == 2
+        assert "not allowed with" in capsys.readouterr().err
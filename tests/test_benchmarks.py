@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试工具测试 - 验证语料生成的确定性和退化判断
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import KINDS, generate, parse_size
+from benchmarks.run import compare
+
+
+def test_corpus_is_deterministic(tmp_path):
+    """测试相同参数生成的语料完全相同，且达到目标大小"""
+    for kind in KINDS:
+        first = generate(kind, '10KB', tmp_path / "a")
+        second = generate(kind, '10KB', tmp_path / "b")
+        assert first.read_bytes() == second.read_bytes()
+        assert first.stat().st_size >= 10 * 1024
+    assert (tmp_path / "a" / "images" / "figure0.png").exists()
+    assert parse_size('1MB') == 1024 * 1024 and parse_size('2.5KB') == 2560
+
+
+def test_compare_flags_regressions():
+    """测试吞吐量或峰值内存超过阈值时判定为退化"""
+    baseline = {'cases': {
+        'prose/1MB': {'seconds': 1.0, 'mb_per_second': 1.0, 'peak_rss_mb': 100.0},
+        'code/1MB': {'seconds': 1.0, 'mb_per_second': 2.0, 'peak_rss_mb': 100.0},
+        'prose/10KB': {'seconds': 0.05, 'mb_per_second': 0.2, 'peak_rss_mb': 100.0},
+    }}
+    results = {
+        'prose/1MB': {'mb_per_second': 0.8, 'peak_rss_mb': 120.0},
+        'code/1MB': {'mb_per_second': 1.0, 'peak_rss_mb': 140.0},
+        'lists/1MB': {'mb_per_second': 0.1, 'peak_rss_mb': 999.0},
+        # 小用例的吞吐量噪声不计入退化
+        'prose/10KB': {'mb_per_second': 0.1, 'peak_rss_mb': 100.0},
+    }
+    regressions = compare(results, baseline, threshold=0.25)
+    assert len(regressions) == 2
+    assert all(message.startswith('code/1MB') for message in regressions)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书籍模式测试 - 验证章节清单、并行转换后的合并顺序、章节分隔、图片去重以及样式和编号定义的合并
+"""
+
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from docx.oxml.ns import qn
+from PIL import Image
+
+from src.book import ChapterMerger, convert_book, main, read_manifest, render_chapter
+from src.engine import ConversionOptions, DocumentRenderer
+from src.metrics import ConversionMetrics
+
+CHAPTER_MD = """# 第{n}章
+
+正文 {n} **粗体**
+
+![图](../img/a.png)
+
+1. 第一步
+2. 第二步
+"""
+
+
+def write_book(tmp_path, count=3):
+    (tmp_path / "img").mkdir()
+    Image.new('RGB', (40, 30), 'red').save(tmp_path / "img" / "a.png")
+    chapters = tmp_path / "chapters"
+    chapters.mkdir()
+    names = []
+    for n in range(count):
+        (chapters / f"{n:02d}.md").write_text(CHAPTER_MD.format(n=n), encoding='utf-8')
+        names.append(f"chapters/{n:02d}.md")
+    manifest = tmp_path / "book.txt"
+    manifest.write_text("# 手册\n\n" + "\n".join(reversed(names)) + "\n", encoding='utf-8')
+    return manifest
+
+
+def test_read_manifest(tmp_path):
+    """测试清单按行顺序读取，忽略空行和注释，章节不存在时报错"""
+    manifest = write_book(tmp_path)
+    assert [p.name for p in read_manifest(manifest)] == ["02.md", "01.md", "00.md"]
+
+    manifest.write_text("chapters/00.md\nmissing.md\n", encoding='utf-8')
+    with pytest.raises(FileNotFoundError):
+        read_manifest(manifest)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_chapters_merged_in_manifest_order(tmp_path, jobs):
+    """测试章节按清单顺序合并，章节之间插入分页符，相同图片只嵌入一次"""
+    manifest = write_book(tmp_path)
+    output = tmp_path / "book.docx"
+    metrics = ConversionMetrics()
+    convert_book(manifest, output, jobs=jobs, metrics=metrics)
+
+    doc = Document(str(output))
+    headings = [p.text for p in doc.paragraphs if p.style.name == 'Heading 1']
+    assert headings == ["第2章", "第1章", "第0章"]
+    assert len(doc.inline_shapes) == 3
+    assert len(doc.element.body.findall('.//' + qn('w:br') + "[@" + qn('w:type') + "='page']")) == 2
+    shape_ids = [shape._inline.docPr.id for shape in doc.inline_shapes]
+    assert len(set(shape_ids)) == 3
+    with zipfile.ZipFile(output) as archive:
+        assert [n for n in archive.namelist() if n.startswith('word/media/')] == \
+            ['word/media/image1.png']
+    assert metrics.images == 3 and 'splice' in metrics.stages and 'render' in metrics.stages
+    assert metrics.input_bytes == sum(p.stat().st_size for p in (tmp_path / "chapters").iterdir())
+
+
+def test_section_breaks_and_file_list(tmp_path):
+    """测试按文件列表合并，分节符使每章成为新的一节并沿用页面设置"""
+    write_book(tmp_path)
+    chapters = [tmp_path / "chapters" / f"{n:02d}.md" for n in range(3)]
+    output = tmp_path / "book.docx"
+    convert_book(chapters, output, jobs=1, chapter_break_kind='section')
+    doc = Document(str(output))
+    assert len(doc.sections) == 3
+    assert doc.sections[0].page_width == doc.sections[2].page_width
+
+    with pytest.raises(ValueError):
+        convert_book(chapters, output, chapter_break_kind='chapter')
+
+
+def test_duplicate_headings_across_chapters(tmp_path):
+    """测试不同章节中的同名标题拼接后书签名唯一，目录项指向各自的书签"""
+    chapters = []
+    for n in range(2):
+        chapter = tmp_path / f"{n}.md"
+        chapter.write_text(f"# Overview\n\n第{n}章 [概览](#overview)\n", encoding='utf-8')
+        chapters.append(chapter)
+    output = tmp_path / "book.docx"
+    convert_book(chapters, output, ConversionOptions(include_toc=True), jobs=1)
+    body = Document(str(output)).element.body
+    assert [b.get(qn('w:name')) for b in body.iter(qn('w:bookmarkStart'))] == \
+        ["overview", "overview_1"]
+
+
+def test_merge_missing_styles_and_conflicting_numbering(tmp_path):
+    """测试目标文档缺少的样式被复制，同ID但定义不同的编号添加为新定义并改写引用"""
+    write_book(tmp_path, 1)
+    chapter = render_chapter(tmp_path / "chapters" / "00.md", ConversionOptions())
+    assert 'ListNumber' in chapter.styles and chapter.numbering
+
+    doc = DocumentRenderer().new_document()
+    styles = doc.styles.element
+    styles.remove(styles.get_by_id('ListNumber'))
+    numbering = doc.part.numbering_part.element
+    num_id = next(iter(chapter.numbering))
+    num = numbering.num_having_numId(int(num_id))
+    abstract_id = num.abstractNumId.val
+    abstract = next(a for a in numbering.findall(qn('w:abstractNum'))
+                    if a.get(qn('w:abstractNumId')) == str(abstract_id))
+    abstract.remove(abstract.find(qn('w:lvl')))
+    count = len(numbering.num_lst)
+
+    merger = ChapterMerger(doc)
+    merger.add(chapter)
+    merger.add(chapter)
+    # 两次合并相同的定义只添加一次
+    assert len(numbering.num_lst) == count + 1
+    new_id = numbering.num_lst[-1].get(qn('w:numId'))
+    style = styles.get_by_id('ListNumber')
+    assert style is not None
+    assert style.find('.//' + qn('w:numId')).get(qn('w:val')) == new_id
+
+
+def test_book_command(tmp_path, capsys):
+    """测试 md2word-book 命令读取清单并输出合并后的文档"""
+    manifest = write_book(tmp_path, 2)
+    output = tmp_path / "out.docx"
+    assert main([str(manifest), "-o", str(output), "-j", "1", "--chapter-break", "none",
+                 "--metrics"]) == 0
+    assert len(Document(str(output)).inline_shapes) == 2
+    assert '"images":2' in capsys.readouterr().out
+    assert main([str(tmp_path / "missing.txt"), "-o", str(output)]) == 2
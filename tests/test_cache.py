@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换缓存测试 - 验证缓存键、命中和LRU淘汰
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cache import ConversionCache, iter_image_refs
+from src.engine import ConversionOptions, convert_file
+
+
+def test_iter_image_refs():
+    """测试识别Markdown和HTML中的图片引用"""
+    text = '![图](img/a.png "标题")\n<img alt="b" src="b.jpg">\n\n[logo]: logo.gif\n'
+    assert list(iter_image_refs(text)) == ["img/a.png", "b.jpg", "logo.gif"]
+    text = '![图](<img/a b.png> "标题")\n\n[logo]: <my logo.gif>\n'
+    assert list(iter_image_refs(text)) == ["img/a b.png", "my logo.gif"]
+
+
+def test_cache_hit_skips_conversion(tmp_path):
+    """测试第二次转换命中缓存"""
+    cache = ConversionCache(tmp_path / "cache")
+    source = tmp_path / "doc.md"
+    source.write_text("# 标题\n\n正文", encoding='utf-8')
+    output = tmp_path / "doc.docx"
+
+    convert_file(source, output, cache=cache)
+    first = output.read_bytes()
+    output.unlink()
+    logs = []
+    convert_file(source, output, cache=cache, log_callback=logs.append)
+
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+    assert output.read_bytes() == first
+    assert not any("解析" in message for message in logs)
+
+
+def test_cache_key_tracks_options_and_images(tmp_path):
+    """测试选项和引用图片内容变化时缓存键随之变化"""
+    cache = ConversionCache(tmp_path / "cache")
+    source = tmp_path / "doc.md"
+    source.write_text("![图](pic.png)", encoding='utf-8')
+    image = tmp_path / "pic.png"
+    image.write_bytes(b"one")
+
+    key = cache.key_for(source, ConversionOptions())
+    assert cache.key_for(source, ConversionOptions()) == key
+    assert cache.key_for(source, ConversionOptions(include_toc=True)) != key
+
+    image.write_bytes(b"two")
+    assert cache.key_for(source, ConversionOptions()) != key
+    # 不处理图片时图片内容不影响缓存键
+    no_images = cache.key_for(source, ConversionOptions(process_images=False))
+    image.write_bytes(b"three")
+    assert cache.key_for(source, ConversionOptions(process_images=False)) == no_images
+
+
+def test_angle_bracket_image_with_spaces_invalidates_cache(tmp_path):
+    """测试尖括号中带空格的图片路径参与缓存键，图片修改后不会命中旧结果"""
+    cache = ConversionCache(tmp_path / "cache")
+    source = tmp_path / "doc.md"
+    source.write_text("![图](<my pic.png>)", encoding='utf-8')
+    image = tmp_path / "my pic.png"
+    image.write_bytes(b"one")
+    key = cache.key_for(source, ConversionOptions())
+    image.write_bytes(b"two")
+    assert cache.key_for(source, ConversionOptions()) != key
+
+
+def test_remote_images_bypass_cache(tmp_path):
+    """测试启用远程图片且引用了远程图片时不使用转换结果缓存"""
+    cache = ConversionCache(tmp_path / "cache")
+    source = tmp_path / "doc.md"
+    source.write_text("![图](https://example.com/a.png)", encoding='utf-8')
+    assert cache.key_for(source, ConversionOptions()) is not None
+    assert cache.key_for(source, ConversionOptions(remote_images=True)) is None
+
+    output = tmp_path / "doc.docx"
+    options = ConversionOptions(remote_images=True, remote_cache_dir=tmp_path / "remote")
+    source.write_text("# 标题\n\n![图](http://127.0.0.1:9/a.png)", encoding='utf-8')
+    convert_file(source, output, options, cache=cache)
+    assert cache.stats.stores == 0 and not cache.entries()
+
+
+def test_store_evicts_only_over_limit(tmp_path, monkeypatch):
+    """测试写入时按累计大小判断是否淘汰，不在每次写入时扫描缓存目录"""
+    cache = ConversionCache(tmp_path / "cache", max_bytes=1000)
+    scans = []
+    entries = cache.entries
+    monkeypatch.setattr(cache, 'entries', lambda: scans.append(1) or entries())
+    output = tmp_path / "doc.docx"
+    output.write_bytes(b"x" * 100)
+    for i in range(9):
+        cache.store(f"{i:064d}", output)
+    assert len(scans) == 1
+
+    cache.store("a" * 64, output)
+    cache.store("b" * 64, output)
+    assert len(scans) == 2 and cache.stats.evictions == 1
+    assert cache.size() <= 1000
+
+
+def test_lru_eviction(tmp_path):
+    """测试超过大小上限时淘汰最久未使用的条目"""
+    cache = ConversionCache(tmp_path / "cache", max_bytes=250)
+    for i, name in enumerate(["a", "b", "c"]):
+        output = tmp_path / f"{name}.docx"
+        output.write_bytes(b"x" * 100)
+        cache.store(name * 64, output)
+        os.utime(cache._entry_path(name * 64), (i, i))
+        if name == "b":
+            # 访问a，使b成为最久未使用的条目
+            cache.fetch("a" * 64, tmp_path / "copy.docx")
+
+    assert cache.size() <= 250
+    assert cache.stats.evictions == 1
+    assert not cache._entry_path("b" * 64).exists()
+    assert cache._entry_path("a" * 64).exists()
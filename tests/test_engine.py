@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换引擎测试 - 验证无界面转换流水线
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from docx import Document
+
+from src.engine import (ConversionOptions, DocumentRenderer, ProgressRange, convert, convert_file,
+                        get_markdown, save_document)
+
+
+SAMPLE_MD = """# 测试标题
+这是一个测试段落，包含 **粗体** 和 *斜体*。
+
+## 二级标题
+- 列表项1
+- 列表项2
+
+| 名称 | 值 |
+| ---- | -- |
+| a    | 1  |
+"""
+
+
+def test_engine_does_not_import_tkinter():
+    """测试导入引擎时不加载Tkinter"""
+    code = "import sys; import src.engine; print('tkinter' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_convert_text():
+    """测试直接转换Markdown文本"""
+    doc = convert(SAMPLE_MD)
+    texts = [p.text for p in doc.paragraphs]
+    assert "测试标题" in texts
+    assert "列表项2" in texts
+    assert len(doc.tables) == 1
+    assert doc.tables[0].cell(1, 1).text == "1"
+
+
+def test_convert_file(tmp_path):
+    """测试文件到文件的转换"""
+    input_file = tmp_path / "input.md"
+    input_file.write_text(SAMPLE_MD, encoding='utf-8')
+    output_file = tmp_path / "output.docx"
+
+    progress = []
+    convert_file(input_file, output_file, ConversionOptions(process_images=False),
+                 progress_callback=progress.append)
+
+    assert output_file.exists()
+    assert progress[0] == 0 and progress[-1] == 100
+    assert Document(str(output_file)).paragraphs[0].text == "测试标题"
+
+
+def test_save_reports_progress_while_writing(tmp_path):
+    """测试保存时直接写入文件，按已写入的字节数报告递增的进度"""
+    doc = convert(SAMPLE_MD * 200)
+    progress = []
+    save_document(doc, tmp_path / "doc.docx", ProgressRange(progress.append, 90, 100))
+    assert progress == sorted(progress) and progress[-1] == 100
+    assert len(progress) > 2 and all(90 <= value <= 100 for value in progress)
+    assert len(Document(str(tmp_path / "doc.docx")).tables) == 200
+
+
+PARSER_MD = """# 解析方式
+
+实体 &copy;、a < b & c、`code <x> &amp;` 和 <span>行内 *HTML*</span>。
+
+<div>
+块级HTML
+</div>
+
+脚注[^1]与 \\*转义\\*。
+
+[^1]: 脚注内容
+
+1. 一
+
+2. 二
+    - 嵌套
+
+> 引用 **粗体**
+
+```
+raw <code> & stuff
+```
+"""
+
+
+def test_tree_parser_matches_html_parser():
+    """测试元素树直接渲染与BeautifulSoup路径的输出一致"""
+    tree_doc = convert(PARSER_MD, ConversionOptions(parser='tree'))
+    html_doc = convert(PARSER_MD, ConversionOptions(parser='html'))
+    assert tree_doc.element.body.xml == html_doc.element.body.xml
+
+
+def test_cached_template_documents_are_independent():
+    """测试模板缓存复制出的文档互不影响"""
+    renderer = DocumentRenderer()
+    first = renderer.new_document()
+    first.add_paragraph("只在第一个文档中")
+    second = renderer.new_document()
+    assert len(second.paragraphs) == 0
+    assert second.styles['Normal'].font.size == first.styles['Normal'].font.size
+
+
+def test_reference_docx_template(tmp_path):
+    """测试使用参考文档的样式并清空其正文"""
+    reference = Document()
+    reference.styles['Normal'].font.name = 'Reference Font'
+    reference.add_paragraph("参考文档正文")
+    reference_file = tmp_path / "reference.docx"
+    reference.save(str(reference_file))
+
+    doc = convert("正文", ConversionOptions(reference_docx=reference_file))
+    assert [p.text for p in doc.paragraphs] == ["正文"]
+    assert doc.styles['Normal'].font.name == 'Reference Font'
+
+
+def test_markdown_instances_are_reused():
+    """测试同一线程复用已重置的Markdown解析器"""
+    md = get_markdown()
+    md.convert("[^1]\n\n[^1]: 脚注")
+    assert get_markdown() is md
+    assert md.convert("正文") == "<p>正文</p>"
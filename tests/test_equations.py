@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数学公式测试 - 验证LaTeX到OMML的转换、文档中的行内和独立公式以及内存、磁盘缓存和并行转换
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx.oxml.ns import qn
+from lxml import etree
+
+import src.equations as equations
+from src.engine import ConversionOptions, convert
+from src.equations import EquationRenderer, latex_to_omml, math_xml, normalize_latex
+from src.metrics import ConversionMetrics
+
+SAMPLE_MD = r"""# 公式
+
+质能方程 $E = mc^2$，勾股定理 \(a^2 + b^2 = c^2\)，价格 \$5。
+
+$$\sum_{i=1}^{n} i = \frac{n(n+1)}{2}$$
+
+| 符号 | 含义 |
+|------|------|
+| $\alpha$ | 角度 |
+"""
+
+
+def omml(tex):
+    """转换结果解析为 m:oMath 元素"""
+    return etree.fromstring(math_xml(latex_to_omml(tex)))
+
+
+def tags(element):
+    return [child.tag.split('}')[1] for child in element]
+
+
+def test_structures():
+    """测试上下标、分式、根式、大型运算符、定界符和矩阵生成对应的OMML结构"""
+    assert tags(omml(r"x_i^2 + y'")) == ['sSubSup', 'r', 'sSup']
+    assert tags(omml(r"\frac{a}{b} \sqrt{x} \sqrt[3]{y}")) == ['f', 'rad', 'rad']
+
+    nary = omml(r"\sum_{i=1}^{n} x_i")[0]
+    assert nary.find(f'.//{qn("m:chr")}').get(qn('m:val')) == '∑'
+    assert tags(nary) == ['naryPr', 'sub', 'sup', 'e']
+    assert tags(nary.find(qn('m:e'))) == ['sSub']
+
+    assert tags(omml(r"\lim_{x \to 0} f(x)"))[0] == 'limLow'
+    d = omml(r"\left( \frac{1}{2} \right.")[0]
+    assert d.find(f'.//{qn("m:endChr")}').get(qn('m:val')) == ''
+
+    matrix = omml(r"\begin{pmatrix} 1 & 2 \\ 3 & 4 \end{pmatrix}")[0]
+    assert len(matrix.findall(f'.//{qn("m:mr")}')) == 2
+    aligned = omml(r"\begin{aligned} a &= b \\ c &= d \end{aligned}")[0]
+    assert tags(aligned) == ['e', 'e'] and aligned.find(f'.//{qn("m:aln")}') is not None
+
+
+def test_symbols_text_and_unknown_commands():
+    """测试符号和函数名、\\text 中的空白保留、无法识别的命令和不完整的公式按原文输出"""
+    text = ''.join(omml(r"\alpha \le \infty, \sin x, \text{if } y, \foo").itertext())
+    assert 'α≤∞' in text and 'sin' in text and 'if ' in text and '\\foo' in text
+    assert ''.join(omml(r"\frac{a").itertext()) == 'a'
+    assert normalize_latex("a  +\n b ") == "a + b"
+
+
+def test_document_math():
+    """测试行内公式为 m:oMath、独立公式为 m:oMathPara，转义的美元符号和表格中的公式"""
+    for parser in ('tree', 'html'):
+        metrics = ConversionMetrics()
+        doc = convert(SAMPLE_MD, ConversionOptions(parser=parser), metrics=metrics)
+        body = doc.element.body
+        inline = doc.paragraphs[1]._p
+        assert len(inline.findall(qn('m:oMath'))) == 2
+        assert doc.paragraphs[1].text == "质能方程 ，勾股定理 ，价格 $5。"
+
+        display = doc.paragraphs[2]._p
+        assert display.find(qn('m:oMathPara')) is not None
+        assert display.find(qn('w:r')) is None
+        assert doc.tables[0]._tbl.find(f'.//{qn("m:oMath")}') is not None
+        assert len(list(body.iter(qn('m:oMath')))) == 4
+        assert metrics.equations == 4 and 'equations' in metrics.stages
+
+
+def test_repeated_equations_converted_once(monkeypatch):
+    """测试相同（仅空白不同）的公式只转换一次"""
+    calls = []
+    convert_latex = equations.latex_to_omml
+    monkeypatch.setattr(equations, 'latex_to_omml',
+                        lambda tex: calls.append(tex) or convert_latex(tex))
+    renderer = EquationRenderer()
+    first = renderer.render("x^2 +  y")
+    assert renderer.render(" x^2 + y ") == first
+    assert renderer.render("x^2 + y", display=True) != first
+    assert calls == ["x^2 + y"]
+
+
+def test_equations_cached_on_disk(tmp_path):
+    """测试转换结果缓存在磁盘上，新的转换器直接复用"""
+    first = EquationRenderer(cache_dir=tmp_path / "equations")
+    omml_xml = first.omml(r"\frac{1}{2}")
+    assert first.disk_cache.stats.stores == 1
+
+    second = EquationRenderer(cache_dir=tmp_path / "equations")
+    assert second.omml(r"\frac{1}{2}") == omml_xml
+    assert second.disk_cache.stats.hits == 1
+
+
+def test_disk_cache_size_limit(tmp_path):
+    """测试磁盘缓存超过大小上限时淘汰最久未使用的公式"""
+    cache = equations.EquationCache(tmp_path / "equations", max_bytes=250)
+    for i, name in enumerate("abc"):
+        cache.put(name * 64, "x" * 100)
+        os.utime(cache._entry_path(name * 64), (i, i))
+    assert cache.size() <= 250 and cache.stats.evictions == 1
+    assert not cache._entry_path("a" * 64).exists()
+    assert cache.get("c" * 64) == "x" * 100
+
+
+def test_prepare_converts_in_parallel(monkeypatch):
+    """测试公式较多时用进程池转换，结果与逐个转换相同"""
+    monkeypatch.setattr(equations, 'PARALLEL_MIN_EQUATIONS', 4)
+    sources = [rf"x_{{{i}}}^2 + \frac{{{i}}}{{2}}" for i in range(12)]
+    renderer = EquationRenderer(workers=2)
+    renderer.prepare(sources + sources)
+    assert len(renderer._memory) == 12
+    assert all(renderer.omml(s) == latex_to_omml(normalize_latex(s)) for s in sources)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面事件通道测试 - 验证事件合并、日志行数上限和真实进度
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.engine import ConversionOptions, convert_file
+from src.events import EventChannel, LogBuffer, FAILED, FINISHED
+
+
+def test_drain_coalesces_status_and_progress():
+    """测试连续的状态和进度只保留最新值，日志保持顺序"""
+    channel = EventChannel()
+    workers = [threading.Thread(target=lambda i=i: [channel.log(f"{i}-{n}") for n in range(100)])
+               for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    for value in range(50):
+        channel.progress(value)
+        channel.status(f"状态 {value}")
+    channel.finished("out.docx")
+    channel.failed("错误")
+
+    batch = channel.drain()
+    assert len(batch.logs) == 400
+    assert [m for m in batch.logs if m.startswith("2-")] == [f"2-{n}" for n in range(100)]
+    assert batch.progress == 49 and batch.status == "状态 49"
+    assert batch.results == [(FINISHED, "out.docx"), (FAILED, "错误")]
+    assert not channel.drain()
+
+
+def test_drain_limits_batch_size():
+    """测试单次取出的事件数有上限，剩余事件留到下一次"""
+    channel = EventChannel()
+    for n in range(10):
+        channel.log(n)
+    assert len(channel.drain(max_events=4).logs) == 4
+    assert len(channel.drain().logs) == 6
+
+
+def test_log_buffer_keeps_last_lines():
+    """测试日志缓冲区只保留最近的行，并返回需要删除的行数"""
+    buffer = LogBuffer(max_lines=5)
+    assert buffer.extend(["a", "b\nc"]) == 0
+    assert buffer.extend(["d", "e", "f"]) == 1
+    assert buffer.text() == "b\nc\nd\ne\nf"
+    assert buffer.extend([str(n) for n in range(20)]) == 20
+    assert list(buffer.lines) == [str(n) for n in range(15, 20)]
+
+
+def test_progress_reflects_rendered_blocks(tmp_path):
+    """测试进度随渲染的块数递增，而不是固定的几个阶段值"""
+    source = tmp_path / "doc.md"
+    source.write_text("\n\n".join(f"段落 {i}" for i in range(300)), encoding='utf-8')
+    values = []
+    convert_file(source, tmp_path / "doc.docx", ConversionOptions(), progress_callback=values.append)
+
+    assert values == sorted(values)
+    assert values[0] == 0 and values[-1] == 100
+    assert len([v for v in values if 30 < v < 90]) > 50
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+代码块高亮测试 - 验证按记号着色、run合并、换行和超大代码块的降级
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx.oxml.ns import qn
+
+from src import highlight
+from src.engine import ConversionOptions, convert
+
+PYTHON_BLOCK = '''```python
+def add(a, b):
+    # 求和
+    return a + b
+```
+'''
+
+
+def code_paragraph(doc):
+    """返回文档中唯一的代码块段落"""
+    paragraphs = [p for p in doc.paragraphs if p.style.name == 'No Spacing']
+    assert len(paragraphs) == 1
+    return paragraphs[0]
+
+
+def test_code_block_is_highlighted_by_token_type():
+    """测试代码块按记号类型着色，并保留每一行"""
+    for parser in ('tree', 'html'):
+        doc = convert(PYTHON_BLOCK, ConversionOptions(parser=parser))
+        paragraph = code_paragraph(doc)
+        assert paragraph.text == "def add(a, b):\n    # 求和\n    return a + b"
+        assert len(paragraph._p.findall('.//' + qn('w:br'))) == 2
+
+        keyword = next(run for run in paragraph.runs if run.text.startswith('def'))
+        comment = next(run for run in paragraph.runs if '求和' in run.text)
+        assert keyword.bold and keyword.font.color.rgb is not None
+        assert comment.italic and comment.font.color.rgb != keyword.font.color.rgb
+        assert all(run.font.size.pt == 10 for run in paragraph.runs)
+
+
+def test_adjacent_tokens_with_same_format_are_merged():
+    """测试相同格式的相邻记号和中间的空白合并为一个run"""
+    formats = highlight.token_formats('default', 'Courier New')
+    lexer = highlight.get_lexer('python')
+    code = "x = y + z\n" * 50
+    runs = highlight.highlight_runs(code, lexer, formats)
+    tokens = [value for _, value in lexer.get_tokens(code) if value]
+    assert ''.join(text for _, text in runs) == ''.join(tokens)
+    assert len(runs) < len(tokens) / 2
+    assert all(a[0] != b[0] for a, b in zip(runs, runs[1:]))
+    assert formats is highlight.token_formats('default', 'Courier New')
+
+
+def test_unknown_language_and_huge_blocks_are_plain(monkeypatch):
+    """测试未知语言和超过阈值的代码块按纯文本的单个run输出"""
+    doc = convert("```nosuchlanguage\na < b\n```\n", ConversionOptions())
+    paragraph = code_paragraph(doc)
+    assert paragraph.text == "a < b" and len(paragraph.runs) == 1
+
+    monkeypatch.setattr(highlight, 'MAX_HIGHLIGHT_CHARS', 20)
+    doc = convert(PYTHON_BLOCK, ConversionOptions())
+    paragraph = code_paragraph(doc)
+    assert len(paragraph.runs) == 1
+    assert paragraph.text.count("\n") == 2
+    assert not highlight.should_highlight("x" * (highlight.MAX_HIGHLIGHT_LINE + 1))
+
+
+def test_unknown_style_falls_back_to_plain():
+    """测试不存在的Pygments样式记录日志后按纯文本输出"""
+    messages = []
+    doc = convert(PYTHON_BLOCK, ConversionOptions(code_style='no-such-style'),
+                  log_callback=messages.append)
+    assert len(code_paragraph(doc).runs) == 1
+    assert any('no-such-style' in message for message in messages)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片处理测试 - 验证缩小、转码、去重和磁盘缓存
+"""
+
+import os
+import sys
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from PIL import Image
+
+from src import images
+from src.engine import ConversionOptions, convert
+from src.images import ImageProcessor, docx_can_embed
+
+
+def image_bytes(size, fmt='PNG', color=(200, 30, 30)):
+    """生成一张纯色图片"""
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def image_parts(doc):
+    """返回文档中嵌入的图片部件"""
+    return [rel.target_part for rel in doc.part.rels.values() if rel.reltype == RT.IMAGE]
+
+
+def test_large_image_is_downscaled_to_target_dpi():
+    """测试超出目标分辨率的图片按6英寸宽度缩小"""
+    processor = ImageProcessor(target_dpi=100)
+    data = image_bytes((3000, 1500), 'JPEG')
+    processed = processor.process(data)
+    assert (processed.width, processed.height) == (600, 300)
+    assert processed.format == 'JPEG'
+    assert len(processed.data) < len(data)
+    with Image.open(BytesIO(processed.data)) as img:
+        assert round(img.info['dpi'][0]) == 100
+
+
+def test_small_image_is_kept_unchanged():
+    """测试不超过目标分辨率的图片原样嵌入"""
+    data = image_bytes((100, 50))
+    assert ImageProcessor().process(data).data is data
+
+
+def test_unsupported_format_is_transcoded():
+    """测试python-docx无法嵌入的格式转码为PNG"""
+    data = image_bytes((40, 40), 'WEBP')
+    assert not docx_can_embed(data)
+    processed = ImageProcessor().process(data)
+    assert processed.format == 'PNG'
+    assert docx_can_embed(processed.data)
+
+
+def test_identical_images_embedded_once(tmp_path):
+    """测试内容相同的图片（包括段落中的图片）只嵌入一次"""
+    (tmp_path / "a.png").write_bytes(image_bytes((2000, 1000)))
+    (tmp_path / "b.png").write_bytes(image_bytes((2000, 1000)))
+    (tmp_path / "c.webp").write_bytes(image_bytes((30, 30), 'WEBP', (0, 0, 255)))
+    md = "![甲](a.png)\n\n![乙](b.png)\n\n行内图片 ![丙](c.webp) 结束\n"
+    doc = convert(md, ConversionOptions(system='Linux'), base_path=tmp_path)
+
+    assert len(doc.inline_shapes) == 3
+    ids = [shape._inline.docPr.id for shape in doc.inline_shapes]
+    assert len(set(ids)) == 3
+    parts = image_parts(doc)
+    assert len(parts) == 2
+    assert max(part.image.px_width for part in parts) == 900
+
+
+def test_processed_images_cached_on_disk(tmp_path):
+    """测试处理结果缓存在磁盘上，新的处理器直接复用"""
+    data = image_bytes((2000, 1000))
+    first = ImageProcessor(cache_dir=tmp_path / "images")
+    processed = first.process_bytes(data)
+    assert first.disk_cache.stats.stores == 1
+
+    second = ImageProcessor(cache_dir=tmp_path / "images")
+    assert second.process_bytes(data).data == processed.data
+    assert second.disk_cache.stats.hits == 1
+
+
+def test_disk_cache_size_limit_and_path_entries(tmp_path, monkeypatch):
+    """测试磁盘缓存不超过大小上限，路径索引不超过条目数上限"""
+    blobs = [image_bytes((2000, 1000), color=(i * 60, 0, 0)) for i in range(3)]
+    processor = ImageProcessor(cache_dir=tmp_path / "images", max_bytes=1)
+    for data in blobs:
+        processor.process_bytes(data)
+    assert processor.disk_cache.stats.stores == 3
+    assert len(processor.disk_cache.entries()) == 0
+    assert processor.disk_cache.stats.evictions == 3
+
+    monkeypatch.setattr(images, 'PATH_ENTRIES', 2)
+    processor = ImageProcessor()
+    for i, data in enumerate(blobs):
+        path = tmp_path / f"{i}.png"
+        path.write_bytes(data)
+        processor.load(path)
+    assert len(processor._paths) == 2
+
+
+def test_prepare_processes_in_parallel(tmp_path):
+    """测试批量预处理后读取直接命中内存缓存"""
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"{i}.png"
+        path.write_bytes(image_bytes((1200, 600), color=(i * 40, 0, 0)))
+        paths.append(path)
+    processor = ImageProcessor(workers=4)
+    processor.prepare(paths + [tmp_path / "missing.png"])
+    assert len(processor._memory) == 6
+    assert processor.load(paths[0]).width == 900
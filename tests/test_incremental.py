@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量转换测试 - 验证片段缓存、拼接和ID重映射
+"""
+
+import os
+import re
+import sys
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from conftest import png_bytes
+from src.engine import convert
+from src.fragments import FragmentSplicer, capture_fragment
+from src.incremental import FragmentCache, convert_incremental
+
+
+def make_sections(count, changed=None):
+    """生成包含多个章节的Markdown文本"""
+    parts = []
+    for i in range(count):
+        text = "已修改" if i == changed else f"段落 {i}"
+        parts.append(f"## 第{i}节\n\n{text}，包含 **粗体** 和 `代码`。\n\n- 项目 {i}\n")
+    return "\n".join(parts)
+
+
+def test_incremental_rerenders_only_changed_blocks(tmp_path):
+    """测试只重新渲染变化的块，结果与整体转换一致"""
+    source = tmp_path / "doc.md"
+    output = tmp_path / "doc.docx"
+    cache = FragmentCache(tmp_path / "fragments")
+
+    source.write_text(make_sections(30), encoding='utf-8')
+    convert_incremental(source, output, fragment_cache=cache)
+
+    source.write_text(make_sections(30, changed=7), encoding='utf-8')
+    logs = []
+    convert_incremental(source, output, fragment_cache=cache, log_callback=logs.append)
+
+    assert "增量转换: 重新渲染 1/90 个块" in logs
+    expected = convert(make_sections(30, changed=7))
+    assert [p.text for p in Document(str(output)).paragraphs] == [p.text for p in expected.paragraphs]
+
+    # 新的缓存实例从磁盘读取片段
+    disk_cache = FragmentCache(tmp_path / "fragments")
+    logs = []
+    convert_incremental(source, output, fragment_cache=disk_cache, log_callback=logs.append)
+    assert "增量转换: 重新渲染 0/90 个块" in logs
+
+
+def test_cached_heading_anchors_stay_unique(tmp_path):
+    """测试从缓存拼接的重名标题按文档顺序登记，书签名与整体转换一致"""
+    source = tmp_path / "doc.md"
+    output = tmp_path / "doc.docx"
+    cache = FragmentCache()
+
+    def bookmark_names(path):
+        return [b.get(qn('w:name')) for b in Document(str(path)).element.body.iter(
+            qn('w:bookmarkStart'))]
+
+    source.write_text("# Intro\n\n# Intro\n", encoding='utf-8')
+    convert_incremental(source, output, fragment_cache=cache)
+    assert bookmark_names(output) == ["intro", "intro_1"]
+
+    source.write_text("# Intro\n\n# Intro\n\n# Intro\n", encoding='utf-8')
+    logs = []
+    convert_incremental(source, output, fragment_cache=cache, log_callback=logs.append)
+    assert "增量转换: 重新渲染 0/3 个块" in logs
+    assert bookmark_names(output) == ["intro", "intro_1", "intro_2"]
+
+    source.write_text("# Intro\n\n# Other\n\n# Intro\n", encoding='utf-8')
+    convert_incremental(source, output, fragment_cache=cache)
+    assert bookmark_names(output) == ["intro", "other", "intro_1"]
+
+
+def test_splice_remaps_images_and_ids():
+    """测试拼接时图片去重、关系ID和图形对象ID重新分配"""
+    source = Document()
+    source.add_paragraph().add_run().add_picture(BytesIO(png_bytes('red')))
+    source.add_paragraph().add_run().add_picture(BytesIO(png_bytes('blue')))
+    elements = [p._p for p in source.paragraphs]
+    fragment = capture_fragment(source, elements)
+    assert len(fragment.images) == 2
+
+    target = Document()
+    target.add_paragraph().add_run().add_picture(BytesIO(png_bytes('blue')))
+    splicer = FragmentSplicer(target)
+    splicer.splice(fragment)
+    splicer.splice(fragment)
+
+    xml = target.element.body.xml
+    shape_ids = re.findall(r'<wp:docPr id="(\d+)"', xml)
+    assert len(shape_ids) == 5 and len(set(shape_ids)) == 5
+    image_rels = [r for r in target.part.rels.values() if r.reltype.endswith('/image')]
+    assert len(image_rels) == 2
+    embeds = set(re.findall(r'r:embed="([^"]+)"', xml))
+    assert embeds == {r.rId for r in image_rels}
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行内渲染测试 - 验证嵌套格式叠加、相邻同格式文本合并和表头格式
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from src.engine import ConversionOptions, convert
+from src.inline import PLAIN, InlineFormat, inline_segments
+
+
+def runs_of(paragraph):
+    return [(run.text, bool(run.bold), bool(run.italic), bool(run.font.strike), run.font.name)
+            for run in paragraph.runs]
+
+
+def test_nested_formatting_is_combined():
+    """测试嵌套的粗体、斜体、删除线、代码和链接格式叠加"""
+    md = "*斜 **粗斜** 尾* [`代码`](http://a) <del>删 *斜*</del>\n"
+    for parser in ('tree', 'html'):
+        doc = convert(md, ConversionOptions(parser=parser))
+        runs = runs_of(doc.paragraphs[0])
+        assert ('粗斜', True, True, False, None) in runs
+        assert ('斜 ', False, True, False, None) in runs
+        assert ('斜', False, True, True, None) in runs
+        code = next(run for run in doc.paragraphs[0].runs if run.text == '代码')
+        assert code.font.size.pt == 10 and code.font.color.rgb is not None
+        assert any(text == ' (http://a)' for text, *_ in runs)
+
+
+def test_adjacent_text_with_same_format_is_one_run():
+    """测试相邻的同格式文本（包括跨元素的）合并为一个run，注释被忽略"""
+    soup = BeautifulSoup("<p>a<span>b</span><!-- c -->d<strong>e<b>f</b></strong>g<br/>h</p>",
+                         'html.parser')
+    segments = inline_segments(soup.p)
+    bold = PLAIN.replace(bold=True)
+    assert segments == [(PLAIN, "abd"), (bold, "ef"), (PLAIN, "g\nh")]
+
+    doc = convert("<p>a<span>b</span>c <em>d</em><i>e</i></p>\n", ConversionOptions(parser='html'))
+    assert [run.text for run in doc.paragraphs[0].runs] == ["abc ", "de"]
+
+
+def test_table_header_formatting_is_merged():
+    """测试表头单元格整体加粗后，原本加粗的部分与相邻文本合并"""
+    doc = convert("| a **b** c |\n|---|\n| x |\n", ConversionOptions())
+    runs = doc.tables[0].cell(0, 0).paragraphs[0].runs
+    assert [(run.text, run.bold) for run in runs] == [("a b c", True)]
+
+
+def test_inline_format_is_value_object():
+    """测试格式状态按值比较并可作为缓存键"""
+    assert InlineFormat(bold=True) == PLAIN.replace(bold=True)
+    assert len({PLAIN, InlineFormat(), InlineFormat(code=True)}) == 2
+    assert PLAIN.replace(italic=True) is not PLAIN and not PLAIN.italic
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存测试 - 验证内存报告按阶段统计分配，以及生成的语料转换时峰值内存不超过输入大小的固定倍数
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate
+from src.engine import ConversionOptions, convert_file
+from src.metrics import ConversionMetrics, MemoryProfile, profile_conversion
+
+# 语料大小：足够大使新建文档等固定开销不主导倍数
+CORPUS_SIZE = '64KB'
+
+# 峰值分配量相对于输入大小的上限（实测约为一半）
+PEAK_LIMITS = {
+    'prose': 60,
+    'tables': 140,
+    'code': 80,
+    'lists': 60,
+    'mixed': 80,
+}
+
+
+def profile(source, tmp_path, parser='tree'):
+    """以 memory 方式分析一次转换，返回 (指标, 内存报告)"""
+    metrics = ConversionMetrics()
+    report_path = tmp_path / "run.memory.json"
+    with profile_conversion('memory', report_path, metrics):
+        convert_file(str(source), str(tmp_path / "out.docx"),
+                     ConversionOptions(parser=parser), metrics=metrics)
+    return metrics, json.loads(report_path.read_text(encoding='utf-8'))
+
+
+@pytest.fixture(scope='module', autouse=True)
+def warm_up(tmp_path_factory):
+    """先转换一次，首次导入和初始化的分配不计入被测的转换"""
+    tmp_path = tmp_path_factory.mktemp("warm")
+    convert_file(str(generate('mixed', '4KB', tmp_path)), str(tmp_path / "out.docx"))
+
+
+def test_report_attributes_stages(tmp_path):
+    """测试报告按阶段给出留存和峰值内存，html解析方式区分HTML字符串和BeautifulSoup树"""
+    source = generate('mixed', '16KB', tmp_path)
+    metrics, report = profile(source, tmp_path, parser='html')
+    stages = report['stages']
+    assert list(stages) == ['read', 'parse', 'soup', 'images', 'render', 'save']
+    assert stages['soup']['component'] == 'BeautifulSoup树'
+    assert stages['soup']['retained_bytes'] > stages['read']['retained_bytes'] > 0
+    assert all(0 < s['peak_bytes'] <= report['peak_traced_bytes'] for s in stages.values())
+    assert report['input_bytes'] == metrics.input_bytes and report['media_bytes'] > 0
+    assert metrics.peak_traced_bytes == report['peak_traced_bytes']
+    assert metrics.peak_rss_bytes == report['peak_rss_bytes'] > 0
+    # 分析结束后不再统计内存
+    assert metrics.memory is None
+
+
+def test_nested_stages_fold_peak_into_outer():
+    """测试内层阶段的峰值计入外层阶段"""
+    tracemalloc.start()
+    try:
+        memory = MemoryProfile()
+        memory.start()
+        memory.begin('render')
+        memory.begin('images')
+        data = bytearray(1024 * 1024)
+        del data
+        memory.end()
+        memory.end()
+        memory.finish()
+    finally:
+        tracemalloc.stop()
+    assert memory.stages['images'].peak_bytes >= 1024 * 1024
+    assert memory.stages['render'].peak_bytes >= memory.stages['images'].peak_bytes
+    assert memory.peak_traced_bytes >= memory.stages['render'].peak_bytes
+    assert abs(memory.stages['images'].retained_bytes) < 64 * 1024
+
+
+@pytest.mark.parametrize("kind", sorted(PEAK_LIMITS))
+def test_peak_memory_within_multiple_of_input(tmp_path, kind):
+    """测试各类语料转换时的峰值分配量不超过输入大小的固定倍数"""
+    source = generate(kind, CORPUS_SIZE, tmp_path)
+    metrics, report = profile(source, tmp_path)
+    assert metrics.peak_traced_bytes <= PEAK_LIMITS[kind] * metrics.input_bytes, report
+
+
+def test_peak_memory_grows_linearly(tmp_path):
+    """测试输入变为4倍时峰值与输入之比不上升（峰值随输入线性增长）"""
+    small, _ = profile(generate('mixed', '32KB', tmp_path / "small"), tmp_path)
+    large, _ = profile(generate('mixed', '128KB', tmp_path / "large"), tmp_path)
+    assert large.peak_traced_bytes / large.input_bytes <= \
+        small.peak_traced_bytes / small.input_bytes
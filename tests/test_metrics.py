@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换指标测试 - 验证阶段耗时、元素统计、输出大小和性能分析快照
+"""
+
+import json
+import os
+import pstats
+import sys
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.batch import main as batch_main
+from src.engine import ConversionOptions, convert_file
+from src.metrics import ConversionMetrics, profile_conversion
+from src.streaming import convert_stream
+
+SAMPLE = """# 标题
+
+第一段 **粗体** 和 `代码`。
+
+- 项目一
+- 项目二
+
+| 列1 | 列2 |
+|-----|-----|
+| a   | b   |
+
+![图](pic.png)
+"""
+
+
+def write_sample(directory):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), (0, 128, 0)).save(buffer, 'PNG')
+    (directory / "pic.png").write_bytes(buffer.getvalue())
+    source = directory / "doc.md"
+    source.write_text(SAMPLE, encoding='utf-8')
+    return source, len(buffer.getvalue())
+
+
+def test_convert_file_records_stages_and_document_stats(tmp_path):
+    """测试转换记录各阶段耗时、元素统计和文档大小"""
+    source, image_size = write_sample(tmp_path)
+    output = tmp_path / "doc.docx"
+    metrics = ConversionMetrics()
+    convert_file(source, output, ConversionOptions(), metrics=metrics)
+
+    data = metrics.to_dict()
+    assert list(data['stages']) == ['read', 'parse', 'images', 'render', 'save']
+    assert data['elements']['h1']['count'] == 1
+    assert data['elements']['p']['count'] == 2
+    assert data['elements']['table']['count'] == 1
+    assert data['input_bytes'] == source.stat().st_size
+    assert data['output_bytes'] == output.stat().st_size
+    assert data['tables'] == 1 and data['images'] == 1
+    assert data['media_bytes'] == image_size
+    assert data['paragraphs'] >= 6 and data['runs'] >= data['paragraphs'] - 2
+
+
+def test_html_parser_and_streaming_record_stages(tmp_path):
+    """测试 html 解析方式单独记录 BeautifulSoup 耗时，流式转换累加各块耗时"""
+    source, _ = write_sample(tmp_path)
+    metrics = ConversionMetrics()
+    convert_file(source, tmp_path / "html.docx", ConversionOptions(parser='html'), metrics=metrics)
+    assert 'soup' in metrics.stages
+
+    metrics = ConversionMetrics()
+    convert_stream(source, tmp_path / "stream.docx", ConversionOptions(), chunk_size=20,
+                   metrics=metrics)
+    assert metrics.elements['p'].count == 2
+    assert metrics.images == 1 and metrics.output_bytes > 0
+
+
+def test_profile_conversion_writes_snapshots(tmp_path):
+    """测试 cProfile 和 tracemalloc 快照可以被标准库读取"""
+    source, _ = write_sample(tmp_path)
+    with profile_conversion('cprofile', tmp_path / "run.prof"):
+        convert_file(source, tmp_path / "a.docx")
+    stats = pstats.Stats(str(tmp_path / "run.prof"))
+    assert any(name[2] == 'html_to_docx' for name in stats.stats)
+
+    metrics = ConversionMetrics()
+    with profile_conversion('tracemalloc', tmp_path / "run.tracemalloc", metrics):
+        convert_file(source, tmp_path / "b.docx", metrics=metrics)
+    assert metrics.peak_traced_bytes > 0
+    assert tracemalloc.Snapshot.load(str(tmp_path / "run.tracemalloc")).traces
+    assert not tracemalloc.is_tracing()
+
+
+def test_batch_prints_json_metrics(tmp_path, capsys):
+    """测试批量命令 --metrics 为每个文件输出一行JSON，--profile 保存分析结果"""
+    source, _ = write_sample(tmp_path)
+    out_dir = tmp_path / "out"
+    assert batch_main([str(source), "-o", str(out_dir), "--no-cache", "-j", "1",
+                       "--metrics", "--profile", "cprofile"]) == 0
+    lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith('{')]
+    record = json.loads(lines[0])
+    assert record['input'] == str(source)
+    assert record['output_bytes'] == (out_dir / "doc.docx").stat().st_size
+    assert (out_dir / "doc.prof").exists()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式包写入测试 - 验证逐块写入的文档可被打开、图片去重、失败时不留下文件以及内存不随文档增长
+"""
+
+import os
+import sys
+import tracemalloc
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from PIL import Image
+
+from src.engine import ConversionOptions, convert
+from src.metrics import ConversionMetrics
+from src.streaming import convert_stream
+from src.watch import ConversionCancelled
+
+SAMPLE_MD = """# 标题
+
+正文 **粗体** *斜体*
+
+![图](a.png)
+
+| 列1 | 列2 |
+|-----|-----|
+| 1   | 2   |
+
+```python
+x = 1
+```
+
+"""
+
+
+def write_sample(tmp_path, repeat=10):
+    Image.new('RGB', (40, 30), 'red').save(tmp_path / "a.png")
+    source = tmp_path / "doc.md"
+    source.write_text(SAMPLE_MD * repeat, encoding='utf-8')
+    return source
+
+
+def test_streamed_package_matches_convert(tmp_path):
+    """测试逐块写入的文档内容与整体转换一致，相同图片只保存一次"""
+    source = write_sample(tmp_path)
+    output = tmp_path / "doc.docx"
+    metrics = ConversionMetrics()
+    convert_stream(source, output, chunk_size=100, metrics=metrics)
+
+    streamed = Document(str(output))
+    whole = convert(source)
+    assert [p.text for p in streamed.paragraphs] == [p.text for p in whole.paragraphs]
+    assert len(streamed.tables) == 10 and len(streamed.inline_shapes) == 10
+    assert streamed.sections[0].page_width == whole.sections[0].page_width
+
+    with zipfile.ZipFile(output) as archive:
+        media = [name for name in archive.namelist() if name.startswith('word/media/')]
+        assert media == ['word/media/image1.png']
+        assert archive.getinfo(media[0]).compress_type == zipfile.ZIP_STORED
+        assert archive.testzip() is None
+    assert metrics.images == 10 and metrics.tables == 10
+    assert metrics.media_bytes == os.path.getsize(tmp_path / "a.png")
+    assert metrics.output_bytes == output.stat().st_size
+
+
+def test_reference_document_media_is_kept(tmp_path):
+    """测试参考文档中已有的部件保留，新图片的部件名和关系ID不与之冲突"""
+    reference = Document()
+    reference.add_paragraph().add_run().add_picture(str(write_sample(tmp_path).parent / "a.png"))
+    Image.new('RGB', (10, 10), 'blue').save(tmp_path / "a.png")
+    reference.save(str(tmp_path / "ref.docx"))
+
+    output = tmp_path / "doc.docx"
+    convert_stream(tmp_path / "doc.md", output, ConversionOptions(reference_docx=tmp_path / "ref.docx"))
+    with zipfile.ZipFile(output) as archive:
+        assert len([n for n in archive.namelist() if n.startswith('word/media/')]) == 2
+    doc = Document(str(output))
+    assert len(doc.inline_shapes) == 10
+    assert {shape._inline.graphic.graphicData.pic.blipFill.blip.embed
+            for shape in doc.inline_shapes} <= set(doc.part.rels)
+
+
+def test_failed_conversion_keeps_old_output(tmp_path):
+    """测试转换中途被取消时保留原有输出文件，不留下临时文件"""
+    source = write_sample(tmp_path)
+    output = tmp_path / "doc.docx"
+    output.write_bytes(b'old')
+
+    def cancel(value):
+        if value > 20:
+            raise ConversionCancelled()
+
+    with pytest.raises(ConversionCancelled):
+        convert_stream(source, output, chunk_size=100, progress_callback=cancel)
+    assert output.read_bytes() == b'old'
+    assert sorted(os.listdir(tmp_path)) == ["a.png", "doc.docx", "doc.md"]
+
+
+def test_memory_does_not_grow_with_document(tmp_path):
+    """测试峰值内存由块大小决定，文档变为4倍时基本不变"""
+    source = tmp_path / "doc.md"
+    convert_stream(write_sample(tmp_path, 1), tmp_path / "warm.docx")
+
+    peaks = []
+    for count in (300, 1200):
+        source.write_text("".join(f"段落 {i} **粗体** *斜体*\n\n" for i in range(count)),
+                          encoding='utf-8')
+        tracemalloc.start()
+        try:
+            convert_stream(source, tmp_path / "doc.docx", chunk_size=2000)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        assert len(Document(str(tmp_path / "doc.docx")).paragraphs) == count
+    assert peaks[1] < peaks[0] * 1.5
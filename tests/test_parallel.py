@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行渲染测试 - 验证分片切分、拼接后的文档与整篇转换一致，以及ID、书签名和引用式链接在分片之间正确处理
+"""
+
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from docx.oxml.ns import qn
+from PIL import Image
+
+from src.anchors import bookmark_name
+from src.batch import main
+from src.engine import ConversionOptions, convert_file
+from src.metrics import ConversionMetrics
+from src.parallel import convert_parallel, reference_definitions, split_shards
+from src.streaming import iter_blocks
+
+SECTION_MD = """# 概述
+
+第{n}节 **粗体** 见 [规范][spec] 和 [概述](#概述)。
+
+![图](img/a.png)
+
+1. 第一步
+2. 第二步
+
+| 列1 | 列2 |
+|-----|-----|
+| {n} | b |
+
+"""
+
+DEFINITIONS_MD = """[spec]: https://example.com/spec
+
+```
+[code]: https://example.com/not-a-definition
+```
+"""
+
+
+def write_document(tmp_path, sections=8):
+    (tmp_path / "img").mkdir()
+    Image.new('RGB', (40, 30), 'red').save(tmp_path / "img" / "a.png")
+    source = tmp_path / "spec.md"
+    text = "".join(SECTION_MD.format(n=n) for n in range(sections)) + DEFINITIONS_MD
+    source.write_text(text, encoding='utf-8')
+    return source
+
+
+def test_split_shards_and_definitions():
+    """测试分片按顺序、大小接近且不拆开顶层块，引用式链接定义跳过代码块"""
+    text = "".join(SECTION_MD.format(n=n) for n in range(8))
+    blocks = list(iter_blocks(text.splitlines(keepends=True)))
+    shards = split_shards(blocks, 4, min_size=1)
+    assert len(shards) == 4 and "".join(shards) == "".join(blocks)
+    assert all(shard.startswith("# 概述") for shard in shards)
+    assert split_shards(blocks, 4, min_size=10 ** 6) == ["".join(blocks)]
+
+    blocks = list(iter_blocks(DEFINITIONS_MD.splitlines(keepends=True)))
+    assert reference_definitions(blocks) == "[spec]: https://example.com/spec\n"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_matches_whole_document_conversion(tmp_path, jobs):
+    """测试并行渲染的结果与整篇转换相同，图片只嵌入一次，ID和书签名唯一"""
+    source = write_document(tmp_path)
+    convert_file(str(source), str(tmp_path / "whole.docx"))
+    metrics = ConversionMetrics()
+    convert_parallel(str(source), str(tmp_path / "parallel.docx"), jobs=jobs,
+                     min_shard_size=1, metrics=metrics)
+    assert 'splice' in metrics.stages and metrics.tables == 8
+    assert metrics.input_bytes == source.stat().st_size
+
+    whole = Document(str(tmp_path / "whole.docx"))
+    doc = Document(str(tmp_path / "parallel.docx"))
+    assert [p.text for p in doc.paragraphs] == [p.text for p in whole.paragraphs]
+    assert [p.style.name for p in doc.paragraphs] == [p.style.name for p in whole.paragraphs]
+    assert len(doc.inline_shapes) == 8
+    assert len({shape._inline.docPr.id for shape in doc.inline_shapes}) == 8
+    with zipfile.ZipFile(tmp_path / "parallel.docx") as archive:
+        assert [n for n in archive.namelist() if n.startswith('word/media/')] == \
+            ['word/media/image1.png']
+
+    body = doc.element.body
+    names = [b.get(qn('w:name')) for b in body.iter(qn('w:bookmarkStart'))]
+    ids = [b.get(qn('w:id')) for b in body.iter(qn('w:bookmarkStart'))]
+    assert names == [b.get(qn('w:name')) for b in whole.element.body.iter(qn('w:bookmarkStart'))]
+    assert len(set(names)) == 8 and len(set(ids)) == 8
+    assert names[:2] == [bookmark_name("概述"), bookmark_name("概述_1")]
+
+    # 其他分片中定义的引用式链接仍然有效
+    texts = [p.text for p in doc.paragraphs if "粗体" in p.text]
+    assert len(texts) == 8 and all("规范 (https://example.com/spec)" in t for t in texts)
+
+
+def test_suffixed_heading_titles(tmp_path):
+    """测试标题本身以 _数字 结尾时拼接后的书签名与整篇转换相同"""
+    source = tmp_path / "suffix.md"
+    source.write_text("# foo\n\n正文\n\n# foo_5\n\n见 [foo_5](#foo_5)\n\n" * 2, encoding='utf-8')
+    convert_file(str(source), str(tmp_path / "whole.docx"))
+    convert_parallel(str(source), str(tmp_path / "parallel.docx"), jobs=1, min_shard_size=1)
+    names = [[b.get(qn('w:name')) for b in Document(str(tmp_path / name)).element.body.iter(
+        qn('w:bookmarkStart'))] for name in ("whole.docx", "parallel.docx")]
+    assert names[0] == names[1] == ["foo", "foo_5", "foo_1", "foo_6"]
+
+
+def test_batch_parallel(tmp_path, capsys):
+    """测试批量命令 --parallel 在文件内并行渲染"""
+    source = write_document(tmp_path, 2)
+    assert main([str(source), "--parallel", "-j", "2", "--no-cache", "--metrics"]) == 0
+    assert len(Document(str(tmp_path / "spec.docx")).tables) == 2
+    assert '"splice"' in capsys.readouterr().out
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程图片测试 - 使用本地HTTP服务器验证并发下载、条件请求和磁盘缓存
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import png_bytes
+from src import remote
+from src.engine import ConversionOptions, convert
+from src.remote import RemoteFetcher, RemoteImageError
+
+
+class ImageServer:
+    """提供图片的本地HTTP服务器，记录请求次数和最大并发数"""
+
+    def __init__(self, images, delay=0.0, cache_control=None):
+        self.images = images
+        self.delay = delay
+        self.cache_control = cache_control
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/{path}"
+
+    def _handler(self):
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with owner.lock:
+                    owner.requests.append((self.path, self.headers.get('If-None-Match')))
+                    owner.active += 1
+                    owner.max_active = max(owner.max_active, owner.active)
+                try:
+                    time.sleep(owner.delay)
+                    body = owner.images.get(self.path.lstrip('/'))
+                    etag = f'"{self.path}"'
+                    if body is None:
+                        self.send_response(404)
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                    elif self.headers.get('If-None-Match') == etag:
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.end_headers()
+                    else:
+                        self.send_response(200)
+                        self.send_header('Content-Type', 'image/png')
+                        self.send_header('Content-Length', str(len(body)))
+                        self.send_header('ETag', etag)
+                        if owner.cache_control:
+                            self.send_header('Cache-Control', owner.cache_control)
+                        self.end_headers()
+                        self.wfile.write(body)
+                finally:
+                    with owner.lock:
+                        owner.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_remote_images_embedded():
+    """测试远程图片在渲染前下载并嵌入，失败的地址记录日志"""
+    with ImageServer({'a.png': png_bytes((255, 0, 0))}) as server:
+        md = f"![图]({server.url('a.png')})\n\n![缺失]({server.url('missing.png')})\n"
+        messages = []
+        doc = convert(md, ConversionOptions(remote_images=True), log_callback=messages.append)
+    assert len(doc.inline_shapes) == 1
+    assert any("HTTP 404" in message for message in messages)
+
+    # 未启用时不访问网络
+    assert len(convert(md, ConversionOptions()).inline_shapes) == 0
+
+
+def test_failed_url_requested_once():
+    """测试同一个失败的地址被引用多次时只访问一次网络"""
+    with ImageServer({}) as server:
+        md = f"![一]({server.url('missing.png')})\n\n![二]({server.url('missing.png')})\n"
+        messages = []
+        convert(md, ConversionOptions(remote_images=True), log_callback=messages.append)
+        assert len(server.requests) == 1
+    assert sum("HTTP 404" in message for message in messages) == 2
+
+    # 超过有效期后重新下载
+    fetcher = RemoteFetcher()
+    with ImageServer({}) as server:
+        url = server.url('missing.png')
+        fetcher.prefetch([url])
+        with pytest.raises(RemoteImageError):
+            fetcher.get(url)
+        fetcher._errors[url] = (fetcher._errors[url][0], time.monotonic() - remote.ERROR_TTL)
+        with pytest.raises(RemoteImageError):
+            fetcher.get(url)
+        assert len(server.requests) == 2
+    fetcher.close()
+
+
+def test_memory_byte_cap(monkeypatch):
+    """测试内存中的下载结果不超过总字节数上限"""
+    images = {f"{i}.png": png_bytes((i, 0, 0), (64, 64)) for i in range(4)}
+    monkeypatch.setattr(remote, 'MEMORY_BYTES', sum(map(len, images.values())) // 2)
+    with ImageServer(images) as server:
+        fetcher = RemoteFetcher()
+        fetcher.prefetch([server.url(name) for name in images])
+        assert 0 < len(fetcher._memory) < len(images)
+        assert fetcher._memory_bytes == sum(len(r.body) for r in fetcher._memory.values())
+        assert fetcher._memory_bytes <= remote.MEMORY_BYTES
+        fetcher.close()
+
+
+def test_prefetch_respects_per_host_limit():
+    """测试并发下载不超过每个主机的连接数上限"""
+    images = {f"{i}.png": png_bytes((i, 0, 0)) for i in range(12)}
+    with ImageServer(images, delay=0.05) as server:
+        fetcher = RemoteFetcher(per_host=3, workers=12)
+        fetcher.prefetch([server.url(name) for name in images])
+        assert server.max_active <= 3
+        assert fetcher.get(server.url('5.png')) == images['5.png']
+        assert len(server.requests) == 12
+        fetcher.close()
+
+
+def test_disk_cache_and_revalidation(tmp_path):
+    """测试有效期内重复下载不访问网络，过期后使用ETag条件请求"""
+    image = png_bytes((0, 255, 0))
+    with ImageServer({'a.png': image, 'b.png': image}) as server:
+        url = server.url('a.png')
+        RemoteFetcher(cache_dir=tmp_path).fetch(url)
+        assert RemoteFetcher(cache_dir=tmp_path).fetch(url) == image
+        assert len(server.requests) == 1
+
+        # no-cache 的响应每次使用前都要重新验证
+        server.cache_control = 'no-cache'
+        url = server.url('b.png')
+        RemoteFetcher(cache_dir=tmp_path).fetch(url)
+        assert RemoteFetcher(cache_dir=tmp_path).fetch(url) == image
+        assert server.requests[-1] == ('/b.png', '"/b.png"')
+        assert len(server.requests) == 3
+
+
+def test_disk_cache_size_limit(tmp_path):
+    """测试远程图片的磁盘缓存不超过大小上限，最久未使用的下载结果被淘汰"""
+    images = {f"{i}.png": png_bytes((i, 0, 0), (64, 64)) for i in range(3)}
+    with ImageServer(images) as server:
+        fetcher = RemoteFetcher(cache_dir=tmp_path)
+        cache = fetcher.disk_cache
+        for i, name in enumerate(images):
+            fetcher.fetch(server.url(name))
+            entry = cache._entry_path(cache.key_for_url(server.url(name)))
+            os.utime(entry, (i, i))
+            # 上限为两个半条目：写入第三个条目时淘汰最早的一个
+            cache.max_bytes = entry.stat().st_size * 5 // 2
+        fetcher.close()
+    assert cache.size() <= cache.max_bytes and cache.stats.evictions == 1
+    assert cache.get(server.url('0.png')) is None
+    assert cache.get(server.url('2.png')).body == images['2.png']
+
+
+def test_size_cap():
+    """测试超过大小上限的图片不会被下载"""
+    with ImageServer({'big.png': png_bytes((0, 0, 255), (400, 400))}) as server:
+        fetcher = RemoteFetcher(max_bytes=100)
+        with pytest.raises(RemoteImageError):
+            fetcher.fetch(server.url('big.png'))
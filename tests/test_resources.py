@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存转换测试 - 验证资源解析器（映射、zip、callable）和写入不可定位的流
+"""
+
+import os
+import sys
+import zipfile
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from conftest import png_bytes
+from src.engine import convert_to_stream
+from src.metrics import ConversionMetrics
+from src.resources import normalize_src, resource_resolver
+
+
+class WriteOnlyStream:
+    """只有 write() 的流（如管道或套接字）"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def image_count(data):
+    return len(Document(BytesIO(data)).inline_shapes)
+
+
+def test_normalize_src():
+    """测试图片地址按所在目录解析，不能跳出资源根目录"""
+    assert normalize_src("img/a%20b.png", "doc") == "doc/img/a b.png"
+    assert normalize_src("../img/a.png", "doc/sub") == "doc/img/a.png"
+    assert normalize_src("./a.png?x=1#y") == "a.png"
+    for src in ("../a.png", "/etc/a.png", "C:/a.png", ""):
+        assert normalize_src(src) is None
+
+
+def test_resources_from_mapping_zip_and_callable():
+    """测试三种资源形式都能提供图片，且不读取文件系统"""
+    md = "# 图\n\n![a](img/a.png)\n\n![b](../outside.png)\n"
+
+    output = BytesIO()
+    convert_to_stream(md, output, resources={'img/a.png': png_bytes(), 'outside.png': png_bytes()})
+    assert image_count(output.getvalue()) == 1
+
+    archive_bytes = BytesIO()
+    with zipfile.ZipFile(archive_bytes, 'w') as archive:
+        archive.writestr('doc/img/a.png', png_bytes())
+        archive.writestr('outside.png', png_bytes())
+    with zipfile.ZipFile(archive_bytes) as archive:
+        output = BytesIO()
+        convert_to_stream(md, output, resources=archive, base_path='doc')
+        assert image_count(output.getvalue()) == 2
+
+    requested = []
+
+    def resolve(src):
+        requested.append(src)
+        return png_bytes('blue') if src == 'img/a.png' else None
+
+    output = BytesIO()
+    convert_to_stream(md.encode('utf-8'), output, resources=resolve)
+    assert image_count(output.getvalue()) == 1
+    # 预处理和渲染共读取一次
+    assert requested == ['img/a.png', '../outside.png']
+
+
+def test_no_resources_never_touches_files(tmp_path, monkeypatch):
+    """测试未提供资源时不会从当前目录读取图片"""
+    (tmp_path / "a.png").write_bytes(png_bytes())
+    monkeypatch.chdir(tmp_path)
+    output = BytesIO()
+    convert_to_stream("![a](a.png)\n", output)
+    assert image_count(output.getvalue()) == 0
+    assert resource_resolver(None)("a.png") is None
+
+
+def test_write_to_unseekable_stream():
+    """测试直接写入不可定位的流，输出与写入BytesIO相同"""
+    stream = WriteOnlyStream()
+    metrics = ConversionMetrics()
+    convert_to_stream(BytesIO("# 标题\n\n正文\n".encode('utf-8')), stream, metrics=metrics)
+    doc = Document(BytesIO(b''.join(stream.chunks)))
+    assert [p.text for p in doc.paragraphs][:2] == ["标题", "正文"]
+    assert 'save' in metrics.stages
+
+    seekable = BytesIO()
+    metrics = ConversionMetrics()
+    convert_to_stream("# 标题\n", seekable, metrics=metrics)
+    assert metrics.output_bytes == len(seekable.getvalue())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换服务测试 - 在本机端口上验证转换、压缩包、过载时的429、大小和时间上限以及指标
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from docx import Document
+
+from conftest import png_bytes
+from src.engine import ConversionOptions
+from src.server import ConversionServer, ConversionTimeout, convert_payload
+
+
+@contextmanager
+def running_server(**kwargs):
+    """在后台线程的事件循环中运行服务"""
+    server = ConversionServer(port=0, **kwargs)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(10)
+    try:
+        yield server
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=30)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_convert_markdown_and_bundle():
+    """测试转换Markdown文本和带图片的压缩包；压缩包外的图片不会被读取"""
+    with running_server(workers=1) as server:
+        status, headers, body = request(server, 'POST', '/convert?toc=0',
+                                        "# 标题\n\n正文 **粗体**\n".encode('utf-8'))
+        assert status == 200
+        assert headers['Content-Type'].startswith('application/vnd.openxmlformats')
+        doc = Document(BytesIO(body))
+        assert [p.text for p in doc.paragraphs][:2] == ["标题", "正文 粗体"]
+
+        bundle = BytesIO()
+        with zipfile.ZipFile(bundle, 'w') as archive:
+            archive.writestr('doc/index.md', "![图](img/a.png)\n\n![外部](../../../etc/x.png)\n")
+            archive.writestr('doc/img/a.png', png_bytes())
+        status, _, body = request(server, 'POST', '/convert', bundle.getvalue(),
+                                  {'Content-Type': 'application/zip'})
+        assert status == 200
+        assert len(Document(BytesIO(body)).inline_shapes) == 1
+
+        status, _, body = request(server, 'POST', '/convert', b'PK\x03\x04broken')
+        assert status == 400 and "zip" in json.loads(body)['error']
+
+        status, _, body = request(server, 'GET', '/health')
+        assert status == 200 and json.loads(body)['status'] == 'ok'
+
+        metrics = json.loads(request(server, 'GET', '/metrics')[2])
+        assert metrics['responses'] == {'200': 3, '400': 1}
+        assert metrics['latency_seconds']['count'] == 3
+        assert metrics['latency_seconds']['buckets']['+Inf'] == 3
+        assert metrics['conversion_seconds']['count'] == 2
+        assert 'render' in metrics['stage_seconds']
+
+
+def test_invalid_image_dpi_rejected():
+    """测试 image_dpi 不是正整数时返回400，不会转换后丢弃所有图片"""
+    with running_server(workers=1) as server:
+        for value in ('0', '-150'):
+            status, _, body = request(server, 'POST', f'/convert?image_dpi={value}',
+                                      "![图](a.png)\n".encode('utf-8'))
+            assert status == 400 and "image_dpi" in json.loads(body)['error']
+        status, _, _ = request(server, 'POST', '/convert?image_dpi=abc', b"# x\n")
+        assert status == 400
+
+
+def test_overload_returns_429():
+    """测试工作进程都忙且队列已满时立即返回429，队列深度出现在指标中"""
+    release = threading.Event()
+
+    def blocking(data, options, bundle, main, time_limit):
+        release.wait(10)
+        return b'docx', {'stages': {}, 'input_bytes': len(data), 'output_bytes': 4}
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    with running_server(workers=1, queue_limit=1, executor=executor) as server:
+        server.convert_function = blocking
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            request(server, 'POST', '/convert', b'# a')[0])) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.1)
+        deadline = time.monotonic() + 5
+        while (server.running, server.waiting) != (1, 1) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        status, headers, _ = request(server, 'POST', '/convert', b'# b')
+        assert status == 429 and headers['Retry-After'] == '1'
+        metrics = json.loads(request(server, 'GET', '/metrics')[2])
+        assert (metrics['running'], metrics['queue_depth']) == (1, 1)
+
+        release.set()
+        for thread in threads:
+            thread.join(10)
+        assert results == [200, 200]
+    executor.shutdown()
+
+
+def test_size_and_time_limits():
+    """测试请求体超过上限返回413，转换超时返回504，未知路径和方法返回404/405"""
+    with running_server(workers=1, max_body_bytes=1024, timeout=0.2) as server:
+        assert request(server, 'POST', '/convert', b'x' * 2048)[0] == 413
+        assert request(server, 'GET', '/nope')[0] == 404
+        status, headers, _ = request(server, 'GET', '/convert')
+        assert status == 405 and headers['Allow'] == 'POST'
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    with running_server(workers=1, timeout=0.1, executor=executor) as server:
+        server.timeout_grace = 0.1
+        server.convert_function = lambda *args: time.sleep(1) or (b'', {})
+        status, _, body = request(server, 'POST', '/convert', b'# a')
+        assert status == 504
+    executor.shutdown()
+
+
+def test_worker_time_limit_interrupts_conversion():
+    """测试工作进程中的转换超过时间上限时被中断"""
+    md = "".join(f"段落 {i} **粗体** *斜体*\n\n" for i in range(20000)).encode('utf-8')
+    with pytest.raises(ConversionTimeout):
+        convert_payload(md, ConversionOptions(), time_limit=0.05)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动测试 - 验证依赖检查不导入模块、界面模块延迟导入转换引擎
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src import launcher
+from src.events import EventChannel, FINISHED
+
+HEAVY_MODULES = ('docx', 'markdown', 'bs4', 'lxml', 'PIL', 'pygments')
+
+
+def test_startup_does_not_import_conversion_dependencies():
+    """测试导入启动器、检查依赖和导入界面模块都不会加载转换依赖"""
+    code = ("import sys, src.launcher as l, src.md_to_word_converter\n"
+            "assert l.check_dependencies() == [], l.check_dependencies()\n"
+            f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_missing_dependency_is_reported(monkeypatch):
+    """测试找不到模块的依赖包被报告为缺失"""
+    monkeypatch.setattr(launcher, 'REQUIRED_MODULES',
+                        {'markdown': 'markdown', 'not-installed': 'no_such_module_md2word'})
+    assert launcher.check_dependencies() == ['not-installed']
+    assert launcher.get_python_command() == sys.executable
+
+
+def test_gui_worker_builds_options_after_loading_engine(tmp_path):
+    """测试界面工作线程用界面选项（字典）创建转换选项并完成转换"""
+    from src.md_to_word_converter import MarkdownToWordConverter
+
+    # 不创建Tk窗口，只使用工作线程用到的属性
+    app = MarkdownToWordConverter.__new__(MarkdownToWordConverter)
+    app.system = 'Linux'
+    app.events = EventChannel()
+    source = tmp_path / "doc.md"
+    source.write_text("# 标题\n\n正文", encoding='utf-8')
+    output = tmp_path / "doc.docx"
+    app.convert_file(str(source), str(output), {'include_toc': False, 'process_images': False})
+
+    assert output.exists()
+    assert app.events.drain().results == [(FINISHED, str(output))]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式转换测试 - 验证顶层块切分和逐块转换
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from src.engine import convert
+from src.streaming import convert_stream, iter_blocks, iter_chunks
+
+
+STREAM_MD = """# 标题
+
+第一段
+继续第一段
+
+```python
+def f():
+
+    return 1
+```
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+- 项目1
+
+    项目1的续行
+
+- 项目2
+"""
+
+
+def test_iter_blocks_keeps_fences_and_tables():
+    """测试围栏代码块、表格和列表续行不会被拆开"""
+    blocks = list(iter_blocks(STREAM_MD.splitlines(keepends=True)))
+    assert ''.join(blocks) == STREAM_MD
+    assert any(b.startswith("```python") and "return 1\n```" in b for b in blocks)
+    assert any(b.startswith("| a | b |") and "| 1 | 2 |" in b for b in blocks)
+    assert any(b.startswith("- 项目1") and "项目1的续行" in b and "- 项目2" in b for b in blocks)
+
+
+def test_iter_chunks_respects_size():
+    """测试解析块按大小合并"""
+    lines = "".join("段落 %d\n\n" % i for i in range(1000)).splitlines(keepends=True)
+    chunks = list(iter_chunks(lines, chunk_size=500))
+    assert len(chunks) > 1
+    assert all(len(c) <= 500 for c in chunks)
+
+
+def test_convert_stream_matches_convert(tmp_path):
+    """测试流式转换与整体转换结果一致"""
+    input_file = tmp_path / "big.md"
+    input_file.write_text(STREAM_MD * 20, encoding='utf-8')
+    output_file = tmp_path / "big.docx"
+
+    convert_stream(str(input_file), str(output_file), chunk_size=200)
+
+    streamed = Document(str(output_file))
+    whole = convert(input_file)
+    assert [p.text for p in streamed.paragraphs] == [p.text for p in whole.paragraphs]
+    assert len(streamed.tables) == len(whole.tables) == 20
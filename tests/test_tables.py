@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表格测试 - 验证一次性生成XML的快速路径与逐单元格处理一致
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from src.engine import ConversionOptions, DocumentRenderer, convert, get_markdown, parse_markdown
+
+
+def render_table(source, fast, parser='tree'):
+    """用快速路径或逐单元格路径渲染第一个表格，返回表格XML"""
+    if parser == 'soup':
+        table = BeautifulSoup(source, 'html.parser').find('table')
+    else:
+        table = parse_markdown(get_markdown(), source, parser).find_all('table')[0]
+    renderer = DocumentRenderer(ConversionOptions(system='Linux'))
+    doc = renderer.new_document()
+    if fast:
+        renderer.process_table(table, doc)
+    else:
+        rows = table.find_all('tr')
+        renderer.process_table_cells(rows, max(len(r.find_all(['td', 'th'])) for r in rows), doc)
+    return etree.tostring(doc.tables[0]._tbl)
+
+
+def test_plain_table_matches_cell_by_cell_path():
+    """测试纯文本表格（含转义字符和空单元格）与逐单元格处理结果完全相同"""
+    md = "| 名称 | 说明 |\n|---|---|\n| a & b | x<y |\n|  | 空 |\n| a\\|b | 尾 |\n"
+    for parser in ('tree', 'html'):
+        assert render_table(md, True, parser) == render_table(md, False, parser)
+
+
+def test_ragged_rows_are_padded():
+    """测试单元格数不同的行按最大列数补齐"""
+    html = "<table><tr><th>A</th><th>B</th><th>C</th></tr><tr><td>1</td></tr></table>"
+    assert render_table(html, True, 'soup') == render_table(html, False, 'soup')
+
+
+def test_inline_formatting_kept_in_cells():
+    """测试单元格内的粗体、斜体、代码和链接格式，以及表头粗体"""
+    md = "| 标题 |\n|---|\n| **粗** *斜* `代码` [链接](http://x) |\n"
+    doc = convert(md, ConversionOptions(system='Linux'))
+    header, body = doc.tables[0].rows
+    assert header.cells[0].paragraphs[0].runs[0].bold
+    runs = {run.text: run for run in body.cells[0].paragraphs[0].runs}
+    assert runs['粗'].bold and runs['斜'].italic
+    assert runs['代码'].font.name == 'DejaVu Sans Mono'
+    assert str(runs['链接 (http://x)'].font.color.rgb) == '007ACC'
+    assert body.cells[0].text == "粗 斜 代码 链接 (http://x)"
+
+
+def test_merged_cells_fall_back():
+    """测试含合并单元格的表格回退到逐单元格处理"""
+    html = '<table><tr><td colspan="2">合并</td></tr><tr><td>1</td><td>2</td></tr></table>'
+    assert render_table(html, True, 'soup') == render_table(html, False, 'soup')
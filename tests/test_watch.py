@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视模式测试 - 验证依赖文件收集、文件变化检测、防抖、取消和原子写入
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.engine import ConversionOptions, ProgressRange, convert, save_document
+from src.watch import (ConversionCancelled, InotifyMonitor, PollingMonitor, WatchSession,
+                       _load_inotify, watched_paths)
+
+MONITORS = [PollingMonitor]
+if _load_inotify() is not None:
+    MONITORS.append(InotifyMonitor)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_watched_paths_include_images_and_reference(tmp_path):
+    """测试监视列表包含本地图片和参考文档，不包含远程图片"""
+    source = tmp_path / "doc.md"
+    source.write_text("![a](img/a%20b.png) ![r](https://example.com/r.png)\n", encoding='utf-8')
+    reference = tmp_path / "ref.docx"
+    paths = watched_paths(source, ConversionOptions(reference_docx=reference))
+    assert paths == [str(source), str(tmp_path / "img" / "a b.png"), str(reference)]
+    assert watched_paths(source, ConversionOptions(process_images=False)) == [str(source)]
+
+
+@pytest.mark.parametrize("monitor_class", MONITORS)
+def test_monitor_detects_write_and_rename(tmp_path, monitor_class):
+    """测试直接写入和“写临时文件再重命名”的保存方式都能被检测到"""
+    source = tmp_path / "doc.md"
+    source.write_text("a", encoding='utf-8')
+    monitor = monitor_class() if monitor_class is InotifyMonitor else monitor_class(interval=0.01)
+    try:
+        monitor.watch([str(source)])
+        assert monitor.changes(0) == set()
+
+        (tmp_path / "other.md").write_text("x", encoding='utf-8')
+        source.write_text("bb", encoding='utf-8')
+        assert monitor.changes(2) == {str(source)}
+
+        tmp = tmp_path / ".doc.md.swp"
+        tmp.write_text("ccc", encoding='utf-8')
+        os.replace(tmp, source)
+        assert monitor.changes(2) == {str(source)}
+        assert monitor.changes(0.05) == set()
+    finally:
+        monitor.close()
+
+
+def test_session_debounces_and_cancels(tmp_path):
+    """测试连续保存只触发一次转换，转换过程中的修改会取消并重新转换"""
+    source = tmp_path / "doc.md"
+    source.write_text("v0", encoding='utf-8')
+    calls = []
+    results = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_convert(input_file, output_file, progress_callback):
+        calls.append(source.read_text(encoding='utf-8'))
+        started.set()
+        # 第二次转换等待测试修改文件，期间不断报告进度
+        while len(calls) == 2 and not release.is_set():
+            progress_callback(50)
+            time.sleep(0.01)
+        return calls[-1]
+
+    session = WatchSession([(source, tmp_path / "doc.docx")], slow_convert,
+                           monitor=PollingMonitor(interval=0.01), debounce=0.2,
+                           report=results.append)
+    stop = threading.Event()
+    thread = threading.Thread(target=session.run, args=(stop,))
+    thread.start()
+    try:
+        assert wait_for(lambda: results == ["v0"])
+
+        # 一连串保存只转换一次
+        started.clear()
+        for i in range(1, 4):
+            source.write_text(f"v{i}", encoding='utf-8')
+            time.sleep(0.05)
+        assert started.wait(5)
+        assert calls == ["v0", "v3"]
+
+        # 转换进行中再次修改：当前转换被取消，防抖后转换新内容
+        source.write_text("v4", encoding='utf-8')
+        assert wait_for(lambda: results == ["v0", "v4"])
+        release.set()
+        assert session.cancellations == 1 and calls == ["v0", "v3", "v4"]
+    finally:
+        release.set()
+        stop.set()
+        thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_save_is_atomic(tmp_path):
+    """测试保存被取消时原有文档保持不变，也不留下临时文件"""
+    output = tmp_path / "doc.docx"
+    save_document(convert("# 旧\n"), output)
+    before = output.read_bytes()
+
+    def cancel(value):
+        raise ConversionCancelled()
+
+    with pytest.raises(ConversionCancelled):
+        save_document(convert("# 新\n"), output, ProgressRange(cancel, 90, 100))
+    assert output.read_bytes() == before
+    assert os.listdir(tmp_path) == ["doc.docx"]